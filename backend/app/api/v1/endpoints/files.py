@@ -8,20 +8,29 @@ from uuid import UUID
 from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Path, Query
 from fastapi.responses import JSONResponse
 
+from app.core.config import settings
 from app.core.logging import logger
+from app.core.singleflight import SingleFlight
+from app.db.checkpoints import checkpoint_store
 from app.schemas.file import (
     DeleteByPineconeIdRequest,
+    EnrichmentStatusResponse,
     FileIngestRequest, 
     FileIngestResponse, 
     FileMetadataResponse
 )
 from app.services.embedding_service import embedding_service
+from app.services.enrichment_service import enrichment_service
+from app.services.extraction_executor import extraction_executor
 from app.services.file_service import file_service
 from app.services.llm_service import llm_service
-from app.services.file_processors import FileProcessorFactory
+from app.services.query_rewriter import query_rewriter
 
 router = APIRouter()
 
+# In-flight ingestions keyed by file ID
+_ingest_flights: SingleFlight[FileIngestResponse] = SingleFlight("ingest")
+
 
 @router.post("/ingest", response_model=FileIngestResponse)
 async def ingest_file(
@@ -35,6 +44,26 @@ async def ingest_file(
     2. Generates a description and metadata using LLM
     3. Processes the file content for vector storage
     4. Updates the file metadata with the results
+    5. Schedules image/frame description in the background when vision is deferred
+    
+    Each step is checkpointed per file, so re-ingesting a file after a failure
+    resumes from the last completed stage (fetched, extracted, described, and
+    per-batch embedded/upserted) instead of starting over. Concurrent requests
+    for the same file share one ingestion.
+    
+    Args:
+        request: The file ingestion request.
+        
+    Returns:
+        FileIngestResponse: The ingestion response.
+    """
+    file_id = str(request.file_id)
+    return await _ingest_flights.do(file_id, lambda: _ingest_file(request))
+
+
+async def _ingest_file(request: FileIngestRequest) -> FileIngestResponse:
+    """
+    Runs the ingestion of a file.
     
     Args:
         request: The file ingestion request.
@@ -61,9 +90,13 @@ async def ingest_file(
                 message="File already processed"
             )
         
-        # Fetch raw file content
+        # Fetch raw file content (or reuse it from a previous attempt at the same stored version)
         try:
-            file_content = await file_service.fetch_file_content(notebook_file.file_path)
+            fetched_stage = f"fetched:{notebook_file.content_version}"
+            file_content = await checkpoint_store.get_bytes(file_id, fetched_stage)
+            if file_content is None:
+                file_content = await file_service.fetch_file_content(notebook_file.file_path)
+                await checkpoint_store.put_bytes(file_id, fetched_stage, file_content)
         except Exception as e:
             logger.error(f"Error fetching file content: {e}")
             raise HTTPException(
@@ -71,15 +104,27 @@ async def ingest_file(
                 detail=f"Error fetching file content: {str(e)}"
             )
             
-        # Get the appropriate processor based on file type
+        # Later stages resume only from output of this exact content
+        checkpoint_key = await checkpoint_store.content_key(file_id, file_content)
+        
+        # Index native text first and describe images later for file types that support it
+        defer_vision = settings.INGEST_DEFER_VISION and enrichment_service.supports(notebook_file.file_type)
+        
+        # Process file content and extract metadata in the extraction worker pool
         try:
-            processor = FileProcessorFactory.get_processor(notebook_file.file_type)
-            
-            # Process file content
-            text_content = await processor.process(file_content, notebook_file.file_path)
-            
-            # Extract metadata
-            file_metadata = await processor.get_metadata(file_content, notebook_file.file_path)
+            extracted = await checkpoint_store.get_json(checkpoint_key, "extracted")
+            if extracted is None:
+                text_content, file_metadata = await extraction_executor.extract(
+                    notebook_file.file_type,
+                    file_content,
+                    notebook_file.file_path,
+                    describe_images=not defer_vision
+                )
+                await checkpoint_store.put_json(
+                    checkpoint_key, "extracted", {"text": text_content, "metadata": file_metadata}
+                )
+            else:
+                text_content, file_metadata = extracted["text"], extracted["metadata"]
         except ValueError as e:
             logger.error(f"Unsupported file type: {e}")
             raise HTTPException(
@@ -94,13 +139,16 @@ async def ingest_file(
             )
         
         # Generate description using LLM if not already extracted
-        llm_result = {}
-        if not file_metadata.get("description"):
+        llm_result = await checkpoint_store.get_json(checkpoint_key, "described")
+        if llm_result is not None:
+            logger.info(f"Resuming ingest of file {file_id} from its checkpointed description")
+        elif not file_metadata.get("description"):
             llm_result = await llm_service.generate_file_description(
                 file_content=text_content,
                 file_name=notebook_file.file_name,
                 file_type=notebook_file.file_type
             )
+            await checkpoint_store.put_json(checkpoint_key, "described", llm_result)
         else:
             llm_result = {
                 "description": file_metadata.get("description", ""),
@@ -122,13 +170,17 @@ async def ingest_file(
                 metadata=llm_result.get("metadata", {})
             )
         
+        # Learn acronyms and synonyms of the file for local query rewriting
+        await query_rewriter.learn_async(llm_result.get("metadata") or {}, file_id)
+        
         # Process file content immediately instead of background task
         pinecone_id = await embedding_service.process_file_content(
             file_id=file_id,
             file_path=notebook_file.file_path,
             content=text_content,
             source=notebook_file.file_name,
-            namespace=""
+            namespace="",
+            checkpoint_key=checkpoint_key
         )
         
         # Update file metadata with Pinecone ID
@@ -137,10 +189,27 @@ async def ingest_file(
             pinecone_id=pinecone_id
         )
         
+        # Ingestion is complete, so the checkpoints are no longer needed
+        await checkpoint_store.clear(file_id)
+        
+        # The file is searchable now; describe its images/frames in the background
+        message = "File ingestion completed"
+        if defer_vision:
+            enrichment_service.schedule(
+                file_id=file_id,
+                file_type=notebook_file.file_type,
+                file_content=file_content,
+                file_path=notebook_file.file_path,
+                pinecone_id=pinecone_id,
+                source=notebook_file.file_name,
+                namespace=""
+            )
+            message = "File ingestion completed, image enrichment scheduled"
+        
         return FileIngestResponse(
             success=True,
             metadata=FileMetadataResponse(**metadata.to_dict()),
-            message="File ingestion completed"
+            message=message
         )
     except HTTPException:
         raise
@@ -176,6 +245,27 @@ async def get_file_metadata(
         raise HTTPException(status_code=500, detail=f"Error getting file metadata: {str(e)}")
 
 
+@router.get("/{file_id}/enrichment", response_model=EnrichmentStatusResponse)
+async def get_enrichment_status(
+    file_id: UUID = Path(..., description="The ID of the file"),
+) -> EnrichmentStatusResponse:
+    """
+    Gets the status of deferred image/frame enrichment for a file.
+    
+    Args:
+        file_id: The ID of the file.
+        
+    Returns:
+        EnrichmentStatusResponse: The enrichment status.
+    """
+    status = enrichment_service.get_status(str(file_id))
+    
+    if not status:
+        raise HTTPException(status_code=404, detail=f"No enrichment scheduled for file with ID {file_id}")
+    
+    return EnrichmentStatusResponse(**status)
+
+
 @router.delete("/{file_id}", response_model=Dict[str, Any])
 async def delete_file_vectors(
     file_id: UUID = Path(..., description="The ID of the file"),
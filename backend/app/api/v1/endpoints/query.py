@@ -4,25 +4,138 @@ API endpoints for query operations.
 import asyncio
 import json
 import time
-from typing import Any, Dict, List, Optional
+import uuid
+from typing import Any, AsyncGenerator, Dict, List, Optional, Tuple
 
-from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query as QueryParam
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query as QueryParam, Request
 from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import ValidationError
 
+from app.core.cache import TTLCache
+from app.core.config import settings
 from app.core.logging import logger
-from app.schemas.file import QueryRequest, QueryResponse, QueryResult
+from app.core.metrics import metrics
+from app.core.sse import coalesce, encode_event, heartbeats
+from app.schemas.file import (
+    QueryRequest,
+    QueryResponse,
+    QueryResult,
+    SourcePayloadRequest,
+    SourcePayloadResponse,
+)
 from app.services.rag_service import rag_service
 from app.services.llm_service import llm_service
-from app.db.pinecone import pinecone_client
 from app.db.supabase import supabase_client
 
 router = APIRouter()
 
+# Requesting user ID and full source payloads of streamed queries, by stream ID, served
+# by /query/sources. The cache is per process, so multi-worker deployments need sticky sessions.
+_source_payloads: TTLCache[Tuple[Optional[str], List[Dict[str, Any]]]] = TTLCache(
+    max_size=settings.SOURCE_PAYLOAD_CACHE_MAX_ENTRIES,
+    ttl_seconds=settings.SOURCE_PAYLOAD_CACHE_TTL_SECONDS,
+)
+
+
+def _compact_source(source: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Builds the compact form of a source sent in the first SSE event.
+    
+    Args:
+        source: The full source payload.
+        
+    Returns:
+        Dict[str, Any]: The source with a short text snippet and only small metadata fields.
+    """
+    text = source.get("text") or ""
+    limit = settings.SOURCE_SNIPPET_CHARS
+    truncated = len(text) > limit
+    if truncated:
+        # Cut at a word boundary so the snippet does not end mid-word
+        text = text[:limit].rsplit(" ", 1)[0] + "..."
+    metadata = source.get("metadata") or {}
+    return {
+        "id": source["id"],
+        "text": text,
+        "truncated": truncated,
+        "score": source.get("score", 0.0),
+        "file_id": source.get("file_id", ""),
+        "file_path": source.get("file_path", ""),
+        "source": source.get("source", ""),
+        "metadata": {key: metadata[key] for key in ("chunk_index", "enrichment") if key in metadata},
+    }
+
+
+async def _resolve_scope(request: QueryRequest) -> Tuple[Optional[List[str]], List[str]]:
+    """
+    Resolves the files a query is scoped to from the user's toggled files.
+    
+    Args:
+        request: The query request.
+        
+    Returns:
+        Tuple[Optional[List[str]], List[str]]: File IDs to scope vector search to (None for
+        an unscoped search), and toggled file IDs that are not indexed in Pinecone yet.
+    """
+    if not request.user_id:
+        return None, []
+    
+    file_map = await supabase_client.get_user_toggled_file_map(request.user_id)
+    indexed_file_ids = [file_id for file_id, pinecone_id in file_map.items() if pinecone_id]
+    unindexed_file_ids = [file_id for file_id, pinecone_id in file_map.items() if not pinecone_id]
+    return indexed_file_ids or None, unindexed_file_ids
+
+
+async def _relay_until_disconnect(
+    answer_stream: AsyncGenerator[str, None], http_request: Request
+) -> AsyncGenerator[str, None]:
+    """
+    Relays an answer stream until it ends or the client disconnects.
+    
+    Each chunk is awaited alongside a watcher polling for disconnects, so a
+    closed tab or a new question cancels the provider stream (and its upstream
+    HTTP request) right away instead of after the next chunk or max_tokens.
+    
+    Args:
+        answer_stream: The answer stream from the LLM service.
+        http_request: The HTTP request being streamed to.
+        
+    Yields:
+        str: Chunks of the answer.
+    """
+    async def watch() -> None:
+        while not await http_request.is_disconnected():
+            await asyncio.sleep(settings.STREAM_DISCONNECT_POLL_SECONDS)
+    
+    watcher = asyncio.create_task(watch())
+    next_chunk: Optional[asyncio.Future] = None
+    try:
+        while True:
+            next_chunk = asyncio.ensure_future(answer_stream.__anext__())
+            await asyncio.wait({next_chunk, watcher}, return_when=asyncio.FIRST_COMPLETED)
+            if not next_chunk.done():
+                metrics.increment("query.stream.disconnected")
+                logger.info("Client disconnected, cancelling answer stream")
+                return
+            try:
+                chunk = next_chunk.result()
+            except StopAsyncIteration:
+                return
+            next_chunk = None
+            yield chunk
+    finally:
+        watcher.cancel()
+        if next_chunk is not None and not next_chunk.done():
+            # Cancelling the pending read raises CancelledError inside the provider stream
+            next_chunk.cancel()
+            await asyncio.gather(next_chunk, return_exceptions=True)
+        await answer_stream.aclose()
+
 
 @router.post("", response_model=QueryResponse)
 async def query(
     request: QueryRequest,
+    http_request: Request,
 ) -> QueryResponse:
     """
     Queries the system using RAG.
@@ -34,6 +147,7 @@ async def query(
     
     Args:
         request: The query request.
+        http_request: The HTTP request, used to detect client disconnects while streaming.
         
     Returns:
         QueryResponse: The query response.
@@ -42,46 +156,42 @@ async def query(
         logger.info(f"DEBUG - Original query: {request.query}")
         # Handle streaming separately
         if request.is_coding_question:
-            return await _stream_query_coding(request)
+            return await _stream_query_coding(request, http_request)
         else:
             if request.stream:
-                return await _stream_query(request)
+                return await _stream_query(request, http_request)
             
         # Default filter if none provided
         filter_dict = request.filter or {}
         
-        # Handle user_id if provided to get toggled files
-        if request.user_id:
-            # Get pinecone_ids from user's toggled files
-            pinecone_ids = await supabase_client.get_user_toggled_files(request.user_id)
-            
-            # First get all vector IDs that match the prefixes
-            if pinecone_ids:
-                vector_ids = []
-                for pinecone_id in pinecone_ids:
-                    ids = await pinecone_client.list_vectors(prefix=pinecone_id, namespace=request.namespace)
-                    # Collect all IDs
-                    vector_ids.extend(ids)
-                
-                # If we found matching vector IDs, create a proper filter
-                if vector_ids:
-                    # Use the helper method to create a properly formatted filter
-                    filter_dict = await pinecone_client.create_id_filter(vector_ids)
+        # Instruction-style and chit-chat requests skip scope resolution and retrieval
+        use_rag = bool(request.use_rag and rag_service.should_retrieve(request.query))
+        
+        # Scope retrieval to the user's toggled files (filtered inside Pinecone)
+        scoped_file_ids, _ = await _resolve_scope(request) if use_rag else (None, [])
+        
+        # Source metadata only depends on retrieval, so fetch it while the answer is generated
+        hydration: List[asyncio.Task] = []
+        
+        def _hydrate_sources(context: List[Dict[str, Any]]) -> None:
+            file_ids = [doc.get("file_id") for doc in context if doc.get("file_id")]
+            hydration.append(asyncio.create_task(supabase_client.get_file_metadata_batch(file_ids)))
         
         # Perform RAG query
         answer, context, query_time = await rag_service.query(
             query=request.query,
             top_k=request.top_k,
             model_name=request.model_name,
-            use_rag=request.use_rag,
+            use_rag=use_rag,
             stream=False,
             namespace=request.namespace,
-            filter=filter_dict
+            filter=filter_dict,
+            file_ids=scoped_file_ids,
+            on_context=_hydrate_sources
         )
         
         # Process context: group by file_id and fetch complete metadata
         grouped_context = {}
-        file_metadata_cache = {}
         
         # First group all chunks by file_id
         for doc in context:
@@ -97,16 +207,16 @@ async def query(
         # Log the number of unique files found
         logger.info(f"Found {len(grouped_context)} unique files in RAG results")
         
+        # Metadata for every source file, fetched in one batch
+        if hydration:
+            file_metadata_map = await hydration[0]
+        else:
+            file_metadata_map = await supabase_client.get_file_metadata_batch(list(grouped_context))
+        
         # Now create sources with complete file content and metadata
         sources = []
         for file_id, docs in grouped_context.items():
-            # Get file metadata if we haven't cached it yet
-            if file_id not in file_metadata_cache:
-                file_metadata = await supabase_client.get_file_metadata(file_id)
-                file_metadata_cache[file_id] = file_metadata
-                logger.info(f"Retrieved metadata for file_id {file_id}: {file_metadata}")
-            else:
-                file_metadata = file_metadata_cache[file_id]
+            file_metadata = file_metadata_map.get(str(file_id), {})
                 
             # Sort chunks by their index to maintain order
             docs.sort(key=lambda x: x.get("metadata", {}).get("chunk_index", 0))
@@ -149,12 +259,49 @@ async def query(
         raise HTTPException(status_code=500, detail=f"Error querying: {str(e)}")
 
 
-async def _stream_query(request: QueryRequest) -> StreamingResponse:
+@router.post("/sources", response_model=SourcePayloadResponse)
+async def get_sources(request: SourcePayloadRequest) -> SourcePayloadResponse:
+    """
+    Returns the full text and metadata of the sources of a streamed query.
+    
+    The sources event of a stream only carries snippets; clients fetch the
+    full payloads here, in one batch, when they need them. Payloads are only
+    returned to the user who made the streamed query, and are kept in the
+    memory of the worker that served the stream, so this request must reach
+    the same worker (sticky sessions when running several).
+    
+    Args:
+        request: The stream ID and optionally the source IDs to fetch.
+        
+    Returns:
+        SourcePayloadResponse: The full source payloads.
+    """
+    entry = _source_payloads.get(request.stream_id)
+    # Another user's stream is reported like an unknown one
+    if entry is None or entry[0] != request.user_id:
+        raise HTTPException(status_code=404, detail="Sources expired or not found")
+    sources = entry[1]
+    
+    if request.source_ids is not None:
+        wanted = set(request.source_ids)
+        sources = [source for source in sources if source["id"] in wanted]
+    
+    return SourcePayloadResponse(
+        stream_id=request.stream_id,
+        sources=[
+            QueryResult(**{**source, "file_id": str(source.get("file_id") or ""), "score": source.get("score") or 0.0})
+            for source in sources
+        ],
+    )
+
+
+async def _stream_query(request: QueryRequest, http_request: Request) -> StreamingResponse:
     """
     Streams a query response.
     
     Args:
         request: The query request.
+        http_request: The HTTP request, used to detect client disconnects.
         
     Returns:
         StreamingResponse: The streaming response.
@@ -196,44 +343,40 @@ async def _stream_query(request: QueryRequest) -> StreamingResponse:
                     logger.error(f"Error extracting query: {extraction_error}")
                     query = "Please provide information"  # Fallback
             
-            # Retrieve context
-            raw_context = []
-            if request.use_rag:
+            async def retrieve() -> List[Dict[str, Any]]:
+                retrieved = []
                 # Default filter if none provided
                 filter_dict = request.filter or {}
                 
-                # Handle user_id if provided to get toggled files
-                if request.user_id:
-                    # Get pinecone_ids from user's toggled files
-                    output_dict = await supabase_client.get_user_toggled_files(request.user_id)
-                    pinecone_ids = output_dict[True]
-                    file_ids = output_dict[False]
-                    
-                    # First get all vector IDs that match the prefixes
-                    if pinecone_ids:
-                        vector_ids = []
-                        for pinecone_id in pinecone_ids:
-                            ids = await pinecone_client.list_vectors(prefix=pinecone_id, namespace=request.namespace)
-                            # Collect all IDs
-                            vector_ids.extend(ids)
-                        
-                        # If we found matching vector IDs, create a proper filter
-                        if vector_ids:
-                            # Use the helper method to create a properly formatted filter
-                            filter_dict = await pinecone_client.create_id_filter(vector_ids)
-                    if file_ids:
-                        file_content = await supabase_client.get_file_content(file_ids)
-                        logger.info(f"DEBUG - Appending Raw File Content: {file_content}")
-                        raw_context.extend(file_content)
+                # Scope retrieval to the user's toggled files (filtered inside Pinecone)
+                scoped_file_ids, file_ids = await _resolve_scope(request)
+                
+                # Toggled files that are not indexed yet are passed in whole
+                if file_ids:
+                    file_content = await supabase_client.get_file_content(file_ids)
+                    logger.info(f"DEBUG - Appending Raw File Content: {file_content}")
+                    retrieved.extend(file_content)
                 
                 # Use the sanitized query
                 raw_context_rag = await rag_service.retrieve_context(
                     query=query,
                     top_k=request.top_k,
                     namespace=request.namespace,
-                    filter=filter_dict
+                    filter=filter_dict,
+                    file_ids=scoped_file_ids
                 )
-                raw_context.extend(raw_context_rag)
+                retrieved.extend(raw_context_rag)
+                return retrieved
+            
+            # Retrieve context
+            raw_context = []
+            # Instruction-style and chit-chat requests skip scope resolution and retrieval
+            if request.use_rag and rag_service.should_retrieve(query):
+                # Heartbeats keep the connection alive until the first event
+                retrieval = asyncio.ensure_future(retrieve())
+                async for heartbeat in heartbeats(retrieval):
+                    yield heartbeat
+                raw_context = retrieval.result()
             
             # Direct pass-through of search results to the LLM
             # Format each result with minimal processing
@@ -260,6 +403,7 @@ async def _stream_query(request: QueryRequest) -> StreamingResponse:
             # Format sources for the response (using processed context)
             sources = [
                 {
+                    "id": str(raw_doc.get("id") or f"source_{index}"),
                     "text": doc.get("text", ""),
                     "score": doc.get("score", 0.0),
                     "file_id": doc.get("file_id", ""),
@@ -267,12 +411,17 @@ async def _stream_query(request: QueryRequest) -> StreamingResponse:
                     "source": doc.get("source", ""),
                     "metadata": doc.get("metadata", {})
                 }
-                for doc in context
+                for index, (raw_doc, doc) in enumerate(zip(raw_context, context))
             ]
             
-            # Send sources as the first chunk
-            sources_json = json.dumps({"type": "sources", "data": sources})
-            yield f"data: {sources_json}\n\n"
+            # Send compact sources as the first chunk; full payloads are served by /query/sources
+            stream_id = uuid.uuid4().hex
+            _source_payloads.set(stream_id, (request.user_id, sources))
+            yield encode_event({
+                "type": "sources",
+                "stream_id": stream_id,
+                "data": [_compact_source(source) for source in sources]
+            })
 
             
             logger.info(f"DEBUG - Streaming answer with context: {context}")
@@ -285,38 +434,36 @@ async def _stream_query(request: QueryRequest) -> StreamingResponse:
                 stream=True
             )
             
-            # Since answer_stream is an AsyncGenerator, we can directly iterate over it
+            # Chunks arriving within the coalescing window are sent as one token event
+            frames = 0
             try:
-                async for chunk in answer_stream:
-                    logger.info(f"DEBUG - Received chunk: {chunk}")
-                    chunk_json = json.dumps({"type": "token", "data": chunk})
-                    yield f"data: {chunk_json}\n\n"
-                    await asyncio.sleep(0)  # Allow other tasks to run
+                async for chunk in coalesce(_relay_until_disconnect(answer_stream, http_request)):
+                    frames += 1
+                    yield encode_event({"type": "token", "data": chunk})
             except Exception as e:
                 logger.error(f"Error streaming chunks: {e}")
-                error_json = json.dumps({"type": "error", "error": f"Streaming error: {str(e)}"})
-                yield f"data: {error_json}\n\n"
+                yield encode_event({"type": "error", "error": f"Streaming error: {str(e)}"})
+            logger.info(f"Streamed answer in {frames} token events")
             
             # Send query time as the final chunk
             query_time = (time.time() - start_time) * 1000
-            done_json = json.dumps({"type": "done", "query_time_ms": query_time})
-            yield f"data: {done_json}\n\n"
+            yield encode_event({"type": "done", "query_time_ms": query_time})
         except Exception as e:
             logger.error(f"Error in streaming query: {e}")
-            error_json = json.dumps({"type": "error", "error": str(e)})
-            yield f"data: {error_json}\n\n"
+            yield encode_event({"type": "error", "error": str(e)})
     
     return StreamingResponse(
         generate(),
         media_type="text/event-stream"
     ) 
 
-async def _stream_query_coding(request: QueryRequest) -> StreamingResponse:
+async def _stream_query_coding(request: QueryRequest, http_request: Request) -> StreamingResponse:
     """
     Streams a response for coding questions, bypassing RAG and going directly to the LLM.
     
     Args:
         request: The query request.
+        http_request: The HTTP request, used to detect client disconnects.
         
     Returns:
         StreamingResponse: The streaming response.
@@ -358,8 +505,7 @@ async def _stream_query_coding(request: QueryRequest) -> StreamingResponse:
             
             # For coding questions, we don't use RAG, so we send empty sources
             sources = []
-            sources_json = json.dumps({"type": "sources", "data": sources})
-            yield f"data: {sources_json}\n\n"
+            yield encode_event({"type": "sources", "data": sources})
             
             logger.info(f"DEBUG - Streaming coding answer directly to LLM")
             
@@ -373,31 +519,27 @@ async def _stream_query_coding(request: QueryRequest) -> StreamingResponse:
             # Process the stream
             if hasattr(answer_stream, '__aiter__'):
                 # It's an async generator
+                frames = 0
                 try:
-                    async for chunk in answer_stream:
-                        logger.info(f"DEBUG - Received coding chunk: {chunk}")
-                        chunk_json = json.dumps({"type": "token", "data": chunk})
-                        yield f"data: {chunk_json}\n\n"
-                        await asyncio.sleep(0)  # Allow other tasks to run
+                    async for chunk in coalesce(_relay_until_disconnect(answer_stream, http_request)):
+                        frames += 1
+                        yield encode_event({"type": "token", "data": chunk})
                 except Exception as e:
                     logger.error(f"Error streaming coding chunks: {e}")
-                    error_json = json.dumps({"type": "error", "error": f"Streaming error: {str(e)}"})
-                    yield f"data: {error_json}\n\n"
+                    yield encode_event({"type": "error", "error": f"Streaming error: {str(e)}"})
+                logger.info(f"Streamed coding answer in {frames} token events")
             else:
                 # It's a string (non-streaming response)
                 logger.info(f"DEBUG - Received non-streaming coding response")
                 # Send the entire response as a single token
-                chunk_json = json.dumps({"type": "token", "data": answer_stream})
-                yield f"data: {chunk_json}\n\n"
+                yield encode_event({"type": "token", "data": answer_stream})
             
             # Send query time as the final chunk
             query_time = (time.time() - start_time) * 1000
-            done_json = json.dumps({"type": "done", "query_time_ms": query_time})
-            yield f"data: {done_json}\n\n"
+            yield encode_event({"type": "done", "query_time_ms": query_time})
         except Exception as e:
             logger.error(f"Error in streaming coding query: {e}")
-            error_json = json.dumps({"type": "error", "error": str(e)})
-            yield f"data: {error_json}\n\n"
+            yield encode_event({"type": "error", "error": str(e)})
     
     return StreamingResponse(
         generate(),
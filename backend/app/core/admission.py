@@ -0,0 +1,356 @@
+"""
+Admission control for calls to rate-limited model providers.
+"""
+import asyncio
+import heapq
+import itertools
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+from app.core.config import settings
+from app.core.logging import logger
+from app.core.metrics import metrics
+
+# Priority classes: lower values are admitted first
+PRIORITY_INTERACTIVE = 0
+PRIORITY_INGEST = 10
+
+
+class AdmissionTimeout(Exception):
+    """
+    Raised when a call waits longer than its timeout for admission.
+    """
+
+
+class TokenBucket:
+    """
+    Token bucket refilled continuously at a per-minute rate.
+
+    The level may go negative when a call turns out to cost more than was
+    charged up front; later calls then wait until the debt is refilled.
+    """
+
+    def __init__(self, per_minute: float):
+        """
+        Initializes a full bucket.
+
+        Args:
+            per_minute: Refill rate and capacity (0 or less for no limit)
+        """
+        self.per_minute = per_minute
+        self.level = per_minute
+        self._updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.level = min(self.per_minute, self.level + (now - self._updated) * self.per_minute / 60.0)
+        self._updated = now
+
+    def time_until(self, amount: float) -> float:
+        """
+        Returns how long until amount can be consumed.
+
+        Args:
+            amount: The amount to consume
+
+        Returns:
+            float: Seconds to wait (0 if available now)
+        """
+        if self.per_minute <= 0:
+            return 0.0
+        self._refill()
+        # A request larger than the whole bucket only waits for a full bucket
+        needed = min(amount, self.per_minute) - self.level
+        return max(0.0, needed * 60.0 / self.per_minute)
+
+    def set_rate(self, per_minute: float) -> None:
+        """
+        Changes the refill rate and capacity, keeping the current level.
+
+        Args:
+            per_minute: New refill rate and capacity (0 or less for no limit)
+        """
+        self._refill()
+        self.per_minute = per_minute
+        self.level = min(self.level, per_minute)
+
+    def consume(self, amount: float) -> None:
+        """
+        Consumes from the bucket (the level may go negative).
+
+        Args:
+            amount: The amount to consume
+        """
+        if self.per_minute <= 0:
+            return
+        self._refill()
+        self.level -= amount
+
+
+class AdmissionLimiter:
+    """
+    Admission for one provider/model: a concurrency cap plus requests-per-minute
+    and tokens-per-minute buckets, with waiters admitted in priority order.
+    """
+
+    def __init__(self, name: str, concurrency: int, rpm: float, tpm: float):
+        """
+        Initializes the limiter.
+
+        Args:
+            name: Provider/model key, used in logs and metrics
+            concurrency: Maximum number of calls in flight (0 or less for no limit)
+            rpm: Requests per minute (0 or less for no limit)
+            tpm: Tokens per minute (0 or less for no limit)
+        """
+        self.name = name
+        self.concurrency = concurrency
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.active = 0
+        self._waiters: List[Tuple[int, int]] = []
+        self._sequence = itertools.count()
+        self._changed: Optional[asyncio.Event] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _event(self) -> asyncio.Event:
+        """
+        Returns the change event of the running event loop.
+
+        Worker processes run each job on a fresh loop, so state bound to a
+        previous loop is reset instead of reused.
+
+        Returns:
+            asyncio.Event: The event set whenever admission state changes
+        """
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._changed = asyncio.Event()
+            self._waiters = []
+            self.active = 0
+        return self._changed
+
+    def _notify(self) -> None:
+        """
+        Wakes every waiter so the head of the queue can re-check admission.
+        """
+        if self._changed is not None:
+            self._changed.set()
+            self._changed = asyncio.Event()
+
+    async def acquire(self, tokens: int, priority: int, timeout: float) -> None:
+        """
+        Waits until a call may start.
+
+        Args:
+            tokens: Tokens charged up front for the call
+            priority: Priority class (lower is admitted first)
+            timeout: Maximum seconds to wait
+
+        Raises:
+            AdmissionTimeout: If the call is not admitted within the timeout
+        """
+        self._event()
+        ticket = (priority, next(self._sequence))
+        heapq.heappush(self._waiters, ticket)
+        start = time.monotonic()
+        deadline = start + timeout
+        try:
+            while True:
+                wait: Optional[float] = None
+                if self._waiters[0] == ticket and (self.concurrency <= 0 or self.active < self.concurrency):
+                    wait = max(self.requests.time_until(1), self.tokens.time_until(tokens))
+                    if wait <= 0:
+                        heapq.heappop(self._waiters)
+                        self.requests.consume(1)
+                        self.tokens.consume(tokens)
+                        self.active += 1
+                        metrics.observe(f"admission.wait_ms.{self.name}", (time.monotonic() - start) * 1000)
+                        # The next waiter is now at the head of the queue
+                        self._notify()
+                        return
+
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    metrics.increment(f"admission.timeout.{self.name}")
+                    raise AdmissionTimeout(f"Timed out waiting {timeout:.1f}s for {self.name} admission")
+
+                event = self._event()
+                try:
+                    await asyncio.wait_for(event.wait(), min(wait, remaining) if wait is not None else remaining)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            if ticket in self._waiters:
+                self._waiters.remove(ticket)
+                heapq.heapify(self._waiters)
+                self._notify()
+
+    def configure(self, concurrency: int, rpm: float, tpm: float) -> None:
+        """
+        Changes the limits in place, keeping calls in flight and queued waiters.
+
+        Args:
+            concurrency: Maximum number of calls in flight (0 or less for no limit)
+            rpm: Requests per minute (0 or less for no limit)
+            tpm: Tokens per minute (0 or less for no limit)
+        """
+        self.concurrency = concurrency
+        self.requests.set_rate(rpm)
+        self.tokens.set_rate(tpm)
+        self._notify()
+
+    def release(self, extra_tokens: int = 0) -> None:
+        """
+        Ends a call and charges tokens it used beyond its up-front estimate.
+
+        Args:
+            extra_tokens: Tokens used beyond the estimate (negative refunds)
+        """
+        self.active = max(0, self.active - 1)
+        self.tokens.consume(extra_tokens)
+        self._notify()
+
+
+class Permit:
+    """
+    Handle of an admitted call, used to report the tokens it actually used.
+    """
+
+    def __init__(self, charged_tokens: int):
+        self.charged_tokens = charged_tokens
+        self.used_tokens: Optional[int] = None
+
+    def record_tokens(self, used_tokens: int) -> None:
+        """
+        Records the tokens the call actually used.
+
+        Args:
+            used_tokens: Prompt and output tokens of the call
+        """
+        self.used_tokens = used_tokens
+
+
+class AdmissionController:
+    """
+    Shared admission layer keyed per provider and model.
+
+    Interactive queries and ingest go through the same limiters so their
+    combined load stays within the provider quotas instead of tripping rate
+    limits, and interactive calls are admitted ahead of queued ingest calls.
+    """
+
+    def __init__(
+        self,
+        limits: Dict[str, Dict[str, float]] = settings.LLM_PROVIDER_LIMITS,
+        share: float = 1.0,
+    ):
+        """
+        Initializes the admission controller.
+
+        Args:
+            limits: Limits ("concurrency", "rpm", "tpm") keyed by "provider:model" or "provider"
+            share: Fraction of each quota available to this process
+        """
+        self.limits = limits
+        self.share = share
+        self._limiters: Dict[str, AdmissionLimiter] = {}
+
+    def set_share(self, share: float) -> None:
+        """
+        Sets the fraction of each quota available to this process.
+
+        Extraction worker processes split LLM_ADMISSION_WORKER_SHARE for their
+        ingest-only calls and the API process keeps the remainder, so together
+        they stay within one quota.
+        Existing limiters are reconfigured in place, so calls in flight stay counted.
+
+        Args:
+            share: Fraction of each quota, between 0 and 1
+        """
+        self.share = share
+        for key, limiter in self._limiters.items():
+            limiter.configure(*self._limits_for(key))
+
+    def _limits_for(self, key: str) -> Tuple[int, float, float]:
+        """
+        Returns the limits of a provider/model key, scaled by the share.
+
+        Args:
+            key: "provider:model" or "provider"
+
+        Returns:
+            Tuple[int, float, float]: Concurrency, requests per minute and tokens per minute
+        """
+        limits = self.limits.get(key) or self.limits.get(key.split(":", 1)[0]) or {}
+        concurrency = max(1, int(limits.get("concurrency", 0) * self.share)) if limits.get("concurrency") else 0
+        return concurrency, limits.get("rpm", 0) * self.share, limits.get("tpm", 0) * self.share
+
+    def limiter(self, provider: str, model: Optional[str] = None) -> AdmissionLimiter:
+        """
+        Returns the limiter of a provider/model, creating it on first use.
+
+        Args:
+            provider: The provider name (gemini, anthropic, openai)
+            model: The model name (None for the provider's default)
+
+        Returns:
+            AdmissionLimiter: The limiter
+        """
+        key = f"{provider}:{model}" if model else provider
+        limiter = self._limiters.get(key)
+        if limiter is None:
+            concurrency, rpm, tpm = self._limits_for(key)
+            limiter = self._limiters[key] = AdmissionLimiter(key, concurrency=concurrency, rpm=rpm, tpm=tpm)
+        return limiter
+
+    @asynccontextmanager
+    async def admit(
+        self,
+        provider: str,
+        model: Optional[str] = None,
+        tokens: int = 0,
+        priority: int = PRIORITY_INTERACTIVE,
+        timeout: Optional[float] = None,
+    ) -> AsyncIterator[Permit]:
+        """
+        Admits a call, holding a concurrency slot until the block exits.
+
+        Args:
+            provider: The provider name
+            model: The model name (None for the provider's default)
+            tokens: Estimated tokens of the call, charged up front
+            priority: Priority class (PRIORITY_INTERACTIVE or PRIORITY_INGEST)
+            timeout: Maximum seconds to wait (defaults by priority class)
+
+        Yields:
+            Permit: Handle to report the tokens actually used
+
+        Raises:
+            AdmissionTimeout: If the call is not admitted within the timeout
+        """
+        if timeout is None:
+            timeout = (
+                settings.LLM_ADMISSION_INTERACTIVE_TIMEOUT_SECONDS
+                if priority <= PRIORITY_INTERACTIVE
+                else settings.LLM_ADMISSION_INGEST_TIMEOUT_SECONDS
+            )
+        limiter = self.limiter(provider, model)
+        try:
+            await limiter.acquire(tokens, priority, timeout)
+        except AdmissionTimeout as e:
+            logger.error(f"Admission timeout: {e}")
+            raise
+
+        permit = Permit(tokens)
+        try:
+            yield permit
+        finally:
+            extra = permit.used_tokens - tokens if permit.used_tokens is not None else 0
+            limiter.release(extra)
+
+
+# Global instance of the admission controller
+admission = AdmissionController()
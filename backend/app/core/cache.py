@@ -0,0 +1,107 @@
+"""
+In-process caching utilities.
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Generic, Hashable, Optional, Tuple, TypeVar
+
+V = TypeVar("V")
+
+
+class TTLCache(Generic[V]):
+    """
+    Bounded in-memory cache with per-entry expiry and LRU eviction.
+
+    Entries expire ttl_seconds after they are written, and the least recently
+    used entry is evicted once max_size is reached. Safe to use from the event
+    loop and from worker threads.
+    """
+
+    def __init__(self, max_size: int, ttl_seconds: float):
+        """
+        Initializes the cache.
+
+        Args:
+            max_size: Maximum number of entries to keep
+            ttl_seconds: Lifetime of an entry in seconds (0 or less disables expiry)
+        """
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Hashable, Tuple[float, V]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[V]:
+        """
+        Returns a cached value if present and not expired.
+
+        Args:
+            key: The cache key
+
+        Returns:
+            Optional[V]: The cached value, or None on a miss
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at and expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: Hashable, value: V) -> None:
+        """
+        Stores a value, evicting the least recently used entry if full.
+
+        Args:
+            key: The cache key
+            value: The value to store
+        """
+        expires_at = time.monotonic() + self.ttl_seconds if self.ttl_seconds > 0 else 0.0
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, key: Hashable) -> None:
+        """
+        Removes a single entry.
+
+        Args:
+            key: The cache key
+        """
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def invalidate_where(self, predicate: Callable[[Hashable, V], bool]) -> int:
+        """
+        Removes every entry matching a predicate.
+
+        Args:
+            predicate: Called with (key, value); entries returning True are removed
+
+        Returns:
+            int: Number of entries removed
+        """
+        with self._lock:
+            stale = [key for key, (_, value) in self._entries.items() if predicate(key, value)]
+            for key in stale:
+                del self._entries[key]
+            return len(stale)
+
+    def clear(self) -> None:
+        """
+        Removes all entries.
+        """
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: Any) -> bool:
+        return self.get(key) is not None
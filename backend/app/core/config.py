@@ -1,5 +1,5 @@
 import os
-from typing import Dict, Optional
+from typing import Dict, List, Optional
 
 from dotenv import load_dotenv
 from pydantic import Field
@@ -19,6 +19,8 @@ class Settings(BaseSettings):
     # API Configuration
     API_V1_STR: str = "/api/v1"
     PROJECT_NAME: str = "VoxAI Backend"
+    # Bearer token required by /metrics (the endpoint is disabled when unset)
+    METRICS_TOKEN: Optional[str] = Field(None, env="METRICS_TOKEN")
 
     # CORS Configuration
     BACKEND_CORS_ORIGINS: list[str] = ["*"]
@@ -44,6 +46,120 @@ class Settings(BaseSettings):
     # Code Execution Sandbox Configuration
     CODE_SANDBOX_URL: str = Field("http://localhost:8001", env="CODE_SANDBOX_URL")
 
+    # Remote Image Fetching Configuration (Markdown ingest)
+    IMAGE_FETCH_CONCURRENCY: int = Field(8, env="IMAGE_FETCH_CONCURRENCY")
+    IMAGE_FETCH_MAX_BYTES: int = Field(10 * 1024 * 1024, env="IMAGE_FETCH_MAX_BYTES")
+    IMAGE_FETCH_TIMEOUT_SECONDS: float = Field(10.0, env="IMAGE_FETCH_TIMEOUT_SECONDS")
+    IMAGE_FETCH_CACHE_DIR: str = Field("cache/images", env="IMAGE_FETCH_CACHE_DIR")
+    IMAGE_FETCH_CACHE_MAX_MB: int = Field(1024, env="IMAGE_FETCH_CACHE_MAX_MB")
+
+    # Extraction Executor Configuration (0 workers runs extraction in the API process)
+    EXTRACTION_PROCESS_WORKERS: int = Field(2, env="EXTRACTION_PROCESS_WORKERS")
+    EXTRACTION_TIMEOUT_SECONDS: float = Field(600.0, env="EXTRACTION_TIMEOUT_SECONDS")
+    EXTRACTION_MEMORY_LIMIT_MB: int = Field(4096, env="EXTRACTION_MEMORY_LIMIT_MB")
+
+    # Workload Executor Configuration (thread pools for blocking calls, per workload class)
+    EXECUTOR_RETRIEVAL_WORKERS: int = Field(16, env="EXECUTOR_RETRIEVAL_WORKERS")
+    EXECUTOR_INGEST_NETWORK_WORKERS: int = Field(8, env="EXECUTOR_INGEST_NETWORK_WORKERS")
+    EXECUTOR_INGEST_CPU_WORKERS: int = Field(4, env="EXECUTOR_INGEST_CPU_WORKERS")
+
+    # Ingestion Configuration
+    INGEST_DEFER_VISION: bool = Field(True, env="INGEST_DEFER_VISION")
+    INGEST_CHECKPOINT_PATH: str = Field("data/ingest_checkpoints.sqlite3", env="INGEST_CHECKPOINT_PATH")
+    INGEST_CHECKPOINT_TTL_SECONDS: float = Field(7 * 24 * 3600.0, env="INGEST_CHECKPOINT_TTL_SECONDS")
+    INGEST_CHECKPOINT_MAX_BYTES: int = Field(32 * 1024 * 1024, env="INGEST_CHECKPOINT_MAX_BYTES")
+    EMBEDDING_BATCH_SIZE: int = Field(96, env="EMBEDDING_BATCH_SIZE")
+    ENRICHMENT_STATUS_MAX_ENTRIES: int = Field(10000, env="ENRICHMENT_STATUS_MAX_ENTRIES")
+    ENRICHMENT_STATUS_TTL_SECONDS: float = Field(24 * 3600.0, env="ENRICHMENT_STATUS_TTL_SECONDS")
+
+    # Query Scope Configuration (per-user cache of resolved toggled files)
+    TOGGLED_FILES_CACHE_TTL_SECONDS: float = Field(300.0, env="TOGGLED_FILES_CACHE_TTL_SECONDS")
+    TOGGLED_FILES_CACHE_MAX_USERS: int = Field(1024, env="TOGGLED_FILES_CACHE_MAX_USERS")
+    CHUNK_MANIFEST_PATH: str = Field("data/chunk_manifest.sqlite3", env="CHUNK_MANIFEST_PATH")
+    FILE_METADATA_CACHE_TTL_SECONDS: float = Field(120.0, env="FILE_METADATA_CACHE_TTL_SECONDS")
+    FILE_METADATA_CACHE_MAX_ENTRIES: int = Field(4096, env="FILE_METADATA_CACHE_MAX_ENTRIES")
+    SOURCE_SNIPPET_CHARS: int = Field(280, env="SOURCE_SNIPPET_CHARS")
+    SOURCE_PAYLOAD_CACHE_TTL_SECONDS: float = Field(900.0, env="SOURCE_PAYLOAD_CACHE_TTL_SECONDS")
+    SOURCE_PAYLOAD_CACHE_MAX_ENTRIES: int = Field(256, env="SOURCE_PAYLOAD_CACHE_MAX_ENTRIES")
+
+    # Retrieval Configuration
+    RETRIEVAL_SPECULATIVE: bool = Field(True, env="RETRIEVAL_SPECULATIVE")
+    QUERY_OPTIMIZE_DEADLINE_MS: float = Field(800.0, env="QUERY_OPTIMIZE_DEADLINE_MS")
+    RETRIEVAL_CACHE_TTL_SECONDS: float = Field(600.0, env="RETRIEVAL_CACHE_TTL_SECONDS")
+    RETRIEVAL_CACHE_MAX_ENTRIES: int = Field(2048, env="RETRIEVAL_CACHE_MAX_ENTRIES")
+    QUERY_OPTIMIZE_CACHE_TTL_SECONDS: float = Field(3600.0, env="QUERY_OPTIMIZE_CACHE_TTL_SECONDS")
+    QUERY_REWRITE_LOCAL_ENABLED: bool = Field(True, env="QUERY_REWRITE_LOCAL_ENABLED")
+    QUERY_REWRITE_MIN_CONFIDENCE: float = Field(0.6, env="QUERY_REWRITE_MIN_CONFIDENCE")
+    QUERY_REWRITER_DICTIONARY_PATH: str = Field("data/query_dictionary.json", env="QUERY_REWRITER_DICTIONARY_PATH")
+    QUERY_REWRITER_MAX_ENTRIES: int = Field(100000, env="QUERY_REWRITER_MAX_ENTRIES")
+    QUERY_CLASSIFIER_ENABLED: bool = Field(True, env="QUERY_CLASSIFIER_ENABLED")
+    QUERY_CLASSIFIER_SHADOW: bool = Field(True, env="QUERY_CLASSIFIER_SHADOW")
+    QUERY_CLASSIFIER_THRESHOLD: float = Field(0.8, env="QUERY_CLASSIFIER_THRESHOLD")
+    RETRIEVAL_MMR_ENABLED: bool = Field(False, env="RETRIEVAL_MMR_ENABLED")
+    RETRIEVAL_MMR_FETCH_MULTIPLIER: int = Field(3, env="RETRIEVAL_MMR_FETCH_MULTIPLIER")
+    RETRIEVAL_MMR_LAMBDA: float = Field(0.7, env="RETRIEVAL_MMR_LAMBDA")
+
+    # Local Vector Tier Configuration (in-process mirror of toggled files' chunk vectors)
+    LOCAL_VECTOR_TIER_ENABLED: bool = Field(True, env="LOCAL_VECTOR_TIER_ENABLED")
+    LOCAL_VECTOR_TIER_DIR: str = Field("data/vector_tier", env="LOCAL_VECTOR_TIER_DIR")
+    LOCAL_VECTOR_TIER_QUANTIZE: bool = Field(True, env="LOCAL_VECTOR_TIER_QUANTIZE")
+    LOCAL_VECTOR_TIER_MAX_VECTORS: int = Field(200000, env="LOCAL_VECTOR_TIER_MAX_VECTORS")
+    LOCAL_VECTOR_TIER_MAX_DISK_MB: int = Field(2048, env="LOCAL_VECTOR_TIER_MAX_DISK_MB")
+
+    # Context Packing Configuration (token budget per model family)
+    CONTEXT_TOKEN_BUDGETS: Dict[str, int] = Field(
+        {"gemini": 24000, "anthropic": 16000, "openai": 12000}, env="CONTEXT_TOKEN_BUDGETS"
+    )
+    CONTEXT_MIN_RELATIVE_SCORE: float = Field(0.5, env="CONTEXT_MIN_RELATIVE_SCORE")
+    CONTEXT_MAX_OVERLAP_CHARS: int = Field(400, env="CONTEXT_MAX_OVERLAP_CHARS")
+
+    # Streaming Configuration
+    STREAM_DISCONNECT_POLL_SECONDS: float = Field(0.5, env="STREAM_DISCONNECT_POLL_SECONDS")
+    SSE_COALESCE_WINDOW_MS: float = Field(30.0, env="SSE_COALESCE_WINDOW_MS")
+    SSE_COALESCE_MAX_CHARS: int = Field(256, env="SSE_COALESCE_MAX_CHARS")
+    SSE_HEARTBEAT_SECONDS: float = Field(5.0, env="SSE_HEARTBEAT_SECONDS")
+
+    # LLM Hedging Configuration (backup provider started when the primary is in its slow tail)
+    LLM_HEDGING_ENABLED: bool = Field(False, env="LLM_HEDGING_ENABLED")
+    LLM_HEDGE_PERCENTILE: float = Field(95.0, env="LLM_HEDGE_PERCENTILE")
+    LLM_HEDGE_MIN_DELAY_MS: float = Field(300.0, env="LLM_HEDGE_MIN_DELAY_MS")
+    LLM_HEDGE_DEFAULT_DELAY_MS: float = Field(2000.0, env="LLM_HEDGE_DEFAULT_DELAY_MS")
+    LLM_HEDGE_BACKUPS: Dict[str, str] = Field(
+        {"gemini": "openai", "anthropic": "gemini", "openai": "gemini"}, env="LLM_HEDGE_BACKUPS"
+    )
+
+    # LLM Admission Configuration (limits keyed by "provider:model" or "provider"). Limits are
+    # enforced per API process (plus its extraction workers): when running several API
+    # processes, divide them by the process count so the fleet stays within the quota
+    LLM_PROVIDER_LIMITS: Dict[str, Dict[str, float]] = Field(
+        {
+            "gemini": {"concurrency": 32, "rpm": 2000, "tpm": 4000000},
+            "anthropic": {"concurrency": 16, "rpm": 50, "tpm": 40000},
+            "openai": {"concurrency": 32, "rpm": 500, "tpm": 200000},
+        },
+        env="LLM_PROVIDER_LIMITS",
+    )
+    LLM_ADMISSION_OUTPUT_TOKENS: int = Field(512, env="LLM_ADMISSION_OUTPUT_TOKENS")
+    LLM_ADMISSION_VISION_TOKENS: int = Field(1024, env="LLM_ADMISSION_VISION_TOKENS")
+    LLM_ADMISSION_INTERACTIVE_TIMEOUT_SECONDS: float = Field(20.0, env="LLM_ADMISSION_INTERACTIVE_TIMEOUT_SECONDS")
+    LLM_ADMISSION_INGEST_TIMEOUT_SECONDS: float = Field(600.0, env="LLM_ADMISSION_INGEST_TIMEOUT_SECONDS")
+    # Fraction of each quota reserved for extraction workers' vision calls, split between the
+    # workers; the API process keeps the remainder when the worker pool is enabled
+    LLM_ADMISSION_WORKER_SHARE: float = Field(0.25, env="LLM_ADMISSION_WORKER_SHARE")
+
+    # Model Routing Configuration (model_name="auto"; candidates are "provider:model")
+    MODEL_ROUTING_TIERS: Dict[str, List[str]] = Field(
+        {
+            "fast": ["gemini:gemini-1.5-flash-8b", "openai:gpt-4o-mini"],
+            "standard": ["gemini:gemini-1.5-flash", "openai:gpt-4o-mini"],
+            "heavy": ["anthropic:claude-3-opus-20240229", "openai:gpt-4-turbo", "gemini:gemini-1.5-pro"],
+        },
+        env="MODEL_ROUTING_TIERS",
+    )
+    MODEL_ROUTING_STANDARD_CONTEXT_TOKENS: int = Field(4000, env="MODEL_ROUTING_STANDARD_CONTEXT_TOKENS")
+    MODEL_ROUTING_HEAVY_CONTEXT_TOKENS: int = Field(12000, env="MODEL_ROUTING_HEAVY_CONTEXT_TOKENS")
+    MODEL_ROUTING_MAX_P95_MS: float = Field(4000.0, env="MODEL_ROUTING_MAX_P95_MS")
+
     class Config:
         case_sensitive = True
         env_file = ".env"
@@ -0,0 +1,125 @@
+"""
+Workload-isolated thread pools for blocking calls.
+"""
+import asyncio
+import contextvars
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional, TypeVar
+
+from app.core.config import settings
+from app.core.metrics import metrics
+
+T = TypeVar("T")
+
+
+class WorkloadExecutor:
+    """
+    Named thread pool for one class of blocking work.
+
+    Each workload class gets its own pool instead of sharing the default
+    asyncio.to_thread executor, so a burst of ingest work cannot occupy the
+    threads interactive retrieval needs. The queue depth and queue wait of
+    every submission are recorded per pool.
+    """
+
+    def __init__(self, name: str, max_workers: int):
+        """
+        Initializes the executor.
+
+        Args:
+            name: Workload name, used in thread names and metrics
+            max_workers: Number of threads in the pool
+        """
+        self.name = name
+        self.max_workers = max_workers
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._queued = 0
+        self._lock = threading.Lock()
+
+    def _get_pool(self) -> ThreadPoolExecutor:
+        """
+        Returns the thread pool, creating it on first use or after a shutdown.
+
+        Returns:
+            ThreadPoolExecutor: The pool
+        """
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(
+                    max_workers=self.max_workers, thread_name_prefix=f"{self.name}-worker"
+                )
+            return self._pool
+
+    @property
+    def queued(self) -> int:
+        """
+        Returns the number of submitted calls waiting for a thread.
+
+        Returns:
+            int: The queue depth
+        """
+        return self._queued
+
+    async def run(self, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """
+        Runs a blocking function in the pool, like asyncio.to_thread.
+
+        Args:
+            fn: The blocking function
+            *args: Positional arguments for fn
+            **kwargs: Keyword arguments for fn
+
+        Returns:
+            T: The return value of fn
+        """
+        loop = asyncio.get_running_loop()
+        context = contextvars.copy_context()
+        submitted = time.monotonic()
+        with self._lock:
+            self._queued += 1
+            depth = self._queued
+        metrics.observe(f"executor.{self.name}.queue_depth", depth)
+
+        started = False
+
+        def dequeue() -> None:
+            nonlocal started
+            with self._lock:
+                if not started:
+                    started = True
+                    self._queued -= 1
+
+        def call() -> T:
+            dequeue()
+            metrics.observe(f"executor.{self.name}.wait_ms", (time.monotonic() - submitted) * 1000)
+            return context.run(fn, *args, **kwargs)
+
+        try:
+            return await loop.run_in_executor(self._get_pool(), call)
+        finally:
+            # A call cancelled while queued never runs, so it leaves the queue here
+            dequeue()
+
+    def shutdown(self) -> None:
+        """
+        Shuts the pool down without waiting for running calls.
+
+        A later call starts a new pool, so the executor survives an application
+        restart in the same process.
+        """
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+
+# Interactive retrieval: query embeddings, vector searches and metadata lookups
+retrieval_executor = WorkloadExecutor("retrieval", settings.EXECUTOR_RETRIEVAL_WORKERS)
+
+# Ingest network calls: vector upserts, deletes and fetches
+ingest_network_executor = WorkloadExecutor("ingest-network", settings.EXECUTOR_INGEST_NETWORK_WORKERS)
+
+# Ingest disk and CPU work: checkpoints, manifests and local vector files
+ingest_cpu_executor = WorkloadExecutor("ingest-cpu", settings.EXECUTOR_INGEST_CPU_WORKERS)
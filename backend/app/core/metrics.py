@@ -0,0 +1,111 @@
+"""
+Lightweight in-process metrics: counters and rolling histograms.
+"""
+import threading
+from collections import defaultdict, deque
+from typing import Any, Deque, Dict, Iterable
+
+
+class MetricsRegistry:
+    """
+    Registry of named counters and rolling-window histograms.
+
+    Histograms keep the most recent window_size observations, which is enough
+    to report recent percentiles without an external metrics backend.
+    """
+
+    def __init__(self, window_size: int = 1024):
+        """
+        Initializes the registry.
+
+        Args:
+            window_size: Number of recent observations kept per histogram
+        """
+        self.window_size = window_size
+        self._counters: Dict[str, float] = defaultdict(float)
+        self._histograms: Dict[str, Deque[float]] = {}
+        self._lock = threading.Lock()
+
+    def increment(self, name: str, value: float = 1.0) -> None:
+        """
+        Increments a counter.
+
+        Args:
+            name: Counter name
+            value: Amount to add
+        """
+        with self._lock:
+            self._counters[name] += value
+
+    def observe(self, name: str, value: float) -> None:
+        """
+        Records an observation in a histogram.
+
+        Args:
+            name: Histogram name
+            value: Observed value
+        """
+        with self._lock:
+            histogram = self._histograms.get(name)
+            if histogram is None:
+                histogram = self._histograms[name] = deque(maxlen=self.window_size)
+            histogram.append(value)
+
+    def percentile(self, name: str, q: float) -> float:
+        """
+        Returns a percentile of a histogram's recent observations.
+
+        Args:
+            name: Histogram name
+            q: Percentile between 0 and 100
+
+        Returns:
+            float: The percentile value, or 0.0 if nothing was observed
+        """
+        with self._lock:
+            values = sorted(self._histograms.get(name, ()))
+        return self._percentile(values, q)
+
+    @staticmethod
+    def _percentile(sorted_values: Iterable[float], q: float) -> float:
+        """
+        Computes a nearest-rank percentile over sorted values.
+
+        Args:
+            sorted_values: Observations in ascending order
+            q: Percentile between 0 and 100
+
+        Returns:
+            float: The percentile value, or 0.0 for no observations
+        """
+        values = list(sorted_values)
+        if not values:
+            return 0.0
+        rank = min(len(values) - 1, max(0, int(round(q / 100.0 * (len(values) - 1)))))
+        return values[rank]
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Returns the current counters and histogram summaries.
+
+        Returns:
+            Dict[str, Any]: Counters and count/mean/p50/p95/p99 per histogram
+        """
+        with self._lock:
+            counters = dict(self._counters)
+            histograms = {name: sorted(values) for name, values in self._histograms.items()}
+
+        summaries = {}
+        for name, values in histograms.items():
+            summaries[name] = {
+                "count": len(values),
+                "mean": sum(values) / len(values) if values else 0.0,
+                "p50": self._percentile(values, 50),
+                "p95": self._percentile(values, 95),
+                "p99": self._percentile(values, 99),
+            }
+        return {"counters": counters, "histograms": summaries}
+
+
+# Global metrics registry
+metrics = MetricsRegistry()
@@ -0,0 +1,75 @@
+"""
+Single-flight deduplication of concurrent identical work.
+"""
+import asyncio
+from typing import Awaitable, Callable, Dict, Generic, Hashable, TypeVar
+
+from app.core.metrics import metrics
+
+T = TypeVar("T")
+
+
+class SingleFlight(Generic[T]):
+    """
+    Runs at most one computation per key at a time.
+
+    Callers that arrive while a computation for their key is in flight await
+    it and share its result (or exception) instead of starting their own. The
+    computation runs as its own task, so a caller that is cancelled (e.g. a
+    disconnected client) does not cancel it for the others.
+    """
+
+    def __init__(self, name: str):
+        """
+        Initializes the single-flight group.
+
+        Args:
+            name: Name used in metrics
+        """
+        self.name = name
+        self._calls: Dict[Hashable, "asyncio.Future[T]"] = {}
+
+    def _done(self, key: Hashable, future: "asyncio.Future[T]") -> None:
+        if self._calls.get(key) is future:
+            del self._calls[key]
+        # Mark the exception as retrieved in case every caller was cancelled
+        if not future.cancelled():
+            future.exception()
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        """
+        Runs fn for key, or joins the computation already in flight for key.
+
+        Args:
+            key: Identity of the work
+            fn: Starts the computation
+
+        Returns:
+            T: The result of the computation
+        """
+        future = self._calls.get(key)
+        if future is not None and future.get_loop() is asyncio.get_running_loop():
+            metrics.increment(f"singleflight.{self.name}.shared")
+        else:
+            future = asyncio.ensure_future(fn())
+            self._calls[key] = future
+            future.add_done_callback(lambda done: self._done(key, done))
+        return await asyncio.shield(future)
+
+    def forget_where(self, predicate: Callable[[Hashable], bool]) -> int:
+        """
+        Stops sharing in-flight computations whose key matches a predicate.
+
+        The computations keep running for the callers already waiting on them,
+        but new callers start a fresh computation.
+
+        Args:
+            predicate: Called with each in-flight key
+
+        Returns:
+            int: Number of computations forgotten
+        """
+        keys = [key for key in self._calls if predicate(key)]
+        for key in keys:
+            del self._calls[key]
+        return len(keys)
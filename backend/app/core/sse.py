@@ -0,0 +1,129 @@
+"""
+Server-sent event framing for streamed answers.
+"""
+import asyncio
+import json
+import time
+from typing import Any, AsyncGenerator, Optional
+
+from app.core.config import settings
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is an optional speedup
+    orjson = None
+
+# Comment line ignored by SSE clients, sent to keep idle connections open
+HEARTBEAT = ": ping\n\n"
+
+
+def encode_event(payload: Any) -> str:
+    """
+    Encodes a payload as an SSE data event.
+
+    Args:
+        payload: The JSON-serializable payload
+
+    Returns:
+        str: The framed event
+    """
+    if orjson is not None:
+        data = orjson.dumps(payload).decode("utf-8")
+    else:
+        data = json.dumps(payload, ensure_ascii=False, separators=(",", ":"))
+    return f"data: {data}\n\n"
+
+
+async def coalesce(
+    chunks: AsyncGenerator[str, None],
+    window_ms: float = settings.SSE_COALESCE_WINDOW_MS,
+    max_chars: int = settings.SSE_COALESCE_MAX_CHARS,
+) -> AsyncGenerator[str, None]:
+    """
+    Merges stream chunks that arrive within a short window into one frame.
+
+    The first chunk is passed through immediately so time to first token is
+    unchanged; later chunks are buffered until the window since the oldest
+    buffered chunk elapses or the buffer reaches max_chars.
+
+    Args:
+        chunks: The chunk stream
+        window_ms: Maximum time a chunk is held back
+        max_chars: Buffer size that forces a flush
+
+    Yields:
+        str: Coalesced chunks
+    """
+    window = window_ms / 1000.0
+    buffer = []
+    buffered = 0
+    deadline = 0.0
+    first = True
+    pending: Optional[asyncio.Future] = None
+    try:
+        while True:
+            if pending is None:
+                pending = asyncio.ensure_future(chunks.__anext__())
+            timeout = max(0.0, deadline - time.monotonic()) if buffer else None
+            # The pending read survives a flush, so no chunk is lost or cancelled
+            done, _ = await asyncio.wait({pending}, timeout=timeout)
+            if not done:
+                yield "".join(buffer)
+                buffer, buffered = [], 0
+                continue
+
+            try:
+                chunk = pending.result()
+            except StopAsyncIteration:
+                break
+            finally:
+                pending = None
+
+            if first:
+                first = False
+                yield chunk
+                continue
+            if not buffer:
+                deadline = time.monotonic() + window
+            buffer.append(chunk)
+            buffered += len(chunk)
+            if buffered >= max_chars:
+                yield "".join(buffer)
+                buffer, buffered = [], 0
+
+        if buffer:
+            yield "".join(buffer)
+    finally:
+        if pending is not None and not pending.done():
+            pending.cancel()
+            await asyncio.gather(pending, return_exceptions=True)
+        await chunks.aclose()
+
+
+async def heartbeats(
+    task: "asyncio.Future[Any]", interval: float = settings.SSE_HEARTBEAT_SECONDS
+) -> AsyncGenerator[str, None]:
+    """
+    Yields heartbeat comments until a task completes.
+
+    Used while retrieval runs before the first event, so proxies and clients
+    do not treat the silent connection as dead. The task is cancelled if the
+    stream is closed first.
+
+    Args:
+        task: The task to wait for (its result is read by the caller)
+        interval: Seconds between heartbeats
+
+    Yields:
+        str: Heartbeat comments
+    """
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=interval)
+            if done:
+                return
+            yield HEARTBEAT
+    finally:
+        if not task.done():
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
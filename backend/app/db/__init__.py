@@ -1,7 +1,9 @@
 """
-Database client modules for Supabase and Pinecone.
+Database client modules for Supabase, Pinecone and local ingestion state.
 """
+from app.db.checkpoints import checkpoint_store
+from app.db.chunk_manifest import chunk_manifest
 from app.db.pinecone import pinecone_client
 from app.db.supabase import supabase_client
 
-__all__ = ["pinecone_client", "supabase_client"] 
\ No newline at end of file
+__all__ = ["checkpoint_store", "chunk_manifest", "pinecone_client", "supabase_client"] 
\ No newline at end of file
@@ -0,0 +1,273 @@
+"""
+Checkpoint store module for resumable file ingestion.
+"""
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, List, Optional
+
+from app.core.config import settings
+from app.core.executors import ingest_cpu_executor
+from app.core.logging import logger
+
+
+class CheckpointStore:
+    """
+    Durable local store for per-stage ingestion checkpoints.
+
+    Each file being ingested gets one row per completed stage (fetched, extracted,
+    described, chunked, embedded:N, upserted:N). A retried ingest reads these rows
+    and resumes after the last completed step instead of re-running the pipeline.
+
+    Stages derived from the file content are keyed by a content version (see
+    content_key), so a changed file never resumes from the old content's
+    output. Rows expire after ttl_seconds and values larger than max_bytes are not stored.
+    """
+
+    # Minimum seconds between sweeps of expired rows
+    PURGE_INTERVAL_SECONDS = 3600.0
+
+    def __init__(
+        self,
+        path: str = settings.INGEST_CHECKPOINT_PATH,
+        ttl_seconds: float = settings.INGEST_CHECKPOINT_TTL_SECONDS,
+        max_bytes: int = settings.INGEST_CHECKPOINT_MAX_BYTES,
+    ) -> None:
+        """
+        Initializes the checkpoint store.
+
+        Args:
+            path: Path of the SQLite database file.
+            ttl_seconds: Lifetime of a checkpoint in seconds (0 or less disables expiry).
+            max_bytes: Largest value stored by put_bytes and put_json.
+        """
+        self.path = Path(path)
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self._connection: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._purged_at = 0.0
+
+    def _connect(self) -> sqlite3.Connection:
+        """
+        Returns the SQLite connection, creating the database on first use.
+
+        Returns:
+            sqlite3.Connection: The open connection.
+        """
+        if self._connection is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            connection = sqlite3.connect(self.path, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute(
+                """
+                CREATE TABLE IF NOT EXISTS checkpoints (
+                    file_id TEXT NOT NULL,
+                    stage TEXT NOT NULL,
+                    value BLOB,
+                    updated_at REAL NOT NULL,
+                    PRIMARY KEY (file_id, stage)
+                )
+                """
+            )
+            connection.execute("CREATE INDEX IF NOT EXISTS checkpoints_updated_at ON checkpoints (updated_at)")
+            connection.commit()
+            self._connection = connection
+            logger.info(f"Ingestion checkpoint store opened at {self.path}")
+        return self._connection
+
+    def _expiry(self) -> float:
+        """
+        Returns the oldest updated_at that is still valid (0 without expiry).
+        """
+        return time.time() - self.ttl_seconds if self.ttl_seconds > 0 else 0.0
+
+    def _purge_expired(self, connection: sqlite3.Connection) -> None:
+        """
+        Deletes expired rows, at most once per PURGE_INTERVAL_SECONDS (blocking, lock held).
+        """
+        now = time.monotonic()
+        if self.ttl_seconds <= 0 or now - self._purged_at < self.PURGE_INTERVAL_SECONDS:
+            return
+        self._purged_at = now
+        removed = connection.execute("DELETE FROM checkpoints WHERE updated_at < ?", (self._expiry(),)).rowcount
+        if removed:
+            logger.info(f"Removed {removed} expired ingestion checkpoints")
+
+    def _put(self, file_id: str, stage: str, value: Optional[bytes]) -> None:
+        """
+        Writes a checkpoint row (blocking).
+        """
+        with self._lock:
+            connection = self._connect()
+            connection.execute(
+                "INSERT OR REPLACE INTO checkpoints (file_id, stage, value, updated_at) VALUES (?, ?, ?, ?)",
+                (file_id, stage, value, time.time()),
+            )
+            self._purge_expired(connection)
+            connection.commit()
+
+    def _get(self, file_id: str, stage: str) -> Optional[tuple]:
+        """
+        Reads a checkpoint row (blocking).
+        """
+        with self._lock:
+            cursor = self._connect().execute(
+                "SELECT value FROM checkpoints WHERE file_id = ? AND stage = ? AND updated_at >= ?",
+                (file_id, stage, self._expiry()),
+            )
+            return cursor.fetchone()
+
+    def _clear(self, file_id: str) -> None:
+        """
+        Deletes all checkpoint rows for a file and its content versions (blocking).
+        """
+        with self._lock:
+            connection = self._connect()
+            connection.execute(
+                "DELETE FROM checkpoints WHERE file_id = ? OR substr(file_id, 1, ?) = ?",
+                (file_id, len(file_id) + 1, f"{file_id}@"),
+            )
+            connection.commit()
+
+    def _stages(self, file_id: str) -> List[str]:
+        """
+        Lists checkpoint stages for a file (blocking).
+        """
+        with self._lock:
+            cursor = self._connect().execute(
+                "SELECT stage FROM checkpoints WHERE file_id = ? AND updated_at >= ? ORDER BY updated_at",
+                (file_id, self._expiry()),
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+    @staticmethod
+    def _content_key(file_id: str, content: bytes) -> str:
+        return f"{file_id}@{hashlib.sha256(content).hexdigest()[:16]}"
+
+    async def content_key(self, file_id: str, content: bytes) -> str:
+        """
+        Returns the checkpoint key of a file's current content.
+
+        Args:
+            file_id: The ID of the file being ingested.
+            content: The raw file content.
+
+        Returns:
+            str: The file ID qualified with a hash of the content.
+        """
+        return await ingest_cpu_executor.run(self._content_key, file_id, content)
+
+    async def put_bytes(self, file_id: str, stage: str, value: bytes) -> None:
+        """
+        Stores raw bytes for a completed stage, unless they exceed max_bytes.
+
+        Args:
+            file_id: The ID of the file being ingested.
+            stage: The stage name.
+            value: The stage output.
+        """
+        if len(value) > self.max_bytes:
+            logger.info(f"Not checkpointing {len(value)} bytes for stage {stage} of file {file_id}")
+            return
+        await ingest_cpu_executor.run(self._put, file_id, stage, value)
+
+    async def get_bytes(self, file_id: str, stage: str) -> Optional[bytes]:
+        """
+        Returns raw bytes stored for a stage.
+
+        Args:
+            file_id: The ID of the file being ingested.
+            stage: The stage name.
+
+        Returns:
+            Optional[bytes]: The stage output, or None if the stage has not completed.
+        """
+        row = await ingest_cpu_executor.run(self._get, file_id, stage)
+        return bytes(row[0]) if row and row[0] is not None else None
+
+    async def put_json(self, file_id: str, stage: str, value: Any) -> None:
+        """
+        Stores a JSON-serializable value for a completed stage, unless it exceeds max_bytes.
+
+        Args:
+            file_id: The ID of the file being ingested.
+            stage: The stage name.
+            value: The stage output.
+        """
+        encoded = await ingest_cpu_executor.run(lambda: json.dumps(value, default=str).encode("utf-8"))
+        await self.put_bytes(file_id, stage, encoded)
+
+    async def get_json(self, file_id: str, stage: str) -> Optional[Any]:
+        """
+        Returns the JSON value stored for a stage.
+
+        Args:
+            file_id: The ID of the file being ingested.
+            stage: The stage name.
+
+        Returns:
+            Optional[Any]: The stage output, or None if the stage has not completed.
+        """
+        value = await self.get_bytes(file_id, stage)
+        return json.loads(value) if value is not None else None
+
+    async def mark(self, file_id: str, stage: str) -> None:
+        """
+        Marks a stage as completed without storing output.
+
+        Args:
+            file_id: The ID of the file being ingested.
+            stage: The stage name.
+        """
+        await ingest_cpu_executor.run(self._put, file_id, stage, None)
+
+    async def has(self, file_id: str, stage: str) -> bool:
+        """
+        Checks whether a stage has completed.
+
+        Args:
+            file_id: The ID of the file being ingested.
+            stage: The stage name.
+
+        Returns:
+            bool: True if the stage has a checkpoint.
+        """
+        return await ingest_cpu_executor.run(self._get, file_id, stage) is not None
+
+    async def stages(self, file_id: str) -> List[str]:
+        """
+        Lists the completed stages for a file, oldest first.
+
+        Args:
+            file_id: The ID of the file being ingested.
+
+        Returns:
+            List[str]: The completed stage names.
+        """
+        return await ingest_cpu_executor.run(self._stages, file_id)
+
+    async def clear(self, file_id: str) -> None:
+        """
+        Removes all checkpoints for a file, for every content version, once its ingestion has finished.
+
+        Args:
+            file_id: The ID of the file being ingested.
+        """
+        await ingest_cpu_executor.run(self._clear, file_id)
+
+    def close(self) -> None:
+        """
+        Closes the SQLite connection.
+        """
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+
+# Global instance of the checkpoint store
+checkpoint_store = CheckpointStore()
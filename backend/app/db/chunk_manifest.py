@@ -0,0 +1,251 @@
+"""
+Chunk manifest module recording how many vectors each indexed file has.
+"""
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from app.core.config import settings
+from app.core.executors import ingest_cpu_executor
+from app.core.logging import logger
+
+
+class ChunkManifest:
+    """
+    Local manifest of the vectors written for each Pinecone ID.
+
+    Chunk IDs are deterministic ({pinecone_id}_chunk_{i} and
+    {pinecone_id}_enrich_{i}), so recording the counts at ingest time lets
+    callers that still need vector IDs (e.g. deletion) build them locally
+    instead of paging through index.list() for every file.
+    """
+
+    def __init__(self, path: str = settings.CHUNK_MANIFEST_PATH) -> None:
+        """
+        Initializes the chunk manifest.
+
+        Args:
+            path: Path of the SQLite database file.
+        """
+        self.path = Path(path)
+        self._connection: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        """
+        Returns the SQLite connection, creating the database on first use.
+
+        Returns:
+            sqlite3.Connection: The open connection.
+        """
+        if self._connection is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            connection = sqlite3.connect(self.path, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute(
+                """
+                CREATE TABLE IF NOT EXISTS manifest (
+                    pinecone_id TEXT PRIMARY KEY,
+                    file_id TEXT NOT NULL,
+                    chunk_count INTEGER NOT NULL DEFAULT 0,
+                    enrich_count INTEGER NOT NULL DEFAULT 0,
+                    updated_at REAL NOT NULL
+                )
+                """
+            )
+            connection.commit()
+            self._connection = connection
+            logger.info(f"Chunk manifest opened at {self.path}")
+        return self._connection
+
+    def _record(
+        self, pinecone_id: str, file_id: str, chunk_count: Optional[int], enrich_count: Optional[int]
+    ) -> None:
+        """
+        Inserts or updates a manifest row (blocking).
+
+        Args:
+            pinecone_id: The Pinecone ID of the file.
+            file_id: The ID of the file.
+            chunk_count: Number of text chunks, or None to keep the stored value.
+            enrich_count: Number of enrichment chunks, or None to keep the stored value.
+        """
+        with self._lock:
+            connection = self._connect()
+            connection.execute(
+                """
+                INSERT INTO manifest (pinecone_id, file_id, chunk_count, enrich_count, updated_at)
+                VALUES (?, ?, COALESCE(?, 0), COALESCE(?, 0), ?)
+                ON CONFLICT (pinecone_id) DO UPDATE SET
+                    file_id = excluded.file_id,
+                    chunk_count = COALESCE(?, chunk_count),
+                    enrich_count = COALESCE(?, enrich_count),
+                    updated_at = excluded.updated_at
+                """,
+                (pinecone_id, file_id, chunk_count, enrich_count, time.time(), chunk_count, enrich_count),
+            )
+            connection.commit()
+
+    def _get(self, pinecone_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Reads a manifest row (blocking).
+
+        Args:
+            pinecone_id: The Pinecone ID of the file.
+
+        Returns:
+            Optional[Dict[str, Any]]: The row, or None if the file is not in the manifest.
+        """
+        with self._lock:
+            row = self._connect().execute(
+                "SELECT file_id, chunk_count, enrich_count FROM manifest WHERE pinecone_id = ?",
+                (pinecone_id,),
+            ).fetchone()
+        if row is None:
+            return None
+        return {"file_id": row[0], "chunk_count": row[1], "enrich_count": row[2]}
+
+    def _latest_pinecone_id(self, file_id: str) -> Optional[str]:
+        """
+        Reads the most recently recorded Pinecone ID of a file (blocking).
+
+        Args:
+            file_id: The ID of the file.
+
+        Returns:
+            Optional[str]: The Pinecone ID, or None if the file is not in the manifest.
+        """
+        with self._lock:
+            row = self._connect().execute(
+                "SELECT pinecone_id FROM manifest WHERE file_id = ? ORDER BY updated_at DESC LIMIT 1",
+                (file_id,),
+            ).fetchone()
+        return row[0] if row else None
+
+    def _latest_pinecone_ids(self, file_ids: List[str]) -> Dict[str, str]:
+        """
+        Reads the most recently recorded Pinecone ID of several files (blocking).
+
+        Args:
+            file_ids: The IDs of the files.
+
+        Returns:
+            Dict[str, str]: Pinecone ID per file ID, for the files in the manifest.
+        """
+        if not file_ids:
+            return {}
+        placeholders = ", ".join("?" for _ in file_ids)
+        with self._lock:
+            rows = self._connect().execute(
+                f"SELECT file_id, pinecone_id FROM manifest WHERE file_id IN ({placeholders}) ORDER BY updated_at",
+                list(file_ids),
+            ).fetchall()
+        # Later rows overwrite earlier ones, leaving the latest ID per file
+        return {file_id: pinecone_id for file_id, pinecone_id in rows}
+
+    def _remove(self, pinecone_id: str) -> None:
+        """
+        Deletes a manifest row (blocking).
+
+        Args:
+            pinecone_id: The Pinecone ID of the file.
+        """
+        with self._lock:
+            connection = self._connect()
+            connection.execute("DELETE FROM manifest WHERE pinecone_id = ?", (pinecone_id,))
+            connection.commit()
+
+    async def record(
+        self,
+        pinecone_id: str,
+        file_id: str,
+        chunk_count: Optional[int] = None,
+        enrich_count: Optional[int] = None,
+    ) -> None:
+        """
+        Records the vector counts written for a file.
+
+        Args:
+            pinecone_id: The Pinecone ID of the file.
+            file_id: The ID of the file.
+            chunk_count: Number of text chunks (None leaves the stored count unchanged).
+            enrich_count: Number of enrichment chunks (None leaves the stored count unchanged).
+        """
+        await ingest_cpu_executor.run(self._record, pinecone_id, file_id, chunk_count, enrich_count)
+
+    async def get(self, pinecone_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Returns the manifest entry for a file.
+
+        Args:
+            pinecone_id: The Pinecone ID of the file.
+
+        Returns:
+            Optional[Dict[str, Any]]: file_id, chunk_count and enrich_count, or None if unknown.
+        """
+        return await ingest_cpu_executor.run(self._get, pinecone_id)
+
+    async def vector_ids(self, pinecone_id: str) -> Optional[List[str]]:
+        """
+        Builds the vector IDs of a file from its manifest entry.
+
+        Args:
+            pinecone_id: The Pinecone ID of the file.
+
+        Returns:
+            Optional[List[str]]: The vector IDs, or None if the file is not in the manifest.
+        """
+        entry = await self.get(pinecone_id)
+        if entry is None:
+            return None
+        return [f"{pinecone_id}_chunk_{i}" for i in range(entry["chunk_count"])] + [
+            f"{pinecone_id}_enrich_{i}" for i in range(entry["enrich_count"])
+        ]
+
+    async def latest_pinecone_id(self, file_id: str) -> Optional[str]:
+        """
+        Returns the most recently recorded Pinecone ID of a file.
+
+        Args:
+            file_id: The ID of the file.
+
+        Returns:
+            Optional[str]: The Pinecone ID, or None if the file is not in the manifest.
+        """
+        return await ingest_cpu_executor.run(self._latest_pinecone_id, file_id)
+
+    async def latest_pinecone_ids(self, file_ids: List[str]) -> Dict[str, str]:
+        """
+        Returns the most recently recorded Pinecone ID of several files in one query.
+
+        Args:
+            file_ids: The IDs of the files.
+
+        Returns:
+            Dict[str, str]: Pinecone ID per file ID, for the files in the manifest.
+        """
+        return await ingest_cpu_executor.run(self._latest_pinecone_ids, list(file_ids))
+
+    async def remove(self, pinecone_id: str) -> None:
+        """
+        Removes a file from the manifest.
+
+        Args:
+            pinecone_id: The Pinecone ID of the file.
+        """
+        await ingest_cpu_executor.run(self._remove, pinecone_id)
+
+    def close(self) -> None:
+        """
+        Closes the SQLite connection.
+        """
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+
+# Global instance of the chunk manifest
+chunk_manifest = ChunkManifest()
@@ -8,6 +8,7 @@ import pinecone
 from pinecone import Index, Pinecone
 
 from app.core.config import settings
+from app.core.executors import ingest_network_executor, retrieval_executor
 from app.core.logging import logger
 
 
@@ -134,7 +135,7 @@ class PineconeClient:
             
             for i in range(0, len(vectors_to_upsert), chunk_size):
                 chunk = vectors_to_upsert[i:i + chunk_size]
-                response = self.index.upsert(vectors=chunk, namespace=namespace)
+                response = await ingest_network_executor.run(self.index.upsert, vectors=chunk, namespace=namespace)
                 results.append(response)
             
             logger.info(f"Upserted {len(vectors_to_upsert)} vectors to Pinecone (skipped {skipped_vectors} due to size limits)")
@@ -155,42 +156,58 @@ class PineconeClient:
             Dict[str, Any]: The deletion response.
         """
         try:
-            response = self.index.delete(ids=ids, namespace=namespace)
+            response = await ingest_network_executor.run(self.index.delete, ids=ids, namespace=namespace)
             logger.info(f"Deleted {len(ids)} vectors from Pinecone")
             return response
         except Exception as e:
             logger.error(f"Error deleting vectors from Pinecone: {e}")
             raise
 
-    async def create_id_filter(self, ids: List[str]) -> Dict[str, Any]:
+    async def fetch_vectors(
+        self, ids: List[str], namespace: str = "", batch_size: int = 200
+    ) -> List[Tuple[str, List[float], Dict[str, Any]]]:
         """
-        Creates a proper ID filter for Pinecone query.
+        Fetches stored vectors and their metadata by ID.
         
         Args:
-            ids: List of vector IDs to filter by
+            ids: List of vector IDs to fetch
+            namespace: The namespace to fetch from
+            batch_size: Number of IDs per fetch request
             
         Returns:
-            Dict[str, Any]: The filter dictionary properly formatted for Pinecone.
+            List[Tuple[str, List[float], Dict[str, Any]]]: (id, vector, metadata) for each ID found.
         """
-        # Ensure ids is a simple list of strings, not nested
-        flat_ids = []
-        for id_val in ids:
-            if isinstance(id_val, list):
-                # Recursively flatten nested lists
-                for nested_id in id_val:
-                    if isinstance(nested_id, list):
-                        flat_ids.extend(nested_id)
-                    else:
-                        flat_ids.append(nested_id)
-            else:
-                flat_ids.append(id_val)
+        try:
+            vectors = []
+            for i in range(0, len(ids), batch_size):
+                response = await ingest_network_executor.run(
+                    self.index.fetch, ids=ids[i:i + batch_size], namespace=namespace
+                )
+                for vector_id, vector in response.vectors.items():
+                    vectors.append((vector_id, list(vector.values), dict(vector.metadata or {})))
+            
+            logger.info(f"Fetched {len(vectors)}/{len(ids)} vectors from Pinecone")
+            return vectors
+        except Exception as e:
+            logger.error(f"Error fetching vectors from Pinecone: {e}")
+            raise
+
+    async def create_file_filter(self, file_ids: List[str]) -> Dict[str, Any]:
+        """
+        Creates a metadata filter restricting a search to the chunks of the given files.
         
-        # Additional validation to ensure all IDs are strings
-        validated_ids = [str(id_val) for id_val in flat_ids if id_val]
+        Every chunk carries its file_id in metadata, so the filter can be applied by
+        Pinecone during the search rather than on the returned top-k.
         
-        # Create the filter with the proper structure
-        filter_dict = {"id": {"$in": validated_ids}}
-        logger.info(f"Created ID filter with {len(validated_ids)} IDs: {filter_dict}")
+        Args:
+            file_ids: List of file IDs to scope the search to
+            
+        Returns:
+            Dict[str, Any]: The filter dictionary properly formatted for Pinecone.
+        """
+        validated_ids = [str(file_id) for file_id in file_ids if file_id]
+        filter_dict = {"file_id": {"$in": validated_ids}}
+        logger.info(f"Created file filter with {len(validated_ids)} file IDs")
         return filter_dict
 
     async def query_vectors(
@@ -217,7 +234,8 @@ class PineconeClient:
             if filter:
                 logger.info(f"Querying with filter: {filter}")
             
-            response = self.index.query(
+            response = await retrieval_executor.run(
+                self.index.query,
                 vector=query_vector,
                 top_k=top_k,
                 namespace=namespace,
@@ -243,9 +261,9 @@ class PineconeClient:
         """
         try:
             # The list method returns a generator, not a dictionary
-            vector_ids = []
-            for vector_id in self.index.list(prefix=prefix, namespace=namespace):
-                vector_ids.append(vector_id)
+            vector_ids = await ingest_network_executor.run(
+                lambda: [vector_id for vector_id in self.index.list(prefix=prefix, namespace=namespace)]
+            )
             
             logger.info(f"Listed {len(vector_ids)} vectors with prefix {prefix}")
             return vector_ids
@@ -284,31 +302,19 @@ class PineconeClient:
                 "inputs": {"text": query_text},
                 "top_k": top_k
             }
-            if not namespace:
-                namespace = ""
-            # Perform search without applying filter at the Pinecone level
-            response = self.index.search_records(
-                namespace=namespace,
-                query=search_query
-            )
             
-            logger.info(f"DEBUG - Pinecone search_records response: {response}")
+            # Metadata conditions (e.g. the file_id scope) are applied by Pinecone during the search
+            if filter:
+                search_query["filter"] = filter
             
-            # Process the results to match the expected format
-            # The response contains 'result' with 'hits' instead of 'matches'
-            hits = response.get("result", {}).get("hits", [])
+            if not namespace:
+                namespace = ""
             
-            # Apply post-search filtering based on the provided filter
-            filtered_hits = hits
-            if filter and "id" in filter and "$in" in filter["id"]:
-                target_ids = filter["id"]["$in"]
-                # Filter hits where _id exactly matches any of the target_ids
-                filtered_hits = [hit for hit in hits if hit.get("_id") in target_ids]
-                logger.info(f"Post-search filtering applied: {len(filtered_hits)}/{len(hits)} results kept")
+            hits = await self._search_hits(namespace, search_query)
             
             # Transform to match the previous return format for compatibility
             transformed_results = []
-            for hit in filtered_hits:
+            for hit in hits:
                 # Process each hit to a compatible format
                 result = {
                     "id": hit.get("_id"),
@@ -323,6 +329,27 @@ class PineconeClient:
             logger.error(f"Error searching records in Pinecone: {e}")
             raise
 
+    async def _search_hits(self, namespace: str, search_query: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """
+        Runs a single search_records call and returns its hits.
+        
+        Args:
+            namespace: The namespace to search in
+            search_query: The search_records query
+            
+        Returns:
+            List[Dict[str, Any]]: The raw hits.
+        """
+        response = await retrieval_executor.run(
+            self.index.search_records,
+            namespace=namespace,
+            query=search_query
+        )
+        logger.info(f"DEBUG - Pinecone search_records response: {response}")
+        
+        # The response contains 'result' with 'hits' instead of 'matches'
+        return response.get("result", {}).get("hits", [])
+
 
 # Global instance of the Pinecone client
 pinecone_client = PineconeClient() 
\ No newline at end of file
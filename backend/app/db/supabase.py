@@ -1,12 +1,14 @@
 """
 Supabase client module for connecting to Supabase.
 """
-from typing import Any, Dict, Optional, List
+from typing import Any, Dict, Optional, List, Tuple
 import json
 
 from supabase import Client, create_client
 
+from app.core.cache import TTLCache
 from app.core.config import settings
+from app.core.executors import retrieval_executor
 from app.core.logging import logger
 
 
@@ -18,6 +20,18 @@ class SupabaseClient:
     _instance: Optional["SupabaseClient"] = None
     _client: Optional[Client] = None
 
+    # Per-user cache of (toggled file IDs, {file_id: pinecone_id or None})
+    _toggled_files_cache: TTLCache[Tuple[Tuple[str, ...], Dict[str, Optional[str]]]] = TTLCache(
+        max_size=settings.TOGGLED_FILES_CACHE_MAX_USERS,
+        ttl_seconds=settings.TOGGLED_FILES_CACHE_TTL_SECONDS,
+    )
+
+    # file_metadata rows by file_id ({} for files without a row)
+    _file_metadata_cache: TTLCache[Dict[str, Any]] = TTLCache(
+        max_size=settings.FILE_METADATA_CACHE_MAX_ENTRIES,
+        ttl_seconds=settings.FILE_METADATA_CACHE_TTL_SECONDS,
+    )
+
     def __new__(cls) -> "SupabaseClient":
         if cls._instance is None:
             cls._instance = super().__new__(cls)
@@ -65,6 +79,64 @@ class SupabaseClient:
             logger.error(f"Error fetching file metadata: {e}")
             raise
 
+    def _fetch_file_metadata_rows(self, file_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Fetches file_metadata rows for several files with a single query.
+        
+        Args:
+            file_ids: The file IDs to fetch.
+            
+        Returns:
+            Dict[str, Dict[str, Any]]: The row for each file ID ({} if the file has no row).
+        """
+        response = self.client.table("file_metadata").select("*").in_("file_id", file_ids).execute()
+        rows = {str(row["file_id"]): row for row in (response.data or [])}
+        return {file_id: rows.get(file_id, {}) for file_id in file_ids}
+
+    async def get_file_metadata_batch(self, file_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Fetches file metadata for several files, serving cached rows and
+        resolving the rest with one file_metadata query.
+        
+        Args:
+            file_ids: The IDs of the files.
+            
+        Returns:
+            Dict[str, Dict[str, Any]]: The file metadata for each file ID ({} if not found).
+        """
+        try:
+            file_ids = list(dict.fromkeys(str(file_id) for file_id in file_ids if file_id))
+            metadata: Dict[str, Dict[str, Any]] = {}
+            missing = []
+            for file_id in file_ids:
+                cached = self._file_metadata_cache.get(file_id)
+                if cached is None:
+                    missing.append(file_id)
+                else:
+                    metadata[file_id] = cached
+            
+            if missing:
+                rows = await retrieval_executor.run(self._fetch_file_metadata_rows, missing)
+                for file_id, row in rows.items():
+                    self._file_metadata_cache.set(file_id, row)
+                    metadata[file_id] = row
+            
+            logger.info(f"Fetched metadata for {len(file_ids)} files ({len(missing)} from Supabase)")
+            return metadata
+        except Exception as e:
+            logger.error(f"Error fetching file metadata batch: {e}")
+            raise
+
+    def invalidate_file_metadata(self, file_id: Optional[str]) -> None:
+        """
+        Drops a file's cached file_metadata row.
+        
+        Args:
+            file_id: The ID of the file.
+        """
+        if file_id:
+            self._file_metadata_cache.invalidate(str(file_id))
+
     async def get_notebook_file(self, file_id: str) -> Dict[str, Any]:
         """
         Fetches file information from the notebook_files table.
@@ -97,6 +169,9 @@ class SupabaseClient:
         try:
             response = self.client.table("file_metadata").insert(metadata).execute()
             if response.data:
+                self.invalidate_file_metadata(response.data[0].get("file_id"))
+                if "pinecone_id" in metadata:
+                    self.invalidate_toggled_files_for_file(response.data[0].get("file_id"))
                 return response.data[0]
             return {}
         except Exception as e:
@@ -117,6 +192,9 @@ class SupabaseClient:
         try:
             response = self.client.table("file_metadata").update(metadata).eq("id", id).execute()
             if response.data:
+                self.invalidate_file_metadata(response.data[0].get("file_id"))
+                if "pinecone_id" in metadata:
+                    self.invalidate_toggled_files_for_file(response.data[0].get("file_id"))
                 return response.data[0]
             return {}
         except Exception as e:
@@ -140,7 +218,71 @@ class SupabaseClient:
             logger.error(f"Error fetching file from storage: {e}")
             raise
 
-    async def get_user_toggled_files(self, user_id: str) -> List[str]:
+    def _fetch_toggled_file_ids(self, user_id: str) -> List[str]:
+        """
+        Fetches the raw toggled file IDs for a user from the users table.
+        
+        Args:
+            user_id: The ID of the user.
+            
+        Returns:
+            List[str]: The toggled file IDs, in the order the user saved them.
+        """
+        response = self.client.table("users").select("toggled_files").eq("id", user_id).execute()
+        if response.data and response.data[0].get("toggled_files"):
+            # toggled_files is stored as JSONB in the database
+            return [str(file_id) for file_id in response.data[0]["toggled_files"]]
+        return []
+
+    def _resolve_pinecone_ids(self, file_ids: List[str]) -> Dict[str, Optional[str]]:
+        """
+        Resolves file IDs to Pinecone IDs with a single file_metadata query.
+        
+        Args:
+            file_ids: The file IDs to resolve.
+            
+        Returns:
+            Dict[str, Optional[str]]: Pinecone ID for each file ID (None if the file is not indexed).
+        """
+        response = self.client.table("file_metadata").select("file_id, pinecone_id").in_("file_id", file_ids).execute()
+        pinecone_ids = {
+            str(row["file_id"]): row["pinecone_id"]
+            for row in (response.data or [])
+            if row.get("pinecone_id")
+        }
+        return {file_id: pinecone_ids.get(file_id) for file_id in file_ids}
+
+    async def get_user_toggled_file_map(self, user_id: str) -> Dict[str, Optional[str]]:
+        """
+        Resolves a user's toggled files to their Pinecone IDs.
+        
+        The users row is read on every call so toggles saved by the frontend are seen
+        immediately; the file_metadata resolution is cached per user and reused while
+        the toggled list is unchanged. Writes to file_metadata.pinecone_id invalidate
+        the affected entries.
+        
+        Args:
+            user_id: The ID of the user.
+            
+        Returns:
+            Dict[str, Optional[str]]: Pinecone ID for each toggled file ID (None if not indexed).
+        """
+        try:
+            file_ids = await retrieval_executor.run(self._fetch_toggled_file_ids, user_id)
+            
+            cached = self._toggled_files_cache.get(user_id)
+            if cached is not None and cached[0] == tuple(file_ids):
+                return dict(cached[1])
+            
+            file_map = await retrieval_executor.run(self._resolve_pinecone_ids, file_ids) if file_ids else {}
+            self._toggled_files_cache.set(user_id, (tuple(file_ids), file_map))
+            logger.info(f"Resolved {len(file_ids)} toggled files for user {user_id}")
+            return dict(file_map)
+        except Exception as e:
+            logger.error(f"Error resolving user toggled files: {e}")
+            raise
+
+    async def get_user_toggled_files(self, user_id: str) -> Dict[bool, List[str]]:
         """
         Fetches the toggled files for a user from the users table.
         
@@ -152,29 +294,42 @@ class SupabaseClient:
         """
         try:
             toggled_files: Dict[bool, List[str]] = {True: [], False: []}
-            response = self.client.table("users").select("toggled_files").eq("id", user_id).execute()
+            file_map = await self.get_user_toggled_file_map(user_id)
             
-            if response.data and response.data[0].get("toggled_files"):
-                # toggled_files is stored as JSONB in the database
-                file_ids = response.data[0]["toggled_files"]
-                
-                for file_id in file_ids:
-                    file_response = self.client.table("file_metadata").select("pinecone_id").eq("file_id", file_id).execute()
-                    
-                    if file_response.data and len(file_response.data) > 0 and file_response.data[0].get("pinecone_id"):
-                        pinecone_id = file_response.data[0]["pinecone_id"]
-                        if pinecone_id:  # Only add non-empty pinecone_ids
-                            toggled_files[True].append(pinecone_id)
-                            logger.info(f"Added toggled file pinecone_id: {pinecone_id} to toggled_files[True]")
-                    else:
-                        toggled_files[False].append(file_id)
-                        logger.info(f"Added toggled filefile_id: {file_id} to toggled_files[False]")
+            for file_id, pinecone_id in file_map.items():
+                if pinecone_id:
+                    toggled_files[True].append(pinecone_id)
+                else:
+                    toggled_files[False].append(file_id)
 
             return toggled_files
         except Exception as e:
             logger.error(f"Error fetching user toggled files: {e}")
             raise
 
+    def invalidate_user_toggled_files(self, user_id: str) -> None:
+        """
+        Drops the cached toggled-file resolution for a user.
+        
+        Args:
+            user_id: The ID of the user.
+        """
+        self._toggled_files_cache.invalidate(user_id)
+
+    def invalidate_toggled_files_for_file(self, file_id: Optional[str]) -> None:
+        """
+        Drops every cached toggled-file resolution that includes a file.
+        
+        Called when the file's pinecone_id changes.
+        
+        Args:
+            file_id: The ID of the file.
+        """
+        if not file_id:
+            return
+        file_id = str(file_id)
+        self._toggled_files_cache.invalidate_where(lambda _, entry: file_id in entry[0])
+
     async def get_file_content(self, file_ids: List[str]) -> List[Dict[str, Any]]:
         """
         Fetches the content of the files from the Vox bucket and formats it to match
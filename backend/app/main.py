@@ -2,18 +2,29 @@
 Main application module.
 """
 import asyncio
+import hmac
 from contextlib import asynccontextmanager
+from typing import Optional
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Header, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.openapi.docs import get_swagger_ui_html
 from fastapi.openapi.utils import get_openapi
 
 from app.api.v1.api import api_router
 from app.core.config import settings
+from app.core.executors import ingest_cpu_executor, ingest_network_executor, retrieval_executor
 from app.core.logging import logger, setup_logging
+from app.core.metrics import metrics
+from app.db.checkpoints import checkpoint_store
+from app.db.chunk_manifest import chunk_manifest
 from app.services.embedding_service import embedding_service
+from app.services.enrichment_service import enrichment_service
+from app.services.extraction_executor import extraction_executor
+from app.services.file_processors.image_fetcher import image_fetcher
 from app.services.llm_service import llm_service
+from app.services.local_vector_tier import local_vector_tier
+from app.services.query_rewriter import query_rewriter
 
 
 @asynccontextmanager
@@ -26,14 +37,27 @@ async def lifespan(app: FastAPI):
     # Startup
     setup_logging()
     logger.info("Starting application")
+    # Load the query dictionary before the first request needs it
+    await query_rewriter.load()
+    # Leave the extraction workers their share of the LLM quotas
+    extraction_executor.configure_admission()
     
     # Yield control to the application
     yield
     
     # Shutdown
     logger.info("Shutting down application")
+    await enrichment_service.close()
+    await local_vector_tier.close()
     await llm_service.close()
     await embedding_service.close()
+    await image_fetcher.close()
+    extraction_executor.close()
+    checkpoint_store.close()
+    chunk_manifest.close()
+    retrieval_executor.shutdown()
+    ingest_network_executor.shutdown()
+    ingest_cpu_executor.shutdown()
 
 
 app = FastAPI(
@@ -90,4 +114,21 @@ async def health_check():
     """
     Health check endpoint.
     """
-    return {"status": "ok"} 
\ No newline at end of file
+    return {"status": "ok"}
+
+
+@app.get("/metrics", include_in_schema=False)
+async def get_metrics(authorization: Optional[str] = Header(None)):
+    """
+    Returns in-process counters and latency histograms.
+    
+    Requires "Authorization: Bearer <METRICS_TOKEN>"; without a configured
+    token the endpoint is not served.
+    """
+    if not settings.METRICS_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not authorization or not hmac.compare_digest(
+        authorization.encode("utf-8"), f"Bearer {settings.METRICS_TOKEN}".encode("utf-8")
+    ):
+        raise HTTPException(status_code=401, detail="Invalid metrics token")
+    return metrics.snapshot()
@@ -1,6 +1,7 @@
 """
 Database models for notebook files.
 """
+import hashlib
 from datetime import datetime
 from typing import Any, Dict, Optional
 from uuid import UUID
@@ -19,6 +20,7 @@ class NotebookFile:
     file_type: str
     file_size: int
     created_at: datetime
+    updated_at: Optional[datetime]
 
     def __init__(
         self,
@@ -30,6 +32,7 @@ class NotebookFile:
         file_type: str,
         file_size: int,
         created_at: Optional[datetime] = None,
+        updated_at: Optional[datetime] = None,
     ):
         self.id = id
         self.notebook_id = notebook_id
@@ -39,6 +42,7 @@ class NotebookFile:
         self.file_type = file_type
         self.file_size = file_size
         self.created_at = created_at or datetime.now()
+        self.updated_at = updated_at
 
     @classmethod
     def from_dict(cls, data: Dict[str, Any]) -> "NotebookFile":
@@ -60,6 +64,7 @@ class NotebookFile:
             file_type=data.get("file_type"),
             file_size=data.get("file_size"),
             created_at=data.get("created_at"),
+            updated_at=data.get("updated_at"),
         )
 
     def to_dict(self) -> Dict[str, Any]:
@@ -78,8 +83,23 @@ class NotebookFile:
             "file_type": self.file_type,
             "file_size": self.file_size,
             "created_at": self.created_at.isoformat() if self.created_at else None,
+            "updated_at": self.updated_at.isoformat() if hasattr(self.updated_at, "isoformat") else self.updated_at,
         }
 
+    @property
+    def content_version(self) -> str:
+        """
+        Identifies the stored content of the file without downloading it.
+
+        Changes when the file is replaced in storage (new path, size or update
+        time), so checkpoints of an earlier upload are not reused.
+
+        Returns:
+            str: A short hash of the storage path, size and last update time.
+        """
+        stamp = f"{self.file_path}|{self.file_size}|{self.updated_at or self.created_at}"
+        return hashlib.sha256(stamp.encode("utf-8")).hexdigest()[:16]
+
     @property
     def is_text_file(self) -> bool:
         """
@@ -2,6 +2,7 @@
 Pydantic schemas for API request and response validation.
 """
 from app.schemas.file import (
+    EnrichmentStatusResponse,
     FileIngestRequest,
     FileIngestResponse,
     FileMetadataBase,
@@ -16,6 +17,7 @@ from app.schemas.file import (
 )
 
 __all__ = [
+    "EnrichmentStatusResponse",
     "FileIngestRequest",
     "FileIngestResponse",
     "FileMetadataBase",
@@ -56,6 +56,16 @@ class FileIngestResponse(BaseModel):
     message: str = Field(..., description="Status message")
 
 
+class EnrichmentStatusResponse(BaseModel):
+    """Response schema for deferred image/frame enrichment status."""
+    file_id: str = Field(..., description="ID of the file")
+    status: str = Field(..., description="Enrichment status (pending, running, completed, failed)")
+    updated_at: Optional[str] = Field(None, description="Last status change timestamp")
+    visual_count: Optional[int] = Field(None, description="Number of images or frames described")
+    enrichment_chunks: Optional[int] = Field(None, description="Number of enrichment chunks indexed")
+    error: Optional[str] = Field(None, description="Error message if enrichment failed")
+
+
 class VectorMetadata(BaseModel):
     """Schema for vector metadata in Pinecone."""
     file_id: str = Field(..., description="ID of the file")
@@ -68,6 +78,7 @@ class VectorMetadata(BaseModel):
 
 class QueryResult(BaseModel):
     """Schema for query results."""
+    id: Optional[str] = Field(None, description="ID of the source within its query stream")
     text: str = Field(..., description="Text chunk")
     score: float = Field(..., description="Similarity score")
     file_id: str = Field(..., description="ID of the file")
@@ -80,7 +91,7 @@ class QueryRequest(BaseModel):
     """Request schema for querying."""
     query: str = Field(..., description="Query text")
     top_k: int = Field(5, description="Number of results to return")
-    model_name: str = Field("gemini", description="LLM model to use (gemini, anthropic, openai)")
+    model_name: str = Field("gemini", description="LLM model to use (gemini, anthropic, openai, or auto to route by query)")
     use_rag: bool = Field(True, description="Whether to use RAG")
     stream: bool = Field(True, description="Whether to stream the response")
     namespace: Optional[str] = Field(None, description="Namespace to query in Pinecone")
@@ -96,6 +107,19 @@ class QueryResponse(BaseModel):
     query_time_ms: float = Field(..., description="Query execution time in milliseconds")
 
 
+class SourcePayloadRequest(BaseModel):
+    """Request schema for fetching the full sources of a streamed query."""
+    stream_id: str = Field(..., description="Stream ID from the sources event")
+    user_id: Optional[str] = Field(None, description="User ID of the streamed query")
+    source_ids: Optional[List[str]] = Field(None, description="Source IDs to fetch (all sources if omitted)")
+
+
+class SourcePayloadResponse(BaseModel):
+    """Response schema for the full sources of a streamed query."""
+    stream_id: str = Field(..., description="Stream ID from the sources event")
+    sources: List[QueryResult] = Field(default_factory=list, description="Full source payloads")
+
+
 class DeleteByPineconeIdRequest(BaseModel):
     """Request schema for deleting vectors by Pinecone ID."""
     file_id: str = Field(..., description="The Pinecone ID of the file to delete") 
\ No newline at end of file
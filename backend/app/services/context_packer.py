@@ -0,0 +1,328 @@
+"""
+Context packer module for fitting retrieved documents into a model's token budget.
+"""
+import json
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.core.config import settings
+from app.core.logging import logger
+from app.core.metrics import metrics
+
+
+class PackedContext:
+    """
+    Result of packing context documents into a prompt section.
+    """
+
+    __slots__ = ("text", "tokens", "file_count", "dropped_chunks")
+
+    def __init__(self, text: str, tokens: int, file_count: int, dropped_chunks: int):
+        """
+        Initializes the packed context.
+
+        Args:
+            text: The formatted context section
+            tokens: Token count of the formatted context
+            file_count: Number of files included
+            dropped_chunks: Number of chunks left out (score cutoff or budget)
+        """
+        self.text = text
+        self.tokens = tokens
+        self.file_count = file_count
+        self.dropped_chunks = dropped_chunks
+
+
+class _FileGroup:
+    """
+    Context documents of one file, merged into runs of adjacent chunks.
+    """
+
+    def __init__(self, source: str, metadata: Dict[str, Any]):
+        self.source = source
+        self.metadata = metadata
+        self.score = 0.0
+        # (chunk_index or None, score, text)
+        self.chunks: List[Tuple[Optional[int], float, str]] = []
+
+
+class ContextPacker:
+    """
+    Packs retrieved documents into a token-budgeted context section.
+
+    Chunks of the same file are grouped under a single header, adjacent chunks
+    are merged with their overlap removed, low-scoring chunks are cut, and the
+    best file runs are added greedily until the model's budget is used.
+    """
+
+    def __init__(
+        self,
+        budgets: Dict[str, int] = settings.CONTEXT_TOKEN_BUDGETS,
+        min_relative_score: float = settings.CONTEXT_MIN_RELATIVE_SCORE,
+        max_overlap_chars: int = settings.CONTEXT_MAX_OVERLAP_CHARS,
+    ):
+        """
+        Initializes the context packer.
+
+        Args:
+            budgets: Context token budget per model family (gemini, anthropic, openai)
+            min_relative_score: Chunks scoring below this fraction of the best chunk are dropped
+            max_overlap_chars: Longest overlap removed between adjacent chunks
+        """
+        self.budgets = budgets
+        self.min_relative_score = min_relative_score
+        self.max_overlap_chars = max_overlap_chars
+        self._encoding: Any = None
+        self._encoding_failed = False
+
+    def count_tokens(self, text: str) -> int:
+        """
+        Counts tokens with tiktoken, estimating when the encoding is unavailable.
+
+        Args:
+            text: The text to count
+
+        Returns:
+            int: Number of tokens
+        """
+        if self._encoding is None and not self._encoding_failed:
+            try:
+                import tiktoken
+                self._encoding = tiktoken.get_encoding("cl100k_base")
+            except Exception as e:
+                logger.warning(f"tiktoken unavailable, estimating token counts: {e}")
+                self._encoding_failed = True
+        if self._encoding is not None:
+            return len(self._encoding.encode(text, disallowed_special=()))
+        return (len(text) + 3) // 4
+
+    def _truncate_to_tokens(self, text: str, max_tokens: int) -> str:
+        """
+        Truncates text to at most max_tokens tokens.
+
+        Args:
+            text: The text to truncate
+            max_tokens: Token limit
+
+        Returns:
+            str: The truncated text
+        """
+        if max_tokens <= 0:
+            return ""
+        if self._encoding is not None:
+            return self._encoding.decode(self._encoding.encode(text, disallowed_special=())[:max_tokens])
+        return text[:max_tokens * 4]
+
+    def budget_for_model(self, model_name: str) -> int:
+        """
+        Returns the context token budget for a model.
+
+        Args:
+            model_name: The model name (e.g. "gemini-1.5-flash-8b", "anthropic", "openai")
+
+        Returns:
+            int: The token budget
+        """
+        name = (model_name or "").lower()
+        for family, budget in self.budgets.items():
+            if name.startswith(family):
+                return budget
+        return min(self.budgets.values()) if self.budgets else 8000
+
+    def _strip_overlap(self, previous: str, current: str) -> str:
+        """
+        Removes the prefix of a chunk that repeats the end of the previous chunk.
+
+        Args:
+            previous: Text of the preceding chunk
+            current: Text of the following chunk
+
+        Returns:
+            str: The following chunk without the duplicated prefix
+        """
+        limit = min(self.max_overlap_chars, len(previous), len(current))
+        for size in range(limit, 15, -1):
+            if previous.endswith(current[:size]):
+                return current[size:].lstrip()
+        return current
+
+    def _format_header(self, index: int, source: str, metadata: Dict[str, Any]) -> str:
+        """
+        Formats the header emitted once per file.
+
+        Args:
+            index: 1-based file number
+            source: The source/file name
+            metadata: The file's chunk metadata
+
+        Returns:
+            str: The header text
+        """
+        # Get description from metadata if available
+        if source.endswith(".json"):
+            description = metadata.get("description") or "This is a notes file that the user wrote. The user has written this note themselves."
+        else:
+            description = metadata.get("description") or "No description available"
+
+        # Process additional_info if it's a JSON string
+        additional_info_str = ""
+        if metadata.get("additional_info"):
+            try:
+                if isinstance(metadata["additional_info"], str) and metadata["additional_info"].startswith("{"):
+                    additional_info = json.loads(metadata["additional_info"])
+                    info_parts = [f"{key}: {value}" for key, value in additional_info.items() if value]
+                    if info_parts:
+                        additional_info_str = "\nAdditional Info:\n" + "\n".join(info_parts)
+            except json.JSONDecodeError:
+                additional_info_str = f"\nAdditional Info: {metadata['additional_info']}"
+
+        def _list_field(label: str, key: str, bullet: bool = False) -> str:
+            value = metadata.get(key)
+            if not value:
+                return ""
+            if isinstance(value, list):
+                return f"\n{label}:\n- " + "\n- ".join(value) if bullet else f"\n{label}: {', '.join(value)}"
+            return f"\n{label}: {value}"
+
+        metadata_str = (
+            f"{additional_info_str}{_list_field('Entities', 'entities')}"
+            f"{_list_field('Key Points', 'key_points', bullet=True)}{_list_field('Topics', 'topics')}"
+        )
+        return f"File #{index}: {source}\nDescription: {description}{metadata_str}\nContent:\n"
+
+    def _group(self, context: List[Dict[str, Any]]) -> Tuple[List[_FileGroup], int]:
+        """
+        Groups documents by file and applies the score cutoff.
+
+        Args:
+            context: The context documents
+
+        Returns:
+            Tuple[List[_FileGroup], int]: File groups, and the number of chunks cut by score
+        """
+        chunk_scores = [
+            doc.get("score") or 0.0 for doc in context
+            if (doc.get("metadata") or {}).get("chunk_index") is not None
+        ]
+        cutoff = max(chunk_scores) * self.min_relative_score if chunk_scores else 0.0
+
+        groups: Dict[str, _FileGroup] = {}
+        dropped = 0
+        for doc in context:
+            metadata = doc.get("metadata") or {}
+            score = doc.get("score") or 0.0
+            chunk_index = metadata.get("chunk_index")
+            chunk_index = int(chunk_index) if isinstance(chunk_index, (int, float)) or str(chunk_index).isdigit() else None
+
+            # The cutoff applies to retrieved chunks, not to whole files passed in directly
+            if chunk_index is not None and score < cutoff:
+                dropped += 1
+                continue
+
+            source = doc.get("source") or metadata.get("source") or "Unknown file"
+            key = doc.get("file_id") or metadata.get("file_id") or source
+            if metadata.get("enrichment"):
+                # Enrichment chunks are numbered separately from text chunks
+                key = f"{key}:enrichment"
+            group = groups.get(key)
+            if group is None:
+                group = groups[key] = _FileGroup(source, metadata)
+            group.score = max(group.score, score)
+
+            text = doc.get("text") or metadata.get("text_chunk") or ""
+            if text:
+                group.chunks.append((chunk_index, score, text))
+
+        return list(groups.values()), dropped
+
+    def _runs(self, group: _FileGroup) -> List[Tuple[float, str, int]]:
+        """
+        Merges a file's chunks into runs of adjacent chunks with overlap removed.
+
+        Args:
+            group: The file group
+
+        Returns:
+            List[Tuple[float, str, int]]: (best score, text, chunk count) per run, in document order
+        """
+        indexed = sorted(
+            {c[0]: c for c in group.chunks if c[0] is not None}.values(), key=lambda c: c[0]
+        )
+        unindexed = [c for c in group.chunks if c[0] is None]
+
+        runs: List[Tuple[float, str, int]] = []
+        run_text, run_score, run_count, last_index = "", 0.0, 0, None
+        for chunk_index, score, text in indexed:
+            if last_index is not None and chunk_index == last_index + 1:
+                run_text += " " + self._strip_overlap(run_text, text)
+                run_score = max(run_score, score)
+                run_count += 1
+            else:
+                if run_count:
+                    runs.append((run_score, run_text, run_count))
+                run_text, run_score, run_count = text, score, 1
+            last_index = chunk_index
+        if run_count:
+            runs.append((run_score, run_text, run_count))
+
+        runs.extend((score, text, 1) for _, score, text in unindexed)
+        return runs
+
+    def pack(self, context: List[Dict[str, Any]], model_name: str = "gemini", reserved_tokens: int = 0) -> PackedContext:
+        """
+        Packs context documents into a prompt section within the model's budget.
+
+        Args:
+            context: The retrieved context documents
+            model_name: The model the prompt is for
+            reserved_tokens: Tokens of the budget already used by the rest of the prompt
+
+        Returns:
+            PackedContext: The formatted context and packing statistics
+        """
+        budget = max(0, self.budget_for_model(model_name) - reserved_tokens)
+        groups, dropped = self._group(context)
+        groups.sort(key=lambda g: g.score, reverse=True)
+
+        used = 0
+        sections = []
+        for group in groups:
+            runs = self._runs(group)
+            header = self._format_header(len(sections) + 1, group.source, group.metadata)
+            header_tokens = self.count_tokens(header)
+            if used + header_tokens >= budget:
+                dropped += sum(count for _, _, count in runs)
+                continue
+
+            # Add the file's best runs first, then restore document order for readability
+            chosen = []
+            remaining = budget - used - header_tokens
+            for position, (score, text, count) in sorted(enumerate(runs), key=lambda r: r[1][0], reverse=True):
+                tokens = self.count_tokens(text)
+                if tokens <= remaining:
+                    chosen.append((position, text))
+                    remaining -= tokens
+                elif count == 1 and remaining > 64 and not chosen:
+                    # A single oversized document (e.g. a whole notes file) is truncated to
+                    # at most half the budget so retrieved chunks from other files still fit
+                    limit = min(remaining, budget // 2) - 8
+                    chosen.append((position, self._truncate_to_tokens(text, limit) + "\n... [truncated]"))
+                    remaining -= limit + 8
+                else:
+                    dropped += count
+
+            if not chosen:
+                continue
+            body = "\n...\n".join(text for _, text in sorted(chosen))
+            section = header + body
+            used += self.count_tokens(section)
+            sections.append(section)
+
+        text = "\n\n".join(sections)
+        metrics.observe("context.tokens", used)
+        metrics.observe("context.dropped_chunks", dropped)
+        logger.info(f"Packed {len(sections)} files into {used}/{budget} context tokens ({dropped} chunks dropped)")
+        return PackedContext(text=text, tokens=used, file_count=len(sections), dropped_chunks=dropped)
+
+
+# Global instance of the context packer
+context_packer = ContextPacker()
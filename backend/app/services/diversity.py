@@ -0,0 +1,114 @@
+"""
+Diversity selection module implementing Maximal Marginal Relevance over retrieved chunks.
+"""
+import re
+import zlib
+from typing import Any, Dict, List
+
+import numpy as np
+
+# Mersenne prime for the MinHash permutations (a * x + b stays below 2**64 for 32-bit x)
+_MINHASH_PRIME = (1 << 31) - 1
+
+
+def _minhash_signatures(texts: List[str], num_perm: int = 64, shingle_size: int = 3) -> np.ndarray:
+    """
+    Computes MinHash signatures over word shingles.
+
+    Args:
+        texts: The texts to sign
+        num_perm: Number of hash permutations
+        shingle_size: Number of words per shingle
+
+    Returns:
+        np.ndarray: A (len(texts), num_perm) signature matrix
+    """
+    rng = np.random.default_rng(1)
+    a = rng.integers(1, _MINHASH_PRIME, size=num_perm, dtype=np.uint64)
+    b = rng.integers(0, _MINHASH_PRIME, size=num_perm, dtype=np.uint64)
+
+    signatures = np.full((len(texts), num_perm), np.iinfo(np.uint64).max, dtype=np.uint64)
+    for row, text in enumerate(texts):
+        words = re.findall(r"\w+", text.lower())
+        shingles = {
+            " ".join(words[i:i + shingle_size]) for i in range(max(1, len(words) - shingle_size + 1))
+        }
+        hashes = np.fromiter(
+            (zlib.crc32(shingle.encode("utf-8")) for shingle in shingles), dtype=np.uint64, count=len(shingles)
+        )
+        if hashes.size:
+            # (a * x + b) mod p for every shingle and permutation, then the minimum per permutation
+            permuted = (hashes[:, None] * a[None, :] + b[None, :]) % _MINHASH_PRIME
+            signatures[row] = permuted.min(axis=0)
+    return signatures
+
+
+def _similarity_matrix(candidates: List[Dict[str, Any]]) -> np.ndarray:
+    """
+    Computes pairwise similarity between candidates.
+
+    Uses cosine similarity of the chunk vectors when every candidate carries
+    them ("values"), and MinHash Jaccard estimates of the chunk text otherwise.
+
+    Args:
+        candidates: The retrieved candidates
+
+    Returns:
+        np.ndarray: A symmetric (n, n) similarity matrix
+    """
+    if all(candidate.get("values") is not None for candidate in candidates):
+        vectors = np.asarray([candidate["values"] for candidate in candidates], dtype=np.float32)
+        vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+        return vectors @ vectors.T
+
+    texts = [
+        candidate.get("text") or (candidate.get("metadata") or {}).get("text_chunk") or ""
+        for candidate in candidates
+    ]
+    signatures = _minhash_signatures(texts)
+    similarity = (signatures[:, None, :] == signatures[None, :, :]).mean(axis=2)
+    # Texts without words would all share one signature; they are not similar to anything
+    empty = np.asarray([re.search(r"\w", text) is None for text in texts])
+    similarity[empty, :] = 0.0
+    similarity[:, empty] = 0.0
+    return similarity
+
+
+def mmr_select(candidates: List[Dict[str, Any]], top_k: int, lambda_mult: float = 0.7) -> List[Dict[str, Any]]:
+    """
+    Selects a relevant but diverse subset of candidates with Maximal Marginal Relevance.
+
+    Each step picks the candidate maximizing
+    lambda * relevance - (1 - lambda) * max similarity to the already selected ones,
+    where relevance is the search score rescaled to [0, 1].
+
+    Args:
+        candidates: Retrieved candidates, best first
+        top_k: Number of candidates to select
+        lambda_mult: Trade-off between relevance (1.0) and diversity (0.0)
+
+    Returns:
+        List[Dict[str, Any]]: The selected candidates, in selection order
+    """
+    if len(candidates) <= top_k:
+        return list(candidates)
+
+    scores = np.asarray([candidate.get("score") or 0.0 for candidate in candidates], dtype=np.float32)
+    spread = float(scores.max() - scores.min())
+    relevance = (scores - scores.min()) / spread if spread > 0 else np.ones_like(scores)
+    similarity = _similarity_matrix(candidates)
+
+    selected = [int(np.argmax(relevance))]
+    max_similarity = similarity[selected[0]].copy()
+    available = np.ones(len(candidates), dtype=bool)
+    available[selected[0]] = False
+
+    while len(selected) < top_k:
+        mmr = lambda_mult * relevance - (1 - lambda_mult) * max_similarity
+        mmr[~available] = -np.inf
+        best = int(np.argmax(mmr))
+        selected.append(best)
+        available[best] = False
+        np.maximum(max_similarity, similarity[best], out=max_similarity)
+
+    return [candidates[i] for i in selected]
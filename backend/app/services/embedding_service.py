@@ -1,7 +1,6 @@
 """
 Embedding service module for generating and managing vector embeddings.
 """
-import asyncio
 import hashlib
 import json
 import re
@@ -12,9 +11,13 @@ import httpx
 from tenacity import retry, stop_after_attempt, wait_exponential
 
 from app.core.config import settings
+from app.core.executors import ingest_network_executor, retrieval_executor
 from app.core.logging import logger
+from app.db.checkpoints import checkpoint_store
+from app.db.chunk_manifest import chunk_manifest
 from app.db.pinecone import pinecone_client
 from app.db.supabase import supabase_client
+from app.services.local_vector_tier import local_vector_tier
 
 class EmbeddingService:
     """
@@ -48,7 +51,7 @@ class EmbeddingService:
         """
         try:
             # Using Pinecone's inference API for embeddings
-            result = await asyncio.to_thread(
+            result = await retrieval_executor.run(
                 pinecone_client.client.inference.embed,
                 model="llama-text-embed-v2",
                 inputs=[text],
@@ -66,6 +69,34 @@ class EmbeddingService:
             logger.error(f"Error generating embedding: {e}")
             raise
 
+    @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=1, max=10))
+    async def generate_embeddings(self, texts: List[str]) -> List[List[float]]:
+        """
+        Generates embeddings for a batch of texts in a single inference call.
+        
+        Args:
+            texts: The texts to embed (at most EMBEDDING_BATCH_SIZE).
+            
+        Returns:
+            List[List[float]]: The embedding vectors, in input order.
+        """
+        try:
+            result = await ingest_network_executor.run(
+                pinecone_client.client.inference.embed,
+                model="llama-text-embed-v2",
+                inputs=texts,
+                parameters={
+                    "input_type": "query"
+                }
+            )
+            
+            if not result or len(result) != len(texts):
+                raise ValueError(f"Expected {len(texts)} embeddings from Pinecone, got {len(result) if result else 0}")
+            return [embedding.values for embedding in result]
+        except Exception as e:
+            logger.error(f"Error generating embeddings: {e}")
+            raise
+
     async def chunk_text(self, text: str, chunk_size: int = 1000, overlap: int = 200) -> List[str]:
         """
         Chunks text into smaller pieces for embedding.
@@ -112,17 +143,23 @@ class EmbeddingService:
         file_path: str, 
         content: str, 
         source: str,
-        namespace: str = ""
+        namespace: str = "",
+        checkpoint_key: Optional[str] = None
     ) -> str:
         """
         Processes file content by chunking, embedding, and storing in Pinecone.
         
+        Chunks are embedded and upserted in batches. When a checkpoint key is given,
+        the chunk list and each embedded/upserted batch are checkpointed so a retried
+        ingest skips the work that already succeeded.
+        
         Args:
             file_id: The ID of the file.
             file_path: The path of the file in storage.
             content: The text content of the file.
             source: The source name (e.g., file name).
             namespace: The namespace to store vectors in.
+            checkpoint_key: Optional key for ingestion checkpoints (usually the file ID).
             
         Returns:
             str: The Pinecone ID for the file.
@@ -141,125 +178,77 @@ class EmbeddingService:
                 description = file_metadata.description
                 metadata_dict = file_metadata.metadata
             
-            # Chunk the text
-            chunks = await self.chunk_text(content)
+            # Chunk the text (or resume from the checkpointed chunks)
+            chunks = await checkpoint_store.get_json(checkpoint_key, "chunked") if checkpoint_key else None
+            if chunks is None:
+                chunks = await self.chunk_text(content)
+                if checkpoint_key:
+                    await checkpoint_store.put_json(checkpoint_key, "chunked", chunks)
             
             if not chunks:
                 logger.warning(f"No chunks generated for file {file_id}")
+                # Mirror an empty marker so scopes including this file can still be answered locally
+                await chunk_manifest.record(pinecone_id, file_id, chunk_count=0)
+                await local_vector_tier.replace_file(file_id, [], namespace, pinecone_id)
                 return pinecone_id
-                
-            # Generate embeddings and prepare vectors for Pinecone
-            vectors = []
             
-            # Pinecone metadata limit is 40KB (40960 bytes)
-            MAX_METADATA_BYTES = 30000
+            # Vectors written in this attempt, mirrored into the local tier afterwards
+            written_vectors = []
             
-            for i, chunk in enumerate(chunks):
-                # Generate embedding for the chunk
-                embedding = await self.generate_embedding(chunk)
-                
-                # Truncate the chunk if needed to fit within metadata limits
-                chunk_for_metadata = chunk
-                chunk_bytes = len(chunk.encode('utf-8'))
-                
-                if chunk_bytes > MAX_METADATA_BYTES:
-                    # Truncate the chunk to fit within limits
-                    # This is a simple truncation; in production you might want 
-                    # to implement a smarter truncation that preserves meaning
-                    truncate_ratio = MAX_METADATA_BYTES / chunk_bytes
-                    truncate_length = int(len(chunk) * truncate_ratio)
-                    chunk_for_metadata = chunk[:truncate_length] + "... [truncated]"
-                    logger.warning(f"Truncated chunk {i} from {chunk_bytes} bytes to {len(chunk_for_metadata.encode('utf-8'))} bytes")
+            batch_size = settings.EMBEDDING_BATCH_SIZE
+            for batch_num, start in enumerate(range(0, len(chunks), batch_size)):
+                upserted_stage = f"upserted:{batch_num}"
+                embedded_stage = f"embedded:{batch_num}"
                 
-                # Create metadata for the vector
-                metadata = {
-                    "file_id": file_id,
-                    "file_path": file_path,
-                    "text_chunk": chunk_for_metadata,
-                    "chunk_index": i,
-                    "source": source,
-                    "total_chunks": len(chunks)
-                }
-                
-                # Add file description and metadata if available
-                if description:
-                    metadata["description"] = description
+                if checkpoint_key and await checkpoint_store.has(checkpoint_key, upserted_stage):
+                    logger.info(f"Skipping batch {batch_num} for file {file_id}: already upserted")
+                    continue
                 
-                if metadata_dict:
-                    # Include file metadata while ensuring it won't exceed size limits
-                    # First check the size of the current metadata
-                    metadata_json = json.dumps(metadata)
-                    current_metadata_size = len(metadata_json.encode('utf-8'))
-                    
-                    # Calculate how much space we have left for additional metadata
-                    remaining_bytes = MAX_METADATA_BYTES - current_metadata_size
+                # Reuse embeddings from a previous attempt if this batch got that far
+                vectors = await checkpoint_store.get_json(checkpoint_key, embedded_stage) if checkpoint_key else None
+                if vectors is None:
+                    batch = chunks[start:start + batch_size]
+                    embeddings = await self.generate_embeddings(batch)
                     
-                    if remaining_bytes > 1000:  # Ensure we have enough space to be worth adding metadata
-                        # Process metadata to ensure all values are Pinecone-compatible
-                        # Pinecone only accepts strings, numbers, booleans, or arrays of strings
-                        pinecone_compatible_metadata = {}
+                    vectors = []
+                    for offset, (chunk, embedding) in enumerate(zip(batch, embeddings)):
+                        i = start + offset
+                        metadata = self._build_chunk_metadata(
+                            file_id=file_id,
+                            file_path=file_path,
+                            chunk=chunk,
+                            chunk_index=i,
+                            total_chunks=len(chunks),
+                            source=source,
+                            description=description,
+                            metadata_dict=metadata_dict
+                        )
                         
-                        for key, value in metadata_dict.items():
-                            # Skip null values
-                            if value is None:
-                                continue
-                                
-                            # Handle different value types
-                            if isinstance(value, (str, int, float, bool)) or (isinstance(value, list) and all(isinstance(item, str) for item in value)):
-                                # These types are directly supported by Pinecone
-                                pinecone_compatible_metadata[key] = value
-                            elif isinstance(value, list):
-                                # Convert non-string lists to string representations
-                                pinecone_compatible_metadata[key] = json.dumps(value)
-                            elif isinstance(value, dict) or isinstance(value, object):
-                                # Convert dictionaries and other objects to string representations
-                                pinecone_compatible_metadata[key] = json.dumps(value)
-                            else:
-                                # For any other types, convert to string
-                                pinecone_compatible_metadata[key] = str(value)
-                        
-                        # Check if the processed metadata fits within the remaining space
-                        compatible_metadata_json = json.dumps(pinecone_compatible_metadata)
-                        compatible_metadata_size = len(compatible_metadata_json.encode('utf-8'))
-                        
-                        if compatible_metadata_size <= remaining_bytes:
-                            # We can include all the compatible metadata
-                            metadata.update(pinecone_compatible_metadata)
-                        else:
-                            # Only include metadata fields that fit
-                            logger.warning(f"Compatible metadata size ({compatible_metadata_size} bytes) exceeds remaining space ({remaining_bytes} bytes). Adding partial metadata.")
-                            
-                            # Add fields one by one until we reach the limit
-                            current_size = current_metadata_size
-                            for key, value in pinecone_compatible_metadata.items():
-                                value_json = json.dumps({key: value})
-                                value_size = len(value_json.encode('utf-8'))
-                                
-                                if current_size + value_size <= MAX_METADATA_BYTES:
-                                    metadata[key] = value
-                                    current_size += value_size
-                                else:
-                                    break
-                    
-                    # Final check to ensure we haven't exceeded limit with our additions
-                    final_metadata_json = json.dumps(metadata)
-                    final_metadata_size = len(final_metadata_json.encode('utf-8'))
+                        # Create a unique ID for this chunk
+                        vectors.append((f"{pinecone_id}_chunk_{i}", embedding, metadata))
                     
-                    if final_metadata_size > MAX_METADATA_BYTES:
-                        # If we somehow still exceeded the limit, keep only the essential fields
-                        logger.warning(f"Final metadata size ({final_metadata_size} bytes) still exceeds limit. Keeping only essential fields.")
-                        
-                        essential_fields = ["file_id", "file_path", "text_chunk", "chunk_index", "source", "total_chunks", "description"]
-                        filtered_metadata = {k: metadata[k] for k in essential_fields if k in metadata}
-                        metadata = filtered_metadata
-                
-                # Create a unique ID for this chunk
-                chunk_id = f"{pinecone_id}_chunk_{i}"
+                    if checkpoint_key:
+                        await checkpoint_store.put_json(checkpoint_key, embedded_stage, vectors)
                 
-                vectors.append((chunk_id, embedding, metadata))
+                # Upsert this batch to Pinecone
+                await pinecone_client.upsert_vectors([tuple(vector) for vector in vectors], namespace)
+                if checkpoint_key:
+                    await checkpoint_store.mark(checkpoint_key, upserted_stage)
+                written_vectors.extend(tuple(vector) for vector in vectors)
             
-            # Upsert vectors to Pinecone
-            await pinecone_client.upsert_vectors(vectors, namespace)
+            # Record the chunk count so vector IDs can be rebuilt without listing the index
+            await chunk_manifest.record(pinecone_id, file_id, chunk_count=len(chunks))
+            
+            # Keep the local vector tier in sync; a resumed ingest did not see every
+            # vector, so the file is dropped and mirrored from Pinecone on next use
+            if len(written_vectors) == len(chunks):
+                await local_vector_tier.replace_file(file_id, written_vectors, namespace, pinecone_id)
+            else:
+                await local_vector_tier.remove_file(file_id, namespace)
+            
+            # Cached retrievals may predate this file's chunks
+            from app.services.rag_service import rag_service
+            rag_service.invalidate_file(file_id)
             
             logger.info(f"Processed {len(chunks)} chunks for file {file_id}")
             return pinecone_id
@@ -267,6 +256,221 @@ class EmbeddingService:
             logger.error(f"Error processing file content: {e}")
             raise
 
+    async def process_enrichment_content(
+        self,
+        file_id: str,
+        file_path: str,
+        pinecone_id: str,
+        texts: List[str],
+        source: str,
+        namespace: str = ""
+    ) -> int:
+        """
+        Embeds and stores deferred enrichment text (image and frame descriptions) for a file.
+        
+        Enrichment chunks share the file's Pinecone ID prefix, so prefix-based listing
+        and deletion cover them along with the text chunks.
+        
+        Args:
+            file_id: The ID of the file.
+            file_path: The path of the file in storage.
+            pinecone_id: The Pinecone ID assigned to the file by process_file_content.
+            texts: The enrichment text blocks.
+            source: The source name (e.g., file name).
+            namespace: The namespace to store vectors in.
+            
+        Returns:
+            int: The number of enrichment chunks stored.
+        """
+        try:
+            from app.services.file_service import file_service
+            file_metadata = await file_service.get_file_metadata(file_id)
+            description = file_metadata.description if file_metadata else None
+            metadata_dict = file_metadata.metadata if file_metadata else {}
+            
+            # Chunk each enrichment block separately so descriptions are not merged
+            chunks = []
+            for text in texts:
+                chunks.extend(await self.chunk_text(text))
+            
+            if not chunks:
+                logger.info(f"No enrichment chunks generated for file {file_id}")
+                return 0
+            
+            embeddings = []
+            for start in range(0, len(chunks), settings.EMBEDDING_BATCH_SIZE):
+                embeddings.extend(await self.generate_embeddings(chunks[start:start + settings.EMBEDDING_BATCH_SIZE]))
+            
+            vectors = []
+            for i, (chunk, embedding) in enumerate(zip(chunks, embeddings)):
+                metadata = self._build_chunk_metadata(
+                    file_id=file_id,
+                    file_path=file_path,
+                    chunk=chunk,
+                    chunk_index=i,
+                    total_chunks=len(chunks),
+                    source=source,
+                    description=description,
+                    metadata_dict=metadata_dict
+                )
+                metadata["enrichment"] = True
+                
+                vectors.append((f"{pinecone_id}_enrich_{i}", embedding, metadata))
+            
+            await pinecone_client.upsert_vectors(vectors, namespace)
+            await chunk_manifest.record(pinecone_id, file_id, enrich_count=len(chunks))
+            await local_vector_tier.add_vectors(file_id, vectors, namespace, pinecone_id)
+            
+            from app.services.rag_service import rag_service
+            rag_service.invalidate_file(file_id)
+            
+            logger.info(f"Processed {len(chunks)} enrichment chunks for file {file_id}")
+            return len(chunks)
+        except Exception as e:
+            logger.error(f"Error processing enrichment content: {e}")
+            raise
+
+    def _build_chunk_metadata(
+        self,
+        file_id: str,
+        file_path: str,
+        chunk: str,
+        chunk_index: int,
+        total_chunks: int,
+        source: str,
+        description: Optional[str],
+        metadata_dict: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """
+        Builds the Pinecone metadata for a single chunk, keeping it within size limits.
+        
+        Args:
+            file_id: The ID of the file.
+            file_path: The path of the file in storage.
+            chunk: The chunk text.
+            chunk_index: The index of the chunk within the file.
+            total_chunks: The number of chunks in the file.
+            source: The source name (e.g., file name).
+            description: The file description, if any.
+            metadata_dict: The file-level metadata, if any.
+            
+        Returns:
+            Dict[str, Any]: The chunk metadata.
+        """
+        # Pinecone metadata limit is 40KB (40960 bytes)
+        MAX_METADATA_BYTES = 30000
+        
+        # Truncate the chunk if needed to fit within metadata limits
+        chunk_for_metadata = chunk
+        chunk_bytes = len(chunk.encode('utf-8'))
+        
+        if chunk_bytes > MAX_METADATA_BYTES:
+            # Truncate the chunk to fit within limits
+            # This is a simple truncation; in production you might want 
+            # to implement a smarter truncation that preserves meaning
+            truncate_ratio = MAX_METADATA_BYTES / chunk_bytes
+            truncate_length = int(len(chunk) * truncate_ratio)
+            chunk_for_metadata = chunk[:truncate_length] + "... [truncated]"
+            logger.warning(f"Truncated chunk {chunk_index} from {chunk_bytes} bytes to {len(chunk_for_metadata.encode('utf-8'))} bytes")
+        
+        # Create metadata for the vector
+        metadata = {
+            "file_id": file_id,
+            "file_path": file_path,
+            "text_chunk": chunk_for_metadata,
+            "chunk_index": chunk_index,
+            "source": source,
+            "total_chunks": total_chunks
+        }
+        
+        # Add file description and metadata if available
+        if description:
+            metadata["description"] = description
+        
+        if metadata_dict:
+            # Include file metadata while ensuring it won't exceed size limits
+            # First check the size of the current metadata
+            metadata_json = json.dumps(metadata)
+            current_metadata_size = len(metadata_json.encode('utf-8'))
+            
+            # Calculate how much space we have left for additional metadata
+            remaining_bytes = MAX_METADATA_BYTES - current_metadata_size
+            
+            if remaining_bytes > 1000:  # Ensure we have enough space to be worth adding metadata
+                # Process metadata to ensure all values are Pinecone-compatible
+                # Pinecone only accepts strings, numbers, booleans, or arrays of strings
+                pinecone_compatible_metadata = {}
+                
+                for key, value in metadata_dict.items():
+                    # Skip null values
+                    if value is None:
+                        continue
+                        
+                    # Handle different value types
+                    if isinstance(value, (str, int, float, bool)) or (isinstance(value, list) and all(isinstance(item, str) for item in value)):
+                        # These types are directly supported by Pinecone
+                        pinecone_compatible_metadata[key] = value
+                    elif isinstance(value, list):
+                        # Convert non-string lists to string representations
+                        pinecone_compatible_metadata[key] = json.dumps(value)
+                    elif isinstance(value, dict) or isinstance(value, object):
+                        # Convert dictionaries and other objects to string representations
+                        pinecone_compatible_metadata[key] = json.dumps(value)
+                    else:
+                        # For any other types, convert to string
+                        pinecone_compatible_metadata[key] = str(value)
+                
+                # Check if the processed metadata fits within the remaining space
+                compatible_metadata_json = json.dumps(pinecone_compatible_metadata)
+                compatible_metadata_size = len(compatible_metadata_json.encode('utf-8'))
+                
+                if compatible_metadata_size <= remaining_bytes:
+                    # We can include all the compatible metadata
+                    metadata.update(pinecone_compatible_metadata)
+                else:
+                    # Only include metadata fields that fit
+                    logger.warning(f"Compatible metadata size ({compatible_metadata_size} bytes) exceeds remaining space ({remaining_bytes} bytes). Adding partial metadata.")
+                    
+                    # Add fields one by one until we reach the limit
+                    current_size = current_metadata_size
+                    for key, value in pinecone_compatible_metadata.items():
+                        value_json = json.dumps({key: value})
+                        value_size = len(value_json.encode('utf-8'))
+                        
+                        if current_size + value_size <= MAX_METADATA_BYTES:
+                            metadata[key] = value
+                            current_size += value_size
+                        else:
+                            break
+            
+            # Final check to ensure we haven't exceeded limit with our additions
+            final_metadata_json = json.dumps(metadata)
+            final_metadata_size = len(final_metadata_json.encode('utf-8'))
+            
+            if final_metadata_size > MAX_METADATA_BYTES:
+                # If we somehow still exceeded the limit, keep only the essential fields
+                logger.warning(f"Final metadata size ({final_metadata_size} bytes) still exceeds limit. Keeping only essential fields.")
+                
+                essential_fields = ["file_id", "file_path", "text_chunk", "chunk_index", "source", "total_chunks", "description"]
+                filtered_metadata = {k: metadata[k] for k in essential_fields if k in metadata}
+                metadata = filtered_metadata
+        
+        return metadata
+
+    @staticmethod
+    def _file_id_from_pinecone_id(pinecone_id: str) -> str:
+        """
+        Recovers the file ID from a Pinecone ID of the form file_{file_id}_{hash}.
+        
+        Args:
+            pinecone_id: The Pinecone ID.
+            
+        Returns:
+            str: The file ID (the Pinecone ID itself if it does not match the format).
+        """
+        match = re.fullmatch(r"file_(.+)_[0-9a-f]{8}", pinecone_id)
+        return match.group(1) if match else pinecone_id
+
     async def delete_file_vectors(self, file_id: str, namespace: str = "") -> Dict[str, Any]:
         """
         Deletes all vectors for a file from Pinecone.
@@ -298,8 +502,21 @@ class EmbeddingService:
             Dict[str, Any]: The deletion response.
         """
         try:
-            # Get the list of vectors with the given prefix
-            vector_list = await pinecone_client.list_vectors(prefix=pinecone_id, namespace=namespace)
+            # Cached retrievals must not keep serving the deleted chunks
+            from app.services.enrichment_service import enrichment_service
+            from app.services.rag_service import rag_service
+            manifest_entry = await chunk_manifest.get(pinecone_id)
+            file_id = manifest_entry["file_id"] if manifest_entry else self._file_id_from_pinecone_id(pinecone_id)
+            
+            # A running enrichment would upsert chunks for the file after the delete
+            await enrichment_service.cancel(file_id)
+            rag_service.invalidate_file(file_id)
+            await local_vector_tier.remove_file(file_id, namespace)
+            
+            # Build the vector IDs from the manifest, listing the index only for unknown files
+            vector_list = await chunk_manifest.vector_ids(pinecone_id)
+            if vector_list is None:
+                vector_list = await pinecone_client.list_vectors(prefix=pinecone_id, namespace=namespace)
             
             if not vector_list:
                 logger.info(f"No vectors found with Pinecone ID prefix: {pinecone_id}")
@@ -307,6 +524,7 @@ class EmbeddingService:
             
             # Delete the vectors
             response = await pinecone_client.delete_vectors(ids=vector_list, namespace=namespace)
+            await chunk_manifest.remove(pinecone_id)
             
             logger.info(f"Deleted {len(vector_list)} vectors with Pinecone ID prefix: {pinecone_id}")
             return {"deleted_count": len(vector_list), "message": f"Deleted {len(vector_list)} vectors"}
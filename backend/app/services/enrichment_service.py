@@ -0,0 +1,206 @@
+"""
+Enrichment service module for deferred vision processing of ingested files.
+"""
+import asyncio
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.logging import logger
+from app.services.embedding_service import embedding_service
+from app.services.extraction_executor import extraction_executor
+
+
+class EnrichmentService:
+    """
+    Service for the second phase of ingestion.
+
+    Phase one indexes the natively extracted text so a file is searchable right
+    away. This service then describes embedded images and video frames in the
+    background and upserts the descriptions as additional chunks, tracking a
+    per-file enrichment status. Statuses are kept in a bounded in-process
+    cache, so they are only visible in the process that ran the enrichment
+    and expire after ENRICHMENT_STATUS_TTL_SECONDS.
+    """
+
+    # File types whose processors implement describe_visuals()
+    ENRICHABLE_FILE_TYPES = {
+        "application/pdf",
+        "text/markdown",
+        "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+        "application/vnd.openxmlformats-officedocument.presentationml.presentation",
+        "video/mp4",
+        "video/webm",
+    }
+
+    def __init__(self):
+        """
+        Initializes the enrichment service.
+        """
+        self._status: TTLCache[Dict[str, Any]] = TTLCache(
+            max_size=settings.ENRICHMENT_STATUS_MAX_ENTRIES,
+            ttl_seconds=settings.ENRICHMENT_STATUS_TTL_SECONDS,
+        )
+        self._tasks: Dict[str, asyncio.Task] = {}
+
+    def supports(self, file_type: str) -> bool:
+        """
+        Checks whether a file type has visual content that can be enriched later.
+
+        Args:
+            file_type: The MIME type of the file.
+
+        Returns:
+            bool: True if the file type supports deferred enrichment.
+        """
+        return file_type in self.ENRICHABLE_FILE_TYPES
+
+    def get_status(self, file_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Returns the enrichment status for a file.
+
+        Args:
+            file_id: The ID of the file.
+
+        Returns:
+            Optional[Dict[str, Any]]: The status record, or None if no enrichment was scheduled.
+        """
+        status = self._status.get(file_id)
+        if status is None and file_id in self._tasks:
+            # The record was evicted while the enrichment is still in flight
+            return {"file_id": file_id, "status": "running", "updated_at": datetime.now(timezone.utc).isoformat()}
+        return status
+
+    def _set_status(self, file_id: str, status: str, **details: Any) -> None:
+        """
+        Records the enrichment status for a file.
+
+        Args:
+            file_id: The ID of the file.
+            status: One of pending, running, completed or failed.
+            **details: Additional fields to store with the status.
+        """
+        self._status.set(file_id, {
+            "file_id": file_id,
+            "status": status,
+            "updated_at": datetime.now(timezone.utc).isoformat(),
+            **details,
+        })
+
+    def schedule(
+        self,
+        file_id: str,
+        file_type: str,
+        file_content: bytes,
+        file_path: str,
+        pinecone_id: str,
+        source: str,
+        namespace: str = "",
+    ) -> None:
+        """
+        Schedules background enrichment for a file whose text is already indexed.
+
+        Args:
+            file_id: The ID of the file.
+            file_type: The MIME type of the file.
+            file_content: Raw file content bytes.
+            file_path: The path of the file in storage.
+            pinecone_id: The Pinecone ID assigned during text indexing.
+            source: The source name (e.g., file name).
+            namespace: The namespace to store vectors in.
+        """
+        existing = self._tasks.get(file_id)
+        if existing and not existing.done():
+            logger.info(f"Enrichment already running for file {file_id}")
+            return
+
+        self._set_status(file_id, "pending")
+        task = asyncio.create_task(
+            self._enrich(file_id, file_type, file_content, file_path, pinecone_id, source, namespace)
+        )
+        self._tasks[file_id] = task
+        task.add_done_callback(lambda _: self._tasks.pop(file_id, None))
+
+    async def _enrich(
+        self,
+        file_id: str,
+        file_type: str,
+        file_content: bytes,
+        file_path: str,
+        pinecone_id: str,
+        source: str,
+        namespace: str,
+    ) -> None:
+        """
+        Describes a file's images or frames and upserts the enrichment chunks.
+
+        Args:
+            file_id: The ID of the file.
+            file_type: The MIME type of the file.
+            file_content: Raw file content bytes.
+            file_path: The path of the file in storage.
+            pinecone_id: The Pinecone ID assigned during text indexing.
+            source: The source name (e.g., file name).
+            namespace: The namespace to store vectors in.
+        """
+        try:
+            self._set_status(file_id, "running")
+
+            (texts,) = await extraction_executor.run(
+                file_type, file_content, file_path, operations=("describe_visuals",)
+            )
+
+            chunk_count = await embedding_service.process_enrichment_content(
+                file_id=file_id,
+                file_path=file_path,
+                pinecone_id=pinecone_id,
+                texts=texts,
+                source=source,
+                namespace=namespace,
+            )
+
+            self._set_status(file_id, "completed", visual_count=len(texts), enrichment_chunks=chunk_count)
+            logger.info(f"Enrichment completed for file {file_id}: {chunk_count} chunks")
+        except asyncio.CancelledError:
+            self._set_status(file_id, "failed", error="Enrichment cancelled")
+            raise
+        except Exception as e:
+            logger.error(f"Error enriching file {file_id}: {e}")
+            self._set_status(file_id, "failed", error=str(e))
+
+    async def cancel(self, file_id: str) -> bool:
+        """
+        Cancels a file's enrichment and waits for it to stop.
+
+        Called before a file's vectors are deleted, so a running enrichment
+        cannot upsert chunks or manifest entries for the deleted file.
+
+        Args:
+            file_id: The ID of the file.
+
+        Returns:
+            bool: True if an enrichment was running.
+        """
+        task = self._tasks.get(file_id)
+        if task is None or task.done():
+            return False
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        logger.info(f"Cancelled enrichment of file {file_id}")
+        return True
+
+    async def close(self) -> None:
+        """
+        Cancels any enrichment still in progress.
+        """
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+            logger.info(f"Cancelled {len(tasks)} enrichment tasks")
+
+
+# Global instance of the enrichment service
+enrichment_service = EnrichmentService()
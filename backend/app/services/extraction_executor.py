@@ -0,0 +1,326 @@
+"""
+Extraction executor module for running file processors outside the API event loop.
+"""
+import asyncio
+import multiprocessing
+import weakref
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import shared_memory
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+from app.core.admission import admission
+from app.core.config import settings
+from app.core.logging import logger
+
+
+def _init_worker(memory_limit_mb: int, admission_share: float = 1.0) -> None:
+    """
+    Initializes an extraction worker process.
+
+    Args:
+        memory_limit_mb: Maximum data segment size for the worker in megabytes (0 for no limit)
+        admission_share: Fraction of each provider quota available to the worker's vision calls
+    """
+    admission.set_share(admission_share)
+    if memory_limit_mb <= 0:
+        return
+    try:
+        import resource
+
+        limit = memory_limit_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_DATA, (limit, limit))
+    except (ImportError, ValueError, OSError) as e:
+        logger.warning(f"Could not apply extraction memory limit: {e}")
+
+
+def _read_shared_content(shm_name: str, size: int) -> bytes:
+    """
+    Reads file content from a shared memory block created by the API process.
+
+    Args:
+        shm_name: Name of the shared memory block
+        size: Number of content bytes in the block
+
+    Returns:
+        bytes: The file content
+    """
+    # Workers share the API process's resource tracker, which unlinks the block
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        return bytes(shm.buf[:size])
+    finally:
+        shm.close()
+
+
+async def _run_processor(
+    file_type: str,
+    file_content: bytes,
+    file_path: str,
+    operations: Sequence[str],
+    options: Dict[str, Any],
+) -> Tuple[Any, ...]:
+    """
+    Runs the requested processor operations for a file.
+
+    Args:
+        file_type: MIME type of the file
+        file_content: Raw file content bytes
+        file_path: Path to the file
+        operations: Processor coroutine method names to run, in order
+        options: Attributes to set on the processor before running
+
+    Returns:
+        Tuple[Any, ...]: The result of each operation
+    """
+    from app.services.file_processors import FileProcessorFactory
+
+    processor = FileProcessorFactory.get_processor(file_type)
+    for name, value in options.items():
+        setattr(processor, name, value)
+
+    results = []
+    for operation in operations:
+        results.append(await getattr(processor, operation)(file_content, file_path))
+    return tuple(results)
+
+
+def _extract_in_worker(
+    shm_name: str,
+    size: int,
+    file_type: str,
+    file_path: str,
+    operations: Sequence[str],
+    options: Dict[str, Any],
+) -> Tuple[Any, ...]:
+    """
+    Worker entry point: reads the file from shared memory and runs the processor.
+
+    Args:
+        shm_name: Name of the shared memory block holding the file content
+        size: Number of content bytes in the block
+        file_type: MIME type of the file
+        file_path: Path to the file
+        operations: Processor coroutine method names to run, in order
+        options: Attributes to set on the processor before running
+
+    Returns:
+        Tuple[Any, ...]: The result of each operation
+    """
+    from app.services.file_processors.image_fetcher import image_fetcher
+
+    async def run() -> Tuple[Any, ...]:
+        try:
+            return await _run_processor(file_type, file_content, file_path, operations, options)
+        finally:
+            # Each job runs on its own event loop, so its HTTP connections are closed with it
+            await image_fetcher.close()
+
+    file_content = _read_shared_content(shm_name, size)
+    return asyncio.run(run())
+
+
+class ExtractionExecutor:
+    """
+    Runs CPU-bound file extraction in a pool of worker processes.
+
+    File bytes are handed to workers through a shared memory block rather than
+    pickled into the task, each task has a timeout, and workers run under a
+    memory limit. With zero workers, extraction runs in the API process.
+    """
+
+    def __init__(
+        self,
+        max_workers: int = settings.EXTRACTION_PROCESS_WORKERS,
+        timeout: float = settings.EXTRACTION_TIMEOUT_SECONDS,
+        memory_limit_mb: int = settings.EXTRACTION_MEMORY_LIMIT_MB,
+    ):
+        """
+        Initializes the extraction executor.
+
+        Args:
+            max_workers: Number of worker processes (0 to extract in-process)
+            timeout: Timeout for a single extraction task in seconds
+            memory_limit_mb: Memory limit for each worker process in megabytes
+        """
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.memory_limit_mb = memory_limit_mb
+        self._pool: Optional[ProcessPoolExecutor] = None
+        # Pools torn down because one of their tasks timed out; their other tasks are retried
+        self._recycled: "weakref.WeakSet[ProcessPoolExecutor]" = weakref.WeakSet()
+
+    def configure_admission(self) -> None:
+        """
+        Gives the API process its share of each provider quota.
+
+        With a worker pool, LLM_ADMISSION_WORKER_SHARE of every quota is split
+        between the workers, so the API process keeps the rest and the host's
+        total stays within the quota. Call once at API startup.
+        """
+        if self.max_workers > 0:
+            admission.set_share(1.0 - settings.LLM_ADMISSION_WORKER_SHARE)
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        """
+        Returns the process pool, creating it on first use.
+
+        Returns:
+            ProcessPoolExecutor: The worker process pool
+        """
+        if self._pool is None:
+            # Workers split the ingest-only share the API process leaves free (see configure_admission)
+            admission_share = settings.LLM_ADMISSION_WORKER_SHARE / self.max_workers
+
+            # Spawn rather than fork: the API process has a running event loop and threads
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(self.memory_limit_mb, admission_share),
+            )
+            logger.info(f"Extraction process pool started with {self.max_workers} workers")
+        return self._pool
+
+    def _reset_pool(self, pool: ProcessPoolExecutor) -> None:
+        """
+        Tears down a process pool, terminating any stuck workers.
+
+        Only the given pool is torn down, so a task that fails on a pool that
+        was already replaced does not take down the replacement.
+
+        Args:
+            pool: The pool the failed task was submitted to
+        """
+        if self._pool is pool:
+            self._pool = None
+        if pool in self._recycled:
+            return
+        self._recycled.add(pool)
+        # ProcessPoolExecutor cannot cancel a running task, so terminate the workers directly
+        for process in list((getattr(pool, "_processes", None) or {}).values()):
+            process.terminate()
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    async def run(
+        self,
+        file_type: str,
+        file_content: bytes,
+        file_path: str,
+        operations: Sequence[str] = ("process", "get_metadata"),
+        options: Optional[Dict[str, Any]] = None,
+    ) -> Tuple[Any, ...]:
+        """
+        Runs processor operations for a file in the extraction pool.
+
+        Args:
+            file_type: MIME type of the file
+            file_content: Raw file content bytes
+            file_path: Path to the file
+            operations: Processor coroutine method names to run, in order
+            options: Attributes to set on the processor before running
+
+        Returns:
+            Tuple[Any, ...]: The result of each operation
+
+        Raises:
+            ValueError: If the file type is not supported
+            TimeoutError: If extraction exceeds the configured timeout
+        """
+        options = options or {}
+
+        if self.max_workers <= 0:
+            return await asyncio.wait_for(
+                _run_processor(file_type, file_content, file_path, operations, options),
+                timeout=self.timeout,
+            )
+
+        size = len(file_content)
+        shm = shared_memory.SharedMemory(create=True, size=max(size, 1))
+        try:
+            shm.buf[:size] = file_content
+            for attempt in range(2):
+                pool = self._get_pool()
+                future = pool.submit(
+                    _extract_in_worker, shm.name, size, file_type, file_path, tuple(operations), options
+                )
+                try:
+                    return await asyncio.wait_for(asyncio.wrap_future(future), timeout=self.timeout)
+                except asyncio.TimeoutError:
+                    logger.error(f"Extraction of {file_path} timed out after {self.timeout}s; restarting worker pool")
+                    self._reset_pool(pool)
+                    raise TimeoutError(f"Extraction timed out after {self.timeout} seconds")
+                except BrokenProcessPool as e:
+                    if pool in self._recycled and attempt == 0:
+                        # The pool was restarted for another task's timeout, not because of this file
+                        logger.warning(f"Extraction pool was restarted while processing {file_path}; retrying")
+                        continue
+                    logger.error(f"Extraction worker died while processing {file_path} (memory limit?): {e}")
+                    self._reset_pool(pool)
+                    raise
+        finally:
+            shm.close()
+            shm.unlink()
+
+    async def extract(
+        self, file_type: str, file_content: bytes, file_path: str, describe_images: bool = True
+    ) -> Tuple[str, Dict[str, Any]]:
+        """
+        Extracts text and metadata from a file.
+
+        Args:
+            file_type: MIME type of the file
+            file_content: Raw file content bytes
+            file_path: Path to the file
+            describe_images: Whether to describe embedded images and frames inline
+
+        Returns:
+            Tuple[str, Dict[str, Any]]: The extracted text and metadata
+        """
+        text, metadata = await self.run(
+            file_type, file_content, file_path, options={"describe_images": describe_images}
+        )
+        return text, metadata
+
+    async def extract_text(self, file_type: str, file_content: bytes, file_path: str) -> str:
+        """
+        Extracts text from a file.
+
+        Args:
+            file_type: MIME type of the file
+            file_content: Raw file content bytes
+            file_path: Path to the file
+
+        Returns:
+            str: The extracted text
+        """
+        (text,) = await self.run(file_type, file_content, file_path, operations=("process",))
+        return text
+
+    async def extract_metadata(self, file_type: str, file_content: bytes, file_path: str) -> Dict[str, Any]:
+        """
+        Extracts metadata from a file.
+
+        Args:
+            file_type: MIME type of the file
+            file_content: Raw file content bytes
+            file_path: Path to the file
+
+        Returns:
+            Dict[str, Any]: The extracted metadata
+        """
+        (metadata,) = await self.run(file_type, file_content, file_path, operations=("get_metadata",))
+        return metadata
+
+    def close(self) -> None:
+        """
+        Shuts down the worker process pool.
+        """
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+            logger.info("Extraction process pool shut down")
+
+
+# Global instance of the extraction executor
+extraction_executor = ExtractionExecutor()
@@ -10,6 +10,10 @@ class FileProcessor(ABC):
     Base abstract class for file processors.
     """
     
+    # Whether process() should describe embedded images and frames with a vision
+    # model inline. Two-phase ingest disables this and calls describe_visuals() later.
+    describe_images: bool = True
+    
     @abstractmethod
     async def process(self, file_content: bytes, file_path: str) -> str:
         """
@@ -37,6 +41,22 @@ class FileProcessor(ABC):
             Dict[str, Any]: Extracted metadata
         """
         pass
+    
+    async def describe_visuals(self, file_content: bytes, file_path: str) -> List[str]:
+        """
+        Describe embedded images and frames with a vision model.
+        
+        Used by deferred enrichment to add the content that process() skips when
+        describe_images is False. Processors without visual content return nothing.
+        
+        Args:
+            file_content: Raw file content bytes
+            file_path: Path to the file
+            
+        Returns:
+            List[str]: Enrichment text blocks, one per image or frame
+        """
+        return []
 
 
 # Now import specific processors
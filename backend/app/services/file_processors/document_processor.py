@@ -3,16 +3,16 @@ Document processor module for extracting text from PDF and Word documents.
 """
 import io
 import os
-import tempfile
 from typing import Dict, Any, List, Tuple
 
 import fitz  # PyMuPDF
-import docx
 from PIL import Image
 
+from app.core.admission import PRIORITY_INGEST, admission
 from app.core.config import settings
 from app.core.logging import logger
 from app.services.file_processors import FileProcessor
+from app.services.file_processors.office_document import OfficeDocumentMixin
 
 
 class DocumentProcessor(FileProcessor):
@@ -80,10 +80,13 @@ class DocumentProcessor(FileProcessor):
                 2. Provide a detailed description of what's in this image.
             """
 
-            response = client.models.generate_content(
-                model="gemini-1.5-flash-8b",
-                contents=[combined_prompt, image_part]
-            )
+            async with admission.admit(
+                "gemini", "gemini-1.5-flash-8b", tokens=settings.LLM_ADMISSION_VISION_TOKENS, priority=PRIORITY_INGEST
+            ):
+                response = client.models.generate_content(
+                    model="gemini-1.5-flash-8b",
+                    contents=[combined_prompt, image_part]
+                )
             
             return response.text
         except Exception as e:
@@ -121,8 +124,9 @@ class PDFProcessor(DocumentProcessor):
                 # Extract text from the page
                 page_text = page.get_text()
                 
-                # Extract images and their positions from the page
-                image_info = await self._extract_images_with_positions(page)
+                # Extract images and their positions from the page (skipped when
+                # image description is deferred to enrichment)
+                image_info = await self._extract_images_with_positions(page) if self.describe_images else []
                 
                 if not image_info and not page_text.strip():
                     # Empty page
@@ -247,6 +251,35 @@ class PDFProcessor(DocumentProcessor):
             logger.error(f"Error extracting PDF metadata: {e}")
             return base_metadata
     
+    async def describe_visuals(self, file_content: bytes, file_path: str) -> List[str]:
+        """
+        Describe the images embedded in each page of a PDF.
+        
+        Args:
+            file_content: Raw PDF file content bytes
+            file_path: Path to the PDF file
+            
+        Returns:
+            List[str]: Image descriptions tagged with their page number
+        """
+        try:
+            pdf_document = fitz.open(stream=file_content, filetype="pdf")
+            
+            descriptions = []
+            for page_num in range(len(pdf_document)):
+                page = pdf_document[page_num]
+                for img, _, _ in await self._extract_images_with_positions(page):
+                    img_text = await self._extract_text_and_description_from_image(img)
+                    if img_text:
+                        descriptions.append(f"[PAGE {page_num + 1}]\n[IMAGE CONTENT START]\n{img_text}\n[IMAGE CONTENT END]")
+            
+            pdf_document.close()
+            
+            return descriptions
+        except Exception as e:
+            logger.error(f"Error describing PDF images: {e}")
+            raise
+    
     async def _extract_images_with_positions(self, page: fitz.Page) -> List[Tuple[Image.Image, float, float]]:
         """
         Extract images from a PDF page along with their positions.
@@ -321,7 +354,7 @@ class PDFProcessor(DocumentProcessor):
         return images
 
 
-class WordProcessor(DocumentProcessor):
+class WordProcessor(OfficeDocumentMixin, DocumentProcessor):
     """
     Processor for Word documents.
     Handles: application/vnd.openxmlformats-officedocument.wordprocessingml.document
@@ -339,14 +372,8 @@ class WordProcessor(DocumentProcessor):
             str: Extracted text content
         """
         try:
-            # Write content to a temporary file because python-docx requires a file path
-            with tempfile.NamedTemporaryFile(delete=False, suffix='.docx') as temp_file:
-                temp_file.write(file_content)
-                temp_file.flush()
-                temp_path = temp_file.name
-            
-            # Process the Word document
-            doc = docx.Document(temp_path)
+            # Parse the Word document from the shared in-memory handle
+            doc = self._open_office_document(file_content).word_document
             
             # Extract text from paragraphs and tables
             document_content = []
@@ -369,11 +396,8 @@ class WordProcessor(DocumentProcessor):
                 if table_content:
                     document_content.append("\n".join(table_content))
             
-            # Clean up the temporary file
-            os.unlink(temp_path)
-            
-            # Process images if there are any
-            images = await self._extract_images_from_doc(file_content)
+            # Process images if there are any (unless deferred to enrichment)
+            images = await self._extract_images_from_doc(file_content) if self.describe_images else []
             for img in images:
                 img_text = await self._extract_text_and_description_from_image(img)
                 if img_text:
@@ -399,14 +423,8 @@ class WordProcessor(DocumentProcessor):
         base_metadata = await super().get_metadata(file_content, file_path)
         
         try:
-            # Write content to a temporary file because python-docx requires a file path
-            with tempfile.NamedTemporaryFile(delete=False, suffix='.docx') as temp_file:
-                temp_file.write(file_content)
-                temp_file.flush()
-                temp_path = temp_file.name
-            
-            # Process the Word document
-            doc = docx.Document(temp_path)
+            # Reuse the in-memory handle opened for text extraction
+            doc = self._open_office_document(file_content).word_document
             
             # Count images in the document
             images = await self._extract_images_from_doc(file_content)
@@ -434,14 +452,29 @@ class WordProcessor(DocumentProcessor):
             # Add to base metadata
             base_metadata.update(metadata)
             
-            # Clean up the temporary file
-            os.unlink(temp_path)
-            
             return base_metadata
         except Exception as e:
             logger.error(f"Error extracting Word document metadata: {e}")
             return base_metadata
     
+    async def describe_visuals(self, file_content: bytes, file_path: str) -> List[str]:
+        """
+        Describe the images embedded in a Word document.
+        
+        Args:
+            file_content: Raw Word document file content bytes
+            file_path: Path to the Word document file
+            
+        Returns:
+            List[str]: Image descriptions
+        """
+        descriptions = []
+        for img in await self._extract_images_from_doc(file_content):
+            img_text = await self._extract_text_and_description_from_image(img)
+            if img_text:
+                descriptions.append(f"[IMAGE CONTENT START]\n{img_text}\n[IMAGE CONTENT END]")
+        return descriptions
+    
     async def _extract_images_from_doc(self, file_content: bytes) -> List[Image.Image]:
         """
         Extract images from a Word document.
@@ -455,31 +488,17 @@ class WordProcessor(DocumentProcessor):
         images = []
         
         try:
-            # Write content to a temporary file
-            with tempfile.NamedTemporaryFile(delete=False, suffix='.docx') as temp_file:
-                temp_file.write(file_content)
-                temp_file.flush()
-                temp_path = temp_file.name
-            
-            # Use zipfile to extract media from docx (which is a zip file)
-            import zipfile
-            
-            with zipfile.ZipFile(temp_path) as doc_zip:
-                # Find all image files in the zip
-                image_files = [f for f in doc_zip.namelist() if f.startswith('word/media/')]
-                
-                for image_path in image_files:
-                    try:
-                        image_data = doc_zip.read(image_path)
-                        img = Image.open(io.BytesIO(image_data))
-                        # Only process images that are big enough to contain meaningful text
-                        if img.width > 100 and img.height > 100:
-                            images.append(img)
-                    except Exception as e:
-                        logger.error(f"Error extracting image {image_path} from Word document: {e}")
-            
-            # Clean up
-            os.unlink(temp_path)
+            # A .docx is a ZIP container; read media from the already opened archive
+            document = self._open_office_document(file_content)
+            
+            for image_path, image_data in document.read_media('word/media/'):
+                try:
+                    img = Image.open(io.BytesIO(image_data))
+                    # Only process images that are big enough to contain meaningful text
+                    if img.width > 100 and img.height > 100:
+                        images.append(img)
+                except Exception as e:
+                    logger.error(f"Error extracting image {image_path} from Word document: {e}")
             
             return images
         except Exception as e:
@@ -0,0 +1,267 @@
+"""
+Remote image fetcher module with pooled async HTTP, size limits and an on-disk cache.
+"""
+import asyncio
+import hashlib
+import os
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import httpx
+
+from app.core.config import settings
+from app.core.executors import ingest_cpu_executor
+from app.core.logging import logger
+from app.core.metrics import metrics
+
+
+class ImageTooLargeError(Exception):
+    """
+    Raised when a remote image exceeds the configured size limit.
+    """
+
+
+class RemoteImageFetcher:
+    """
+    Fetches remote images through a shared async HTTP client.
+
+    Downloads are bounded by a concurrency limit and a per-image size cap, and
+    successful responses are stored on disk keyed by URL so re-ingesting the
+    same notes does not download the images again. The disk cache is kept
+    under a size limit by evicting the least recently used images.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = settings.IMAGE_FETCH_CONCURRENCY,
+        max_bytes: int = settings.IMAGE_FETCH_MAX_BYTES,
+        timeout: float = settings.IMAGE_FETCH_TIMEOUT_SECONDS,
+        cache_dir: str = settings.IMAGE_FETCH_CACHE_DIR,
+        cache_max_bytes: int = settings.IMAGE_FETCH_CACHE_MAX_MB * 1024 * 1024,
+    ):
+        """
+        Initialize the fetcher.
+
+        Args:
+            max_concurrency: Maximum number of simultaneous downloads
+            max_bytes: Maximum size of a single image in bytes
+            timeout: Timeout for a single download in seconds
+            cache_dir: Directory for the on-disk URL cache
+            cache_max_bytes: Size limit of the on-disk cache (0 for no limit)
+        """
+        self.max_concurrency = max_concurrency
+        self.max_bytes = max_bytes
+        self.timeout = timeout
+        self.cache_dir = Path(cache_dir)
+        self.cache_max_bytes = cache_max_bytes
+        # Approximate cache size, counted on first write and corrected by every eviction scan
+        self._cache_bytes: Optional[int] = None
+        self._cache_lock = threading.Lock()
+        self._client: Optional[httpx.AsyncClient] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _get_client(self) -> httpx.AsyncClient:
+        """
+        Returns the pooled HTTP client for the running event loop.
+
+        Clients and semaphores are bound to an event loop, so they are recreated
+        if the fetcher is used from a different loop (e.g. inside a worker process).
+        A client left open on another loop is closed on that loop.
+
+        Returns:
+            httpx.AsyncClient: The pooled HTTP client
+        """
+        loop = asyncio.get_running_loop()
+        if self._client is not None and self._loop is not loop:
+            stale_client, stale_loop = self._client, self._loop
+            self._client = None
+            if stale_loop is not None and stale_loop.is_running():
+                asyncio.run_coroutine_threadsafe(stale_client.aclose(), stale_loop)
+            else:
+                logger.warning("Dropping an image fetcher client whose event loop is no longer running")
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                timeout=self.timeout,
+                follow_redirects=True,
+                limits=httpx.Limits(
+                    max_connections=self.max_concurrency,
+                    max_keepalive_connections=self.max_concurrency,
+                ),
+            )
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._loop = loop
+        return self._client
+
+    def _cache_path(self, url: str) -> Path:
+        """
+        Returns the cache file path for a URL.
+
+        Args:
+            url: The image URL
+
+        Returns:
+            Path: Location of the cached image bytes
+        """
+        return self.cache_dir / hashlib.sha256(url.encode("utf-8")).hexdigest()
+
+    def _read_cache(self, url: str) -> Optional[bytes]:
+        """
+        Reads an image from the on-disk cache.
+
+        Args:
+            url: The image URL
+
+        Returns:
+            Optional[bytes]: The cached bytes, or None on a miss
+        """
+        path = self._cache_path(url)
+        try:
+            data = path.read_bytes()
+            # The modification time orders eviction
+            os.utime(path)
+            return data
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.error(f"Error reading image cache for {url}: {e}")
+            return None
+
+    def _write_cache(self, url: str, data: bytes) -> None:
+        """
+        Writes an image to the on-disk cache atomically.
+
+        Args:
+            url: The image URL
+            data: The image bytes
+        """
+        path = self._cache_path(url)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            temp_path = path.with_suffix(f".{os.getpid()}.tmp")
+            temp_path.write_bytes(data)
+            os.replace(temp_path, path)
+        except Exception as e:
+            logger.error(f"Error writing image cache for {url}: {e}")
+            return
+
+        if self.cache_max_bytes <= 0:
+            return
+        with self._cache_lock:
+            if self._cache_bytes is None:
+                self._cache_bytes = self._scan_cache()[1]
+            else:
+                self._cache_bytes += len(data)
+            if self._cache_bytes > self.cache_max_bytes:
+                self._evict_cache()
+
+    def _scan_cache(self) -> Tuple[List[Tuple[float, int, Path]], int]:
+        """
+        Lists the cached images (blocking).
+
+        Returns:
+            Tuple[List[Tuple[float, int, Path]], int]: (mtime, size, path) per image, and the total size
+        """
+        entries = []
+        for path in self.cache_dir.iterdir():
+            if path.suffix == ".tmp":
+                continue
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        return entries, sum(size for _, size, _ in entries)
+
+    def _evict_cache(self) -> None:
+        """
+        Deletes least recently used images until the cache is under 90% of its limit (blocking).
+
+        Other processes share the cache directory, so the directory is rescanned
+        instead of trusting the in-process size count.
+        """
+        entries, total = self._scan_cache()
+        target = self.cache_max_bytes * 0.9
+        evicted = 0
+        for _, size, path in sorted(entries, key=lambda entry: entry[0]):
+            if total <= target:
+                break
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+            total -= size
+            evicted += 1
+        self._cache_bytes = total
+        if evicted:
+            metrics.increment("image_fetch.cache_evicted", evicted)
+            logger.info(f"Evicted {evicted} images from the image cache")
+
+    async def fetch(self, url: str) -> Optional[bytes]:
+        """
+        Fetches a remote image, using the on-disk cache when possible.
+
+        Args:
+            url: The image URL
+
+        Returns:
+            Optional[bytes]: The image bytes, or None if the download failed
+        """
+        cached = await ingest_cpu_executor.run(self._read_cache, url)
+        if cached is not None:
+            return cached
+
+        client = self._get_client()
+        try:
+            async with self._semaphore:
+                async with client.stream("GET", url) as response:
+                    response.raise_for_status()
+
+                    # Reject early if the server announces an oversized body
+                    content_length = response.headers.get("content-length")
+                    if content_length and int(content_length) > self.max_bytes:
+                        raise ImageTooLargeError(f"{content_length} bytes exceeds limit of {self.max_bytes} bytes")
+
+                    data = bytearray()
+                    async for chunk in response.aiter_bytes():
+                        data.extend(chunk)
+                        if len(data) > self.max_bytes:
+                            raise ImageTooLargeError(f"Download exceeds limit of {self.max_bytes} bytes")
+        except Exception as e:
+            logger.error(f"Error fetching image {url}: {e}")
+            return None
+
+        image_bytes = bytes(data)
+        await ingest_cpu_executor.run(self._write_cache, url, image_bytes)
+        return image_bytes
+
+    async def fetch_many(self, urls: Iterable[str]) -> Dict[str, Optional[bytes]]:
+        """
+        Fetches several remote images concurrently.
+
+        Args:
+            urls: The image URLs (duplicates are downloaded once)
+
+        Returns:
+            Dict[str, Optional[bytes]]: Mapping of URL to image bytes (None on failure)
+        """
+        unique_urls = list(dict.fromkeys(urls))
+        if not unique_urls:
+            return {}
+
+        results = await asyncio.gather(*(self.fetch(url) for url in unique_urls))
+        return dict(zip(unique_urls, results))
+
+    async def close(self) -> None:
+        """
+        Closes the HTTP client.
+        """
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+            logger.info("Remote image fetcher client closed")
+
+
+# Global instance of the remote image fetcher
+image_fetcher = RemoteImageFetcher()
@@ -8,6 +8,7 @@ from typing import Dict, Any
 from PIL import Image
 import PIL.ExifTags
 
+from app.core.admission import PRIORITY_INGEST, admission
 from app.core.config import settings
 from app.core.logging import logger
 from app.services.file_processors import FileProcessor
@@ -122,17 +123,23 @@ class ImageProcessor(FileProcessor):
             
             # First, try to extract any text in the image
             text_prompt = "Extract all text visible in this image. If no text is visible, respond with 'No text detected.'"
-            text_response = client.models.generate_content(
-                model="gemini-1.5-flash-8b",
-                contents=[text_prompt, image_part]
-            )
+            async with admission.admit(
+                "gemini", "gemini-1.5-flash-8b", tokens=settings.LLM_ADMISSION_VISION_TOKENS, priority=PRIORITY_INGEST
+            ):
+                text_response = client.models.generate_content(
+                    model="gemini-1.5-flash-8b",
+                    contents=[text_prompt, image_part]
+                )
             
             # Then, generate a description of the image content
             desc_prompt = "Provide a detailed description of what's in this image."
-            desc_response = client.models.generate_content(
-                model="gemini-1.5-flash-8b",
-                contents=[desc_prompt, image_part]
-            )
+            async with admission.admit(
+                "gemini", "gemini-1.5-flash-8b", tokens=settings.LLM_ADMISSION_VISION_TOKENS, priority=PRIORITY_INGEST
+            ):
+                desc_response = client.models.generate_content(
+                    model="gemini-1.5-flash-8b",
+                    contents=[desc_prompt, image_part]
+                )
             
             # Combine both responses
             result = []
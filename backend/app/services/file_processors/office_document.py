@@ -0,0 +1,168 @@
+"""
+In-memory handle for Office Open XML documents (.docx, .pptx, .xlsx).
+"""
+import io
+import zipfile
+from typing import Any, List, Optional, Tuple
+
+from app.core.logging import logger
+
+
+class OfficeDocument:
+    """
+    Shared in-memory handle for an Office Open XML document.
+
+    The raw bytes are wrapped in a memoryview once and every consumer
+    (python-docx, python-pptx, openpyxl and zipfile) reads from a BytesIO over
+    that buffer instead of a temporary file. Parsed objects are cached, so text,
+    tables, media and core properties all come from the same handle.
+    """
+
+    def __init__(self, file_content: bytes):
+        """
+        Initialize the document handle.
+
+        Args:
+            file_content: Raw document file content bytes
+        """
+        self.file_content = file_content
+        self._buffer = memoryview(file_content)
+        self._zip_file: Optional[zipfile.ZipFile] = None
+        self._word_document: Any = None
+        self._presentation: Any = None
+        self._workbook: Any = None
+
+    def matches(self, file_content: bytes) -> bool:
+        """
+        Check whether this handle wraps the given content.
+
+        Args:
+            file_content: Raw document file content bytes
+
+        Returns:
+            bool: True if the handle can be reused for this content
+        """
+        return self.file_content is file_content
+
+    def stream(self) -> io.BytesIO:
+        """
+        Create a fresh file-like object over the document bytes.
+
+        Returns:
+            io.BytesIO: Seekable stream positioned at the start of the document
+        """
+        return io.BytesIO(self._buffer)
+
+    @property
+    def zip_file(self) -> zipfile.ZipFile:
+        """
+        Returns the ZIP container of the document, opened once.
+
+        Returns:
+            zipfile.ZipFile: The open ZIP container
+        """
+        if self._zip_file is None:
+            self._zip_file = zipfile.ZipFile(self.stream())
+        return self._zip_file
+
+    @property
+    def word_document(self) -> Any:
+        """
+        Returns the parsed python-docx document.
+
+        Returns:
+            docx.document.Document: The parsed Word document
+        """
+        if self._word_document is None:
+            import docx
+            self._word_document = docx.Document(self.stream())
+        return self._word_document
+
+    @property
+    def presentation(self) -> Any:
+        """
+        Returns the parsed python-pptx presentation.
+
+        Returns:
+            pptx.presentation.Presentation: The parsed presentation
+        """
+        if self._presentation is None:
+            from pptx import Presentation
+            self._presentation = Presentation(self.stream())
+        return self._presentation
+
+    @property
+    def workbook(self) -> Any:
+        """
+        Returns the openpyxl workbook, opened in read-only mode.
+
+        Returns:
+            openpyxl.Workbook: The loaded workbook
+        """
+        if self._workbook is None:
+            from openpyxl import load_workbook
+            self._workbook = load_workbook(self.stream(), read_only=True)
+        return self._workbook
+
+    def read_media(self, prefix: str) -> List[Tuple[str, bytes]]:
+        """
+        Read all media parts stored under a prefix of the ZIP container.
+
+        Args:
+            prefix: Part name prefix (e.g. 'word/media/')
+
+        Returns:
+            List[Tuple[str, bytes]]: List of tuples containing (part_name, data)
+        """
+        media = []
+        for name in self.zip_file.namelist():
+            if not name.startswith(prefix):
+                continue
+            try:
+                media.append((name, self.zip_file.read(name)))
+            except Exception as e:
+                logger.error(f"Error reading media part {name}: {e}")
+        return media
+
+    def close(self) -> None:
+        """
+        Releases the ZIP container and any parsed objects.
+        """
+        if self._zip_file is not None:
+            self._zip_file.close()
+            self._zip_file = None
+        if self._workbook is not None:
+            try:
+                self._workbook.close()
+            except Exception:
+                pass
+            self._workbook = None
+        self._word_document = None
+        self._presentation = None
+
+
+class OfficeDocumentMixin:
+    """
+    Mixin giving a processor a cached OfficeDocument for the content it is handling.
+
+    A processor instance is typically used for process() and then get_metadata()
+    on the same bytes, so the handle is kept until different content arrives.
+    """
+
+    _office_document: Optional[OfficeDocument] = None
+
+    def _open_office_document(self, file_content: bytes) -> OfficeDocument:
+        """
+        Get the document handle for the given content, reusing the cached one if possible.
+
+        Args:
+            file_content: Raw document file content bytes
+
+        Returns:
+            OfficeDocument: The shared in-memory document handle
+        """
+        if self._office_document is None or not self._office_document.matches(file_content):
+            if self._office_document is not None:
+                self._office_document.close()
+            self._office_document = OfficeDocument(file_content)
+        return self._office_document
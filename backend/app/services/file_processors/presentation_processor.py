@@ -3,14 +3,15 @@ Presentation processor module for extracting text from PowerPoint presentations.
 """
 import io
 import os
-import tempfile
 from typing import Dict, Any, List, Tuple
 
 from PIL import Image
-from pptx import Presentation
 
+from app.core.admission import PRIORITY_INGEST, admission
+from app.core.config import settings
 from app.core.logging import logger
 from app.services.file_processors import FileProcessor
+from app.services.file_processors.office_document import OfficeDocumentMixin
 
 
 class PresentationProcessor(FileProcessor):
@@ -78,10 +79,13 @@ class PresentationProcessor(FileProcessor):
                 2. Provide a detailed description of what's in this image.
             """
 
-            response = client.models.generate_content(
-                model="gemini-1.5-flash-8b",
-                contents=[combined_prompt, image_part]
-            )
+            async with admission.admit(
+                "gemini", "gemini-1.5-flash-8b", tokens=settings.LLM_ADMISSION_VISION_TOKENS, priority=PRIORITY_INGEST
+            ):
+                response = client.models.generate_content(
+                    model="gemini-1.5-flash-8b",
+                    contents=[combined_prompt, image_part]
+                )
             
             return response.text
         except Exception as e:
@@ -89,7 +93,7 @@ class PresentationProcessor(FileProcessor):
             return "Error processing image content."
 
 
-class PowerPointProcessor(PresentationProcessor):
+class PowerPointProcessor(OfficeDocumentMixin, PresentationProcessor):
     """
     Processor for PowerPoint files.
     Handles: application/vnd.openxmlformats-officedocument.presentationml.presentation
@@ -107,14 +111,8 @@ class PowerPointProcessor(PresentationProcessor):
             str: Extracted text content
         """
         try:
-            # Write content to a temporary file because python-pptx requires a file path
-            with tempfile.NamedTemporaryFile(delete=False, suffix='.pptx') as temp_file:
-                temp_file.write(file_content)
-                temp_file.flush()
-                temp_path = temp_file.name
-            
-            # Load the presentation
-            ppt = Presentation(temp_path)
+            # Load the presentation from the shared in-memory handle
+            ppt = self._open_office_document(file_content).presentation
             
             # Extract text from all slides
             full_text = []
@@ -132,8 +130,8 @@ class PowerPointProcessor(PresentationProcessor):
                         top = shape.top if hasattr(shape, "top") else 0
                         shape_contents.append((shape.text, top))
                 
-                # Extract images with position information
-                image_list = await self._extract_images_with_positions(slide)
+                # Extract images with position information (unless deferred to enrichment)
+                image_list = await self._extract_images_with_positions(slide) if self.describe_images else []
                 image_contents = []
                 
                 for img, left, top in image_list:
@@ -160,9 +158,6 @@ class PowerPointProcessor(PresentationProcessor):
                 if len(slide_text) > 2:  # If we have more than just the header
                     full_text.append("\n".join(slide_text))
             
-            # Clean up temporary file
-            os.unlink(temp_path)
-            
             return "\n\n".join(full_text)
         except Exception as e:
             logger.error(f"Error processing PowerPoint file: {e}")
@@ -182,14 +177,8 @@ class PowerPointProcessor(PresentationProcessor):
         base_metadata = await super().get_metadata(file_content, file_path)
         
         try:
-            # Write content to a temporary file because python-pptx requires a file path
-            with tempfile.NamedTemporaryFile(delete=False, suffix='.pptx') as temp_file:
-                temp_file.write(file_content)
-                temp_file.flush()
-                temp_path = temp_file.name
-            
-            # Load the presentation
-            ppt = Presentation(temp_path)
+            # Reuse the in-memory handle opened for text extraction
+            ppt = self._open_office_document(file_content).presentation
             
             # Extract presentation metadata
             core_props = ppt.core_properties
@@ -249,14 +238,32 @@ class PowerPointProcessor(PresentationProcessor):
             # Add to base metadata
             base_metadata.update(metadata)
             
-            # Clean up temporary file
-            os.unlink(temp_path)
-            
             return base_metadata
         except Exception as e:
             logger.error(f"Error extracting PowerPoint metadata: {e}")
             return base_metadata
     
+    async def describe_visuals(self, file_content: bytes, file_path: str) -> List[str]:
+        """
+        Describe the images on each slide of a PowerPoint presentation.
+        
+        Args:
+            file_content: Raw PowerPoint file content bytes
+            file_path: Path to the PowerPoint file
+            
+        Returns:
+            List[str]: Image descriptions tagged with their slide number
+        """
+        ppt = self._open_office_document(file_content).presentation
+        
+        descriptions = []
+        for slide_num, slide in enumerate(ppt.slides, start=1):
+            for img, _, _ in await self._extract_images_with_positions(slide):
+                img_content = await self._extract_text_and_description_from_image(img)
+                if img_content:
+                    descriptions.append(f"Slide {slide_num}\n[IMAGE CONTENT START]\n{img_content}\n[IMAGE CONTENT END]")
+        return descriptions
+    
     async def _extract_images_from_slide(self, slide) -> List[Image.Image]:
         """
         Extract images from a PowerPoint slide.
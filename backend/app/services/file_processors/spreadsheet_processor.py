@@ -3,13 +3,13 @@ Spreadsheet processor module for extracting text from CSV and Excel spreadsheet
 """
 import io
 import os
-import tempfile
 from typing import Dict, Any, List
 
 import pandas as pd
 
 from app.core.logging import logger
 from app.services.file_processors import FileProcessor
+from app.services.file_processors.office_document import OfficeDocumentMixin
 
 
 class SpreadsheetProcessor(FileProcessor):
@@ -143,7 +143,7 @@ class CSVProcessor(SpreadsheetProcessor):
             return base_metadata
 
 
-class ExcelProcessor(SpreadsheetProcessor):
+class ExcelProcessor(OfficeDocumentMixin, SpreadsheetProcessor):
     """
     Processor for Excel files.
     Handles: application/vnd.openxmlformats-officedocument.spreadsheetml.sheet
@@ -165,19 +165,14 @@ class ExcelProcessor(SpreadsheetProcessor):
             extension = os.path.splitext(file_path)[1].lower()
             engine = 'openpyxl' if extension == '.xlsx' else 'xlrd'
             
-            # Load Excel into pandas DataFrames (one per sheet)
-            excel_file = io.BytesIO(file_content)
-            
-            # Get all sheet names
-            sheet_names = pd.ExcelFile(excel_file, engine=engine).sheet_names
-            
-            excel_file.seek(0)  # Reset file pointer
+            # Open the workbook once and parse each sheet from the same handle
+            xl = pd.ExcelFile(io.BytesIO(file_content), engine=engine)
             
             full_text = []
             
             # Process each sheet
-            for sheet_name in sheet_names:
-                df = pd.read_excel(excel_file, sheet_name=sheet_name, engine=engine)
+            for sheet_name in xl.sheet_names:
+                df = xl.parse(sheet_name=sheet_name)
                 
                 if not df.empty:
                     # Add sheet name
@@ -213,9 +208,17 @@ class ExcelProcessor(SpreadsheetProcessor):
             extension = os.path.splitext(file_path)[1].lower()
             engine = 'openpyxl' if extension == '.xlsx' else 'xlrd'
             
-            # Load Excel file
-            excel_file = io.BytesIO(file_content)
-            xl = pd.ExcelFile(excel_file, engine=engine)
+            # Load Excel file once; every sheet sample is parsed from this handle
+            xl = pd.ExcelFile(io.BytesIO(file_content), engine=engine)
+            
+            # Row counts and document properties come from a read-only openpyxl
+            # workbook over the same in-memory bytes
+            workbook = None
+            if engine == 'openpyxl':
+                try:
+                    workbook = self._open_office_document(file_content).workbook
+                except Exception as e:
+                    logger.error(f"Error opening Excel workbook: {e}")
             
             # Extract limited sheet information to prevent metadata size issues
             MAX_SHEETS = 10  # Limit the number of sheets to analyze
@@ -226,24 +229,15 @@ class ExcelProcessor(SpreadsheetProcessor):
             
             for sheet_name in sheet_names:
                 # Only read a sample of rows to avoid large metadata
-                df = pd.read_excel(excel_file, sheet_name=sheet_name, engine=engine, nrows=MAX_ROWS_SAMPLE)
+                df = xl.parse(sheet_name=sheet_name, nrows=MAX_ROWS_SAMPLE)
                 
                 # Calculate row count differently to get total count
-                if engine == 'openpyxl':
+                row_count = len(df)
+                if workbook is not None:
                     try:
-                        from openpyxl import load_workbook
-                        with tempfile.NamedTemporaryFile(delete=False, suffix='.xlsx') as temp_file:
-                            temp_file.write(file_content)
-                            temp_file.flush()
-                            wb = load_workbook(temp_file.name, read_only=True)
-                            sheet = wb[sheet_name]
-                            row_count = sheet.max_row
-                            os.unlink(temp_file.name)
+                        row_count = workbook[sheet_name].max_row
                     except Exception as e:
                         logger.error(f"Error getting exact row count: {e}")
-                        row_count = len(df)
-                else:
-                    row_count = len(df)
                 
                 sheet_info.append({
                     'name': sheet_name,
@@ -252,8 +246,6 @@ class ExcelProcessor(SpreadsheetProcessor):
                     # Only include column names, not full data types which can be large
                     'column_names': df.columns.tolist()[:30]  # Limit to first 30 columns
                 })
-                
-                excel_file.seek(0)  # Reset file pointer for next sheet
             
             metadata = {
                 'sheet_count': len(xl.sheet_names),
@@ -262,20 +254,11 @@ class ExcelProcessor(SpreadsheetProcessor):
             }
             
             # If using openpyxl, try to extract document properties (basic ones only)
-            if engine == 'openpyxl':
-                # Temporary file required for accessing document properties
-                with tempfile.NamedTemporaryFile(delete=False, suffix='.xlsx') as temp_file:
-                    temp_file.write(file_content)
-                    temp_file.flush()
-                    temp_path = temp_file.name
-                
+            if workbook is not None:
                 try:
-                    from openpyxl import load_workbook
-                    wb = load_workbook(temp_path)
-                    
                     doc_props = {}
-                    if wb.properties:
-                        props = wb.properties
+                    if workbook.properties:
+                        props = workbook.properties
                         if props.title:
                             doc_props['title'] = props.title
                         if props.creator:
@@ -290,8 +273,6 @@ class ExcelProcessor(SpreadsheetProcessor):
                     
                 except Exception as e:
                     logger.error(f"Error extracting Excel properties: {e}")
-                
-                os.unlink(temp_path)
             
             # Add to base metadata
             base_metadata.update(metadata)
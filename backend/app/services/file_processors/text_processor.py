@@ -6,15 +6,25 @@ import os
 import re
 import io
 import base64
-from typing import Dict, Any, List, Tuple
+from bisect import bisect_right
+from typing import Dict, Any, List, Optional, Tuple
 from urllib.parse import urlparse
 
 import markdown
-import requests
 from PIL import Image
 
+from app.core.admission import PRIORITY_INGEST, admission
+from app.core.config import settings
 from app.core.logging import logger
 from app.services.file_processors import FileProcessor
+from app.services.file_processors.image_fetcher import image_fetcher
+
+
+# Inline images ![alt](src) and reference images ![alt][ref] in a single pattern
+MARKDOWN_IMAGE_PATTERN = re.compile(r'!\[(.*?)\](?:\((.*?)\)|\[(.*?)\])')
+
+# Reference definitions: [ref]: url "optional title"
+MARKDOWN_REF_DEF_PATTERN = re.compile(r'\[(.*?)\]:\s*(.*?)(\s+["\'](.*?)["\'])?$', re.MULTILINE)
 
 
 class TextProcessor(FileProcessor):
@@ -105,10 +115,13 @@ class TextProcessor(FileProcessor):
                 2. Provide a detailed description of what's in this image.
             """
 
-            response = client.models.generate_content(
-                model="gemini-1.5-flash-8b",
-                contents=[combined_prompt, image_part]
-            )
+            async with admission.admit(
+                "gemini", "gemini-1.5-flash-8b", tokens=settings.LLM_ADMISSION_VISION_TOKENS, priority=PRIORITY_INGEST
+            ):
+                response = client.models.generate_content(
+                    model="gemini-1.5-flash-8b",
+                    contents=[combined_prompt, image_part]
+                )
             
             return response.text
         except Exception as e:
@@ -145,27 +158,9 @@ class MarkdownProcessor(TextProcessor):
             # Decode bytes to string
             md_text = file_content.decode('utf-8')
             
-            # Extract images from markdown before converting to HTML
-            # This will find both URL and Base64 embedded images
-            image_matches = await self._extract_markdown_images(md_text)
-            
-            # Process images and get their content
-            image_contents = []
-            for alt_text, image_src, position in image_matches:
-                # Skip file path images (local files)
-                if self._is_local_file_path(image_src):
-                    continue
-                
-                try:
-                    # Process URL or Base64 image
-                    img = await self._load_image_from_src(image_src)
-                    if img:
-                        img_content = await self._extract_text_and_description_from_image(img)
-                        if img_content:
-                            caption = f"Image: {alt_text}" if alt_text else "Image"
-                            image_contents.append((f"[{caption}]\n{img_content}", position))
-                except Exception as e:
-                    logger.error(f"Error processing markdown image: {e}")
+            # Describe URL and Base64 embedded images before converting to HTML
+            # (left to deferred enrichment when describe_images is off)
+            image_contents = await self._describe_markdown_images(md_text) if self.describe_images else []
             
             # Convert markdown to HTML
             html = markdown.markdown(md_text)
@@ -216,6 +211,61 @@ class MarkdownProcessor(TextProcessor):
             # Fallback to base text processor if markdown processing fails
             return await super().process(file_content, file_path)
     
+    async def describe_visuals(self, file_content: bytes, file_path: str) -> List[str]:
+        """
+        Describe the URL and Base64 images embedded in a Markdown file.
+        
+        Args:
+            file_content: Raw Markdown file content bytes
+            file_path: Path to the Markdown file
+            
+        Returns:
+            List[str]: Image descriptions in document order
+        """
+        md_text = file_content.decode('utf-8')
+        image_contents = await self._describe_markdown_images(md_text)
+        return [
+            f"[IMAGE CONTENT START]\n{img_content}\n[IMAGE CONTENT END]"
+            for img_content, _ in image_contents
+        ]
+    
+    async def _describe_markdown_images(self, md_text: str) -> List[Tuple[str, int]]:
+        """
+        Load and describe the non-local images referenced in Markdown text.
+        
+        Args:
+            md_text: Markdown text
+            
+        Returns:
+            List[Tuple[str, int]]: List of tuples containing (image_content, line_position)
+        """
+        # This will find both URL and Base64 embedded images
+        image_matches = await self._extract_markdown_images(md_text)
+        
+        # Skip file path images (local files)
+        image_matches = [match for match in image_matches if not self._is_local_file_path(match[1])]
+        
+        # Download all remote images concurrently before describing them
+        remote_images = await image_fetcher.fetch_many(
+            image_src for _, image_src, _ in image_matches if not image_src.startswith('data:image/')
+        )
+        
+        # Process images and get their content
+        image_contents = []
+        for alt_text, image_src, position in image_matches:
+            try:
+                # Process URL or Base64 image
+                img = await self._load_image_from_src(image_src, remote_images)
+                if img:
+                    img_content = await self._extract_text_and_description_from_image(img)
+                    if img_content:
+                        caption = f"Image: {alt_text}" if alt_text else "Image"
+                        image_contents.append((f"[{caption}]\n{img_content}", position))
+            except Exception as e:
+                logger.error(f"Error processing markdown image: {e}")
+        
+        return image_contents
+    
     async def _extract_markdown_images(self, md_text: str) -> List[Tuple[str, str, int]]:
         """
         Extract images from markdown text.
@@ -228,45 +278,28 @@ class MarkdownProcessor(TextProcessor):
         """
         images = []
         
-        # Match both inline and reference images in markdown
-        # Inline: ![alt text](image_url)
-        # Reference: ![alt text][ref] ... [ref]: image_url
-        
-        # Find inline images
-        inline_pattern = r'!\[(.*?)\]\((.*?)\)'
-        for match in re.finditer(inline_pattern, md_text):
-            alt_text = match.group(1)
-            image_src = match.group(2)
-            
-            # Calculate line position
-            line_position = md_text[:match.start()].count('\n')
-            images.append((alt_text, image_src, line_position))
-        
-        # Find reference images
-        ref_pattern = r'!\[(.*?)\]\[(.*?)\]'
-        ref_def_pattern = r'\[(.*?)\]:\s*(.*?)(\s+["\'](.*?)["\'])?$'
+        # Precompute newline offsets so each match's line number is a binary search
+        newline_offsets = [match.start() for match in re.finditer('\n', md_text)]
         
         # Extract reference definitions
         ref_defs = {}
-        for match in re.finditer(ref_def_pattern, md_text, re.MULTILINE):
-            ref_id = match.group(1)
-            ref_url = match.group(2)
-            ref_defs[ref_id] = ref_url
+        for match in MARKDOWN_REF_DEF_PATTERN.finditer(md_text):
+            ref_defs[match.group(1)] = match.group(2)
         
-        # Match reference images
-        for match in re.finditer(ref_pattern, md_text):
-            alt_text = match.group(1)
-            ref_id = match.group(2)
-            
-            # If ref_id is empty, use alt_text as the reference
-            if not ref_id:
-                ref_id = alt_text
-            
-            # Look up the reference
-            if ref_id in ref_defs:
-                image_src = ref_defs[ref_id]
-                line_position = md_text[:match.start()].count('\n')
-                images.append((alt_text, image_src, line_position))
+        # Single pass over inline (![alt](src)) and reference (![alt][ref]) images
+        for match in MARKDOWN_IMAGE_PATTERN.finditer(md_text):
+            alt_text, inline_src, ref_id = match.group(1), match.group(2), match.group(3)
+            
+            if inline_src is not None:
+                image_src = inline_src
+            else:
+                # If ref_id is empty, use alt_text as the reference
+                image_src = ref_defs.get(ref_id or alt_text)
+                if image_src is None:
+                    continue
+            
+            line_position = bisect_right(newline_offsets, match.start())
+            images.append((alt_text, image_src, line_position))
         
         return images
     
@@ -292,12 +325,15 @@ class MarkdownProcessor(TextProcessor):
         # Otherwise, assume it's a local file path
         return True
     
-    async def _load_image_from_src(self, src: str) -> Image.Image:
+    async def _load_image_from_src(
+        self, src: str, prefetched: Optional[Dict[str, Optional[bytes]]] = None
+    ) -> Image.Image:
         """
         Load an image from a URL or Base64 string.
         
         Args:
             src: Image source (URL or Base64 string)
+            prefetched: Optional mapping of URL to already downloaded bytes
             
         Returns:
             Image.Image: PIL Image object
@@ -313,9 +349,13 @@ class MarkdownProcessor(TextProcessor):
             # Handle URL images
             parsed = urlparse(src)
             if parsed.scheme and parsed.netloc:
-                response = requests.get(src, timeout=10)
-                response.raise_for_status()
-                return Image.open(io.BytesIO(response.content))
+                if prefetched is not None and src in prefetched:
+                    image_data = prefetched[src]
+                else:
+                    image_data = await image_fetcher.fetch(src)
+                if image_data is None:
+                    return None
+                return Image.open(io.BytesIO(image_data))
             
             return None
         except Exception as e:
@@ -17,6 +17,7 @@ import numpy as np
 import whisper
 from PIL import Image
 
+from app.core.admission import PRIORITY_INGEST, admission
 from app.core.config import settings
 from app.core.logging import logger
 from app.services.file_processors import FileProcessor
@@ -69,8 +70,8 @@ class VideoProcessor(FileProcessor):
             # Transcribe audio
             audio_text = await self._transcribe_audio(audio_path)
             
-            # Extract and analyze key frames
-            frame_texts = await self._extract_and_analyze_frames(video_path)
+            # Extract and analyze key frames (unless deferred to enrichment)
+            frame_texts = await self._extract_and_analyze_frames(video_path) if self.describe_images else []
             
             # Combine results
             result_parts = []
@@ -178,6 +179,28 @@ class VideoProcessor(FileProcessor):
             logger.error(f"Error extracting video metadata: {e}")
             return base_metadata
     
+    async def describe_visuals(self, file_content: bytes, file_path: str) -> List[str]:
+        """
+        Analyze key frames of a video.
+        
+        Args:
+            file_content: Raw video file content bytes
+            file_path: Path to the video file
+            
+        Returns:
+            List[str]: Frame descriptions
+        """
+        with tempfile.NamedTemporaryFile(suffix=os.path.splitext(file_path)[1], delete=False) as video_file:
+            video_file.write(file_content)
+            video_file.flush()
+            video_path = video_file.name
+        
+        try:
+            frame_texts = await self._extract_and_analyze_frames(video_path)
+            return [f"## Frame Analysis\n### Frame {i}\n{text}" for i, text in enumerate(frame_texts, 1)]
+        finally:
+            os.unlink(video_path)
+    
     def _extract_audio(self, video_path: str, audio_path: str) -> None:
         """
         Extract audio from video file.
@@ -322,10 +345,13 @@ class VideoProcessor(FileProcessor):
             prompt = "Describe what's happening in this video frame in detail. Include any visible text."
             
             # Generate content using Gemini
-            response = client.models.generate_content(
-                model="gemini-1.5-flash-8b",
-                contents=[prompt, image_part]
-            )
+            async with admission.admit(
+                "gemini", "gemini-1.5-flash-8b", tokens=settings.LLM_ADMISSION_VISION_TOKENS, priority=PRIORITY_INGEST
+            ):
+                response = client.models.generate_content(
+                    model="gemini-1.5-flash-8b",
+                    contents=[prompt, image_part]
+                )
             
             # Format the response with timestamp
             minutes = int(timestamp // 60)
@@ -10,7 +10,7 @@ from app.core.logging import logger
 from app.db.supabase import supabase_client
 from app.models.file_metadata import FileMetadata
 from app.models.notebook_file import NotebookFile
-from app.services.file_processors import FileProcessorFactory
+from app.services.extraction_executor import extraction_executor
 
 
 class FileService:
@@ -157,8 +157,7 @@ class FileService:
             
             # Use the appropriate file processor based on file type
             try:
-                processor = FileProcessorFactory.get_processor(file_type)
-                return await processor.process(file_content, file_path)
+                return await extraction_executor.extract_text(file_type, file_content, file_path)
             except ValueError as e:
                 logger.warning(f"Unsupported file type for text extraction: {file_type}")
                 return f"Unsupported file type: {file_type}"
@@ -192,8 +191,7 @@ class FileService:
             
             # Use the appropriate file processor based on file type
             try:
-                processor = FileProcessorFactory.get_processor(file_type)
-                return await processor.get_metadata(file_content, file_path)
+                return await extraction_executor.extract_metadata(file_type, file_content, file_path)
             except ValueError:
                 logger.warning(f"Unsupported file type for metadata extraction: {file_type}")
                 return {"error": f"Unsupported file type: {file_type}"}
@@ -0,0 +1,307 @@
+"""
+LLM provider module wrapping the natively async clients of each model family.
+"""
+from abc import ABC, abstractmethod
+from typing import Any, AsyncIterator, Optional
+
+import anthropic
+import google.generativeai as genai
+import openai
+
+from app.core.admission import PRIORITY_INTERACTIVE, admission
+from app.core.config import settings
+from app.core.logging import logger
+
+
+class LLMProvider(ABC):
+    """
+    Common interface of the LLM providers.
+
+    Every call awaits the provider's async client, so a slow generation only
+    suspends its own request and never blocks the event loop on network reads.
+    Calls are admitted through the shared per-provider/model admission layer,
+    which holds a concurrency slot for the whole call or stream.
+    """
+
+    name = "base"
+    default_model: Optional[str] = None
+    default_stream_model: Optional[str] = None
+
+    @staticmethod
+    def _estimate_tokens(text: str) -> int:
+        """
+        Roughly estimates the tokens of a text for admission accounting.
+
+        Args:
+            text: The text
+
+        Returns:
+            int: Estimated number of tokens
+        """
+        return (len(text) + 3) // 4
+
+    async def complete(
+        self,
+        prompt: str,
+        model: Optional[str] = None,
+        priority: int = PRIORITY_INTERACTIVE,
+        **options: Any,
+    ) -> str:
+        """
+        Generates a complete response.
+
+        Args:
+            prompt: The prompt to send to the model
+            model: The model to use (the provider default if None)
+            priority: Admission priority class
+            **options: Provider-specific generation options
+
+        Returns:
+            str: The generated response
+        """
+        prompt_tokens = self._estimate_tokens(prompt)
+        async with admission.admit(
+            self.name,
+            model or self.default_model,
+            tokens=prompt_tokens + settings.LLM_ADMISSION_OUTPUT_TOKENS,
+            priority=priority,
+        ) as permit:
+            result = await self._complete(prompt, model, **options)
+            permit.record_tokens(prompt_tokens + self._estimate_tokens(result or ""))
+            return result
+
+    async def stream(
+        self,
+        prompt: str,
+        model: Optional[str] = None,
+        priority: int = PRIORITY_INTERACTIVE,
+        **options: Any,
+    ) -> AsyncIterator[str]:
+        """
+        Streams a response.
+
+        Args:
+            prompt: The prompt to send to the model
+            model: The model to use (the provider default if None)
+            priority: Admission priority class
+            **options: Provider-specific generation options
+
+        Yields:
+            str: Chunks of the generated response
+        """
+        prompt_tokens = self._estimate_tokens(prompt)
+        output_tokens = 0
+        async with admission.admit(
+            self.name,
+            model or self.default_stream_model or self.default_model,
+            tokens=prompt_tokens + settings.LLM_ADMISSION_OUTPUT_TOKENS,
+            priority=priority,
+        ) as permit:
+            chunks = self._stream(prompt, model, **options)
+            try:
+                async for chunk in chunks:
+                    output_tokens += self._estimate_tokens(chunk)
+                    yield chunk
+            finally:
+                permit.record_tokens(prompt_tokens + output_tokens)
+                # Close the provider stream (and its connection) when the consumer stops early
+                await chunks.aclose()
+
+    @abstractmethod
+    async def _complete(self, prompt: str, model: Optional[str], **options: Any) -> str:
+        """
+        Generates a complete response with the provider's client.
+
+        Args:
+            prompt: The prompt to send to the model
+            model: The model to request (None for the provider default)
+            **options: Provider-specific generation options
+
+        Returns:
+            str: The generated text
+        """
+        pass
+
+    @abstractmethod
+    def _stream(self, prompt: str, model: Optional[str], **options: Any) -> AsyncIterator[str]:
+        """
+        Streams a response with the provider's client.
+
+        Args:
+            prompt: The prompt to send to the model
+            model: The model to request (None for the provider default)
+            **options: Provider-specific generation options
+
+        Returns:
+            AsyncIterator[str]: Chunks of the generated text
+        """
+        pass
+
+    async def close(self) -> None:
+        """
+        Closes the provider's client.
+        """
+
+
+class GeminiProvider(LLMProvider):
+    """
+    Gemini provider using the async methods of google-generativeai.
+    """
+
+    name = "gemini"
+    default_model = "gemini-1.5-flash-8b"
+
+    def __init__(self, api_key: str = settings.GEMINI_API_KEY):
+        """
+        Initializes the Gemini provider.
+
+        Args:
+            api_key: The Gemini API key
+        """
+        genai.configure(api_key=api_key)
+        self._models = {self.default_model: genai.GenerativeModel(self.default_model)}
+
+    def _model(self, model_name: Optional[str]) -> Any:
+        """
+        Gets or creates a Gemini model instance.
+
+        Args:
+            model_name: The model name ("gemini" or None for the default model)
+
+        Returns:
+            Any: The Gemini model instance
+        """
+        if not model_name or model_name.lower() == "gemini":
+            model_name = self.default_model
+
+        if model_name not in self._models:
+            logger.info(f"Creating new Gemini model instance for {model_name}")
+            try:
+                self._models[model_name] = genai.GenerativeModel(model_name)
+            except Exception as e:
+                logger.error(f"Error creating Gemini model {model_name}: {e}")
+                logger.info(f"Falling back to default model {self.default_model}")
+                model_name = self.default_model
+
+        return self._models[model_name]
+
+    @staticmethod
+    def generation_config(max_output_tokens: int = 2048) -> Any:
+        """
+        Builds the generation config used for answers.
+
+        Args:
+            max_output_tokens: Maximum number of output tokens
+
+        Returns:
+            Any: The Gemini generation config
+        """
+        return genai.types.GenerationConfig(
+            temperature=0.4,
+            top_p=0.95,
+            top_k=40,
+            max_output_tokens=max_output_tokens,
+        )
+
+    async def _complete(self, prompt: str, model: Optional[str], **options: Any) -> str:
+        response = await self._model(model).generate_content_async(prompt, **options)
+        return response.text
+
+    async def _stream(self, prompt: str, model: Optional[str], **options: Any) -> AsyncIterator[str]:
+        response = await self._model(model).generate_content_async(prompt, stream=True, **options)
+        async for chunk in response:
+            text = getattr(chunk, "text", None)
+            if text:
+                yield text
+
+
+class AnthropicProvider(LLMProvider):
+    """
+    Anthropic provider using anthropic.AsyncAnthropic.
+    """
+
+    name = "anthropic"
+    default_model = "claude-3-opus-20240229"
+
+    def __init__(self, api_key: str = settings.ANTHROPIC_API_KEY):
+        """
+        Initializes the Anthropic provider.
+
+        Args:
+            api_key: The Anthropic API key
+        """
+        self.client = anthropic.AsyncAnthropic(api_key=api_key)
+
+    async def _complete(self, prompt: str, model: Optional[str], **options: Any) -> str:
+        response = await self.client.messages.create(
+            model=model or self.default_model,
+            max_tokens=options.pop("max_tokens", 2048),
+            temperature=options.pop("temperature", 0.4),
+            messages=[{"role": "user", "content": prompt}],
+            **options,
+        )
+        return response.content[0].text
+
+    async def _stream(self, prompt: str, model: Optional[str], **options: Any) -> AsyncIterator[str]:
+        async with self.client.messages.stream(
+            model=model or self.default_model,
+            max_tokens=options.pop("max_tokens", 2048),
+            temperature=options.pop("temperature", 0.4),
+            messages=[{"role": "user", "content": prompt}],
+            **options,
+        ) as stream:
+            async for text in stream.text_stream:
+                if text:
+                    yield text
+
+    async def close(self) -> None:
+        await self.client.close()
+
+
+class OpenAIProvider(LLMProvider):
+    """
+    OpenAI provider using openai.AsyncOpenAI.
+    """
+
+    name = "openai"
+    default_model = "gpt-4o-mini"
+    default_stream_model = "gpt-4-turbo"
+
+    def __init__(self, api_key: str = settings.OPENAI_API_KEY):
+        """
+        Initializes the OpenAI provider.
+
+        Args:
+            api_key: The OpenAI API key
+        """
+        self.client = openai.AsyncOpenAI(api_key=api_key)
+
+    async def _complete(self, prompt: str, model: Optional[str], **options: Any) -> str:
+        response = await self.client.chat.completions.create(
+            model=model or self.default_model,
+            messages=[{"role": "user", "content": prompt}],
+            temperature=options.pop("temperature", 0.4),
+            max_tokens=options.pop("max_tokens", 2048),
+            **options,
+        )
+        return response.choices[0].message.content
+
+    async def _stream(self, prompt: str, model: Optional[str], **options: Any) -> AsyncIterator[str]:
+        response = await self.client.chat.completions.create(
+            model=model or self.default_stream_model,
+            messages=[{"role": "user", "content": prompt}],
+            temperature=options.pop("temperature", 0.4),
+            max_tokens=options.pop("max_tokens", 2048),
+            stream=True,
+            **options,
+        )
+        try:
+            async for chunk in response:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+        finally:
+            # Release the connection when the consumer stops early
+            await response.close()
+
+    async def close(self) -> None:
+        await self.client.close()
@@ -6,17 +6,19 @@ import re
 import json
 import asyncio
 import time
-from typing import Any, AsyncGenerator, Dict, List, Optional, Tuple, Union
+from typing import Any, AsyncGenerator, AsyncIterator, Dict, List, Optional, Tuple, Union
 
-import anthropic
-import google.generativeai as genai
 import httpx
-import openai
 from fastapi import HTTPException
 from tenacity import retry, stop_after_attempt, wait_exponential
 
+from app.core.admission import PRIORITY_INGEST
 from app.core.config import settings
 from app.core.logging import logger
+from app.core.metrics import metrics
+from app.services.context_packer import context_packer
+from app.services.llm_providers import AnthropicProvider, GeminiProvider, LLMProvider, OpenAIProvider
+from app.services.model_router import model_router
 
 
 class LLMService:
@@ -26,30 +28,25 @@ class LLMService:
 
     def __init__(self):
         """
-        Initializes the LLM service with API clients.
+        Initializes the LLM service with the async provider clients.
         """
-        # Initialize OpenAI client
-        self.openai_client = openai.OpenAI(api_key=settings.OPENAI_API_KEY)
-        
-        # Initialize Anthropic client
-        self.anthropic_client = anthropic.Anthropic(api_key=settings.ANTHROPIC_API_KEY)
-        
-        # Initialize Gemini client
-        genai.configure(api_key=settings.GEMINI_API_KEY)
-        # Default model, but we'll create specific models as needed
-        self.gemini_model = genai.GenerativeModel('gemini-1.5-flash-8b')
-        # Keep a cache of model instances
-        self.gemini_models = {'gemini-1.5-flash-8b': self.gemini_model}
+        self.providers: Dict[str, LLMProvider] = {
+            "gemini": GeminiProvider(),
+            "anthropic": AnthropicProvider(),
+            "openai": OpenAIProvider(),
+        }
         
         # Keep httpx clients for any custom requests
         self.http_client = httpx.AsyncClient(timeout=60.0)
         
-        logger.info("LLM service initialized with official API clients")
+        logger.info("LLM service initialized with async provider clients")
 
     async def close(self):
         """
         Closes all API clients.
         """
+        for provider in self.providers.values():
+            await provider.close()
         await self.http_client.aclose()
         logger.info("LLM service clients closed")
 
@@ -98,14 +95,8 @@ class LLMService:
             }}
             """
             
-            # Use the official Gemini API client
-            response = await asyncio.to_thread(
-                self.gemini_model.generate_content,
-                prompt
-            )
-            
-            # Extract JSON from the response
-            response_text = response.text
+            # Extract JSON from the response (ingest work yields to interactive queries)
+            response_text = await self.providers["gemini"].complete(prompt, priority=PRIORITY_INGEST)
             json_str = self._extract_json_from_text(response_text)
             result = json.loads(json_str)
             
@@ -157,15 +148,11 @@ class LLMService:
             Return ONLY the optimized query text, with no additional explanation or formatting.
             """
             
-            # Use the official Gemini API client
-            response = await asyncio.to_thread(
-                self.gemini_model.generate_content,
-                prompt
-            )
+            response_text = await self.providers["gemini"].complete(prompt)
             
-            logger.info(f"DEBUG - Gemini response text: '{response.text.strip()}'")
+            logger.info(f"DEBUG - Gemini response text: '{response_text.strip()}'")
             
-            return response.text.strip()
+            return response_text.strip()
         except Exception as e:
             logger.error(f"Error optimizing query: {e}")
             # Return the original query if optimization fails
@@ -193,90 +180,9 @@ class LLMService:
             logger.info(f"DEBUG - Generate answer with model={model_name}, stream={stream}")
             logger.info(f"DEBUG - Received {len(context)} context documents")
             
-            # Format context for the prompt
-            formatted_context_parts = []
-            
-            for i, doc in enumerate(context):
-                # Get the source/filename
-                source = doc.get("source", "Unknown file")
-                logger.info(f"DEBUG - Source: {source}")
-                
-                # Get text content
-                text_content = doc.get("text", "No content available")
-                
-                # Get metadata
-                metadata = doc.get("metadata", {})
-                
-                # Get description from metadata if available
-                if source.endswith(".json"):
-                    description = metadata.get("description", "This is a notes file that the user wrote. The user has written this note themselves.")
-                else:
-                    description = metadata.get("description", "No description available")
-                
-                # Process additional_info if it's a JSON string
-                additional_info_str = ""
-                if "additional_info" in metadata and metadata["additional_info"]:
-                    try:
-                        # Try to parse it as JSON if it's a string
-                        if isinstance(metadata["additional_info"], str) and metadata["additional_info"].startswith("{"):
-                            additional_info = json.loads(metadata["additional_info"])
-                            # Format key fields from additional_info
-                            info_parts = []
-                            for key, value in additional_info.items():
-                                if value:  # Only include non-empty values
-                                    info_parts.append(f"{key}: {value}")
-                            if info_parts:
-                                additional_info_str = "\nAdditional Info:\n" + "\n".join(info_parts)
-                    except json.JSONDecodeError:
-                        # If not valid JSON, just use as is
-                        additional_info_str = f"\nAdditional Info: {metadata['additional_info']}"
-                
-                # Get entities if available
-                entities_str = ""
-                if "entities" in metadata and metadata["entities"]:
-                    if isinstance(metadata["entities"], list):
-                        entities_str = f"\nEntities: {', '.join(metadata['entities'])}"
-                    else:
-                        entities_str = f"\nEntities: {metadata['entities']}"
-                
-                # Get key points if available
-                key_points_str = ""
-                if "key_points" in metadata and metadata["key_points"]:
-                    if isinstance(metadata["key_points"], list):
-                        key_points_str = f"\nKey Points:\n- " + "\n- ".join(metadata["key_points"])
-                    else:
-                        key_points_str = f"\nKey Points: {metadata['key_points']}"
-                
-                # Get topics if available
-                topics_str = ""
-                if "topics" in metadata and metadata["topics"]:
-                    if isinstance(metadata["topics"], list):
-                        topics_str = f"\nTopics: {', '.join(metadata['topics'])}"
-                    else:
-                        topics_str = f"\nTopics: {metadata['topics']}"
-                
-                # Combine all metadata
-                metadata_str = f"{additional_info_str}{entities_str}{key_points_str}{topics_str}"
-                
-                # Format this document with clear section headers
-                formatted_doc = f"""
-                    File #{i+1}: {source}
-                    Description: {description}{metadata_str}
-                    Content:
-                    {text_content}
-                """
-                formatted_context_parts.append(formatted_doc)
-                
-                # Log what we're including for debugging
-                logger.info(f"DEBUG - Added document {i+1}: {source}, description: {description[:50]}...")
-            
-            # Join all formatted documents
-            formatted_context = "\n" + "\n".join(formatted_context_parts)
-            
-            # Log the total formatted context length
-            logger.info(f"DEBUG - Total formatted context length: {len(formatted_context)} characters")
-            
-            prompt = f"""
+            # Pack context into the model's token budget: one header per file, adjacent
+            # chunks merged without their overlap, low-scoring chunks cut
+            prompt_template = """
                 You are an AI assistant helping to answer questions based on provided context, but also capable of responding to direct requests.
 
                 Context:
@@ -295,37 +201,31 @@ class LLMService:
 
                 Response:
             """
+            reserved_tokens = context_packer.count_tokens(prompt_template) + context_packer.count_tokens(query)
+            packed = None
+            if model_name.lower() == "auto":
+                # Route on the context size under the largest budget, then re-pack only
+                # if the chosen model's budget is smaller
+                largest = max(context_packer.budgets, key=context_packer.budgets.get)
+                packed = context_packer.pack(context, model_name=largest, reserved_tokens=reserved_tokens)
+                model_name = model_router.route(query, packed.tokens, stream=stream).model_name
+                if context_packer.budget_for_model(model_name) < context_packer.budget_for_model(largest):
+                    packed = None
+            if packed is None:
+                packed = context_packer.pack(context, model_name=model_name, reserved_tokens=reserved_tokens)
+            formatted_context = "\n" + packed.text
+            
+            # Log the total formatted context length
+            logger.info(f"DEBUG - Packed context: {packed.file_count} files, {packed.tokens} tokens, {packed.dropped_chunks} chunks dropped")
+            
+            prompt = prompt_template.format(formatted_context=formatted_context, query=query)
+            metrics.observe("llm.prompt_tokens", reserved_tokens + packed.tokens)
             
             # Log the total prompt length
             logger.info(f"DEBUG - Total prompt length: {len(prompt)} characters")
             logger.info(f"DEBUG - Full prompt including context: {prompt}")
             
-            result = None
-            
-            # Check if model name starts with "gemini" (to handle model versions like "gemini-1.5-flash-8b")
-            if model_name.lower().startswith("gemini"):
-                if stream:
-                    logger.info("DEBUG - Using Gemini streaming")
-                    result = await self._stream_gemini(prompt, model_name)
-                else:
-                    logger.info("DEBUG - Using Gemini non-streaming")
-                    result = await self._call_gemini(prompt, model_name)
-            elif model_name.lower() == "anthropic":
-                if stream:
-                    logger.info("DEBUG - Using Anthropic streaming")
-                    result = await self._stream_anthropic(prompt)
-                else:
-                    logger.info("DEBUG - Using Anthropic non-streaming")
-                    result = await self._call_anthropic(prompt)
-            elif model_name.lower() == "openai":
-                if stream:
-                    logger.info("DEBUG - Using OpenAI streaming")
-                    result = await self._stream_openai(prompt)
-                else:
-                    logger.info("DEBUG - Using OpenAI non-streaming")
-                    result = await self._call_openai(prompt)
-            else:
-                raise ValueError(f"Unsupported model: {model_name}")
+            result = await self._dispatch(prompt, model_name, stream)
                 
             logger.info(f"DEBUG - Result type from generate_answer: {type(result)}")
             return result
@@ -345,6 +245,9 @@ class LLMService:
             Union[str, AsyncGenerator[str, None]]: The generated answer or a stream of tokens.
         """
         stream = True
+        
+        if model_name.lower() == "auto":
+            model_name = model_router.route(query, stream=stream).model_name
 
         prompt = f"""
             You are an AI teaching assistant in a coding education platform. Your primary role is to guide students through their learning journey rather than simply providing answers.
@@ -370,287 +273,287 @@ class LLMService:
             Response:
         """
 
-        if model_name.lower().startswith("gemini"):
-            if stream:
-                logger.info("DEBUG - Using Gemini streaming")
-                result = await self._stream_gemini(prompt, model_name)
-            else:
-                logger.info("DEBUG - Using Gemini non-streaming")
-                result = await self._call_gemini(prompt, model_name)
-        elif model_name.lower() == "anthropic":
-            if stream:
-                logger.info("DEBUG - Using Anthropic streaming")
-                result = await self._stream_anthropic(prompt)
-            else:
-                logger.info("DEBUG - Using Anthropic non-streaming")
-                result = await self._call_anthropic(prompt)
-        elif model_name.lower() == "openai":
-            if stream:
-                logger.info("DEBUG - Using OpenAI streaming")
-                result = await self._stream_openai(prompt)
-            else:
-                logger.info("DEBUG - Using OpenAI non-streaming")
-                result = await self._call_openai(prompt)
-        else:
-            raise ValueError(f"Unsupported model: {model_name}")
+        result = await self._dispatch(prompt, model_name, stream)
         
         logger.info(f"DEBUG - Result type from generate_answer_with_coding_question: {type(result)}")
         return result
 
-    def _get_gemini_model(self, model_name: str) -> Any:
+    def _provider(self, model_name: str) -> Tuple[LLMProvider, Optional[str]]:
         """
-        Gets or creates a Gemini model instance for the specified model name.
+        Resolves a model name to its provider and provider-specific model.
         
         Args:
-            model_name: The name of the model to get or create.
+            model_name: The model name ("gemini", a Gemini version such as
+                "gemini-1.5-flash-8b", "anthropic", "openai", or an explicit
+                "provider:model" as chosen by the model router).
             
         Returns:
-            Any: The Gemini model instance.
+            Tuple[LLMProvider, Optional[str]]: The provider, and the model to request (None for its default).
         """
-        # Default to gemini-1.5-flash-8b if just "gemini" is specified
-        if model_name.lower() == "gemini":
-            model_name = "gemini-1.5-flash-8b"
-            
-        # Create the model if it doesn't exist in our cache
-        if model_name not in self.gemini_models:
-            logger.info(f"Creating new Gemini model instance for {model_name}")
-            try:
-                self.gemini_models[model_name] = genai.GenerativeModel(model_name)
-            except Exception as e:
-                logger.error(f"Error creating Gemini model {model_name}: {e}")
-                # Fall back to default model
-                logger.info(f"Falling back to default model gemini-1.5-flash-8b")
-                model_name = "gemini-1.5-flash-8b"
-                
-        return self.gemini_models[model_name]
-        
-    async def _call_gemini(self, prompt: str, model_name: str = "gemini") -> str:
+        if ":" in model_name:
+            provider_name, model = model_name.split(":", 1)
+            if provider_name.lower() in self.providers:
+                return self.providers[provider_name.lower()], model or None
+        name = model_name.lower()
+        # Model versions like "gemini-1.5-flash-8b" go to the Gemini provider
+        if name.startswith("gemini"):
+            return self.providers["gemini"], None if name == "gemini" else model_name
+        if name in self.providers:
+            return self.providers[name], None
+        raise ValueError(f"Unsupported model: {model_name}")
+
+    @staticmethod
+    def _options(provider: LLMProvider) -> Dict[str, Any]:
         """
-        Calls the Gemini API to generate a response.
+        Returns the generation options used for answers with a provider.
         
         Args:
-            prompt: The prompt to send to the model.
-            model_name: The name of the model to use.
+            provider: The provider.
             
         Returns:
-            str: The generated response.
+            Dict[str, Any]: Provider-specific generation options.
         """
-        try:
-            # Get the appropriate model instance
-            model = self._get_gemini_model(model_name)
-            
-            # Use the official Gemini API client
-            response = await asyncio.to_thread(
-                model.generate_content,
-                prompt,
-                generation_config=genai.types.GenerationConfig(
-                    temperature=0.4,
-                    top_p=0.95,
-                    top_k=40,
-                    max_output_tokens=2048,
-                )
-            )
-            
-            return response.text
-        except Exception as e:
-            logger.error(f"Error calling Gemini API: {e}")
-            raise
+        if provider.name == "gemini":
+            return {"generation_config": GeminiProvider.generation_config()}
+        return {}
 
-    async def _stream_gemini(self, prompt: str, model_name: str = "gemini") -> AsyncGenerator[str, None]:
+    def _hedge_backup(self, provider: LLMProvider) -> Optional[Tuple[LLMProvider, Optional[str]]]:
         """
-        Streams responses from the Gemini API.
+        Returns the backup provider to hedge a provider's requests with, if hedging is enabled.
         
         Args:
-            prompt: The prompt to send to the model.
-            model_name: The name of the model to use.
+            provider: The primary provider.
             
-        Yields:
-            str: Chunks of the generated response.
+        Returns:
+            Optional[Tuple[LLMProvider, Optional[str]]]: The backup provider and model, or None.
         """
-        try:
-            # This method should return an async generator, not execute it
-            # Create and return an async generator that will produce chunks on demand
-            
-            async def stream_generator():
-                # Get the appropriate model instance
-                model = self._get_gemini_model(model_name)
-                logger.info(f"DEBUG - _stream_gemini using model: {model_name}")
-                
-                try:
-                    # Use the official Gemini API client with streaming
-                    response = await asyncio.to_thread(
-                        model.generate_content,
-                        prompt,
-                        generation_config=genai.types.GenerationConfig(
-                            temperature=0.4,
-                            top_p=0.95,
-                            top_k=40,
-                            max_output_tokens=2048,
-                        ),
-                        stream=True
-                    )
-                    
-                    # Process the streaming response
-                    # Handle the response depending on its type
-                    if hasattr(response, '__iter__') and not hasattr(response, '__aiter__'):
-                        # It's a synchronous iterator, not an async iterator
-                        for chunk in response:
-                            if hasattr(chunk, 'text'):
-                                yield chunk.text
-                            await asyncio.sleep(0)  # Allow other tasks to run
-                    else:
-                        # It should be an async iterator
-                        async for chunk in response:
-                            if hasattr(chunk, 'text'):
-                                yield chunk.text
-                            await asyncio.sleep(0)  # Allow other tasks to run
-                    
-                except Exception as e:
-                    logger.error(f"Error in stream_generator: {e}")
-                    yield f"Error: {str(e)}"
+        if not settings.LLM_HEDGING_ENABLED:
+            return None
+        backup_name = settings.LLM_HEDGE_BACKUPS.get(provider.name)
+        if not backup_name or backup_name == provider.name:
+            return None
+        return self._provider(backup_name)
+
+    @staticmethod
+    def _hedge_delay(histogram: str) -> float:
+        """
+        Returns how long to wait for a provider before starting the backup request.
+        
+        The delay is the configured percentile of the provider's recent latencies,
+        so the backup only starts for requests that are already in the slow tail.
+        
+        Args:
+            histogram: The provider's latency histogram.
             
-            # Return the generator without awaiting it
-            return stream_generator()
-        except Exception as e:
-            logger.error(f"Error setting up Gemini streaming: {e}")
-            # Return a generator that just yields the error
-            async def error_generator():
-                yield f"Error streaming from Gemini API: {str(e)}"
-            return error_generator()
+        Returns:
+            float: The delay in seconds.
+        """
+        observed = metrics.percentile(histogram, settings.LLM_HEDGE_PERCENTILE)
+        delay_ms = observed or settings.LLM_HEDGE_DEFAULT_DELAY_MS
+        return max(delay_ms, settings.LLM_HEDGE_MIN_DELAY_MS) / 1000
 
-    async def _call_anthropic(self, prompt: str) -> str:
+    async def _dispatch(
+        self, prompt: str, model_name: str, stream: bool
+    ) -> Union[str, AsyncGenerator[str, None]]:
         """
-        Calls the Anthropic API to generate a response.
+        Generates a response with the provider for a model.
         
         Args:
             prompt: The prompt to send to the model.
+            model_name: The name of the LLM model to use.
+            stream: Whether to stream the response.
             
         Returns:
-            str: The generated response.
+            Union[str, AsyncGenerator[str, None]]: The generated response or a stream of chunks.
         """
+        provider, model = self._provider(model_name)
+        backup = self._hedge_backup(provider)
+        
+        if stream:
+            logger.info(f"DEBUG - Using {provider.name} streaming")
+            return self._stream(provider, prompt, model, backup)
+        
+        logger.info(f"DEBUG - Using {provider.name} non-streaming")
         try:
-            # Use the official Anthropic API client
-            response = await asyncio.to_thread(
-                self.anthropic_client.messages.create,
-                model="claude-3-opus-20240229",
-                max_tokens=2048,
-                temperature=0.4,
-                messages=[{"role": "user", "content": prompt}]
-            )
-            
-            return response.content[0].text
+            if backup is not None:
+                return await self._complete_hedged(provider, model, backup, prompt)
+            start = time.monotonic()
+            result = await provider.complete(prompt, model, **self._options(provider))
+            metrics.observe(f"llm.latency_ms.{provider.name}", (time.monotonic() - start) * 1000)
+            return result
         except Exception as e:
-            logger.error(f"Error calling Anthropic API: {e}")
+            logger.error(f"Error calling {provider.name} API: {e}")
             raise
 
-    async def _stream_anthropic(self, prompt: str) -> AsyncGenerator[str, None]:
+    async def _complete_hedged(
+        self,
+        provider: LLMProvider,
+        model: Optional[str],
+        backup: Tuple[LLMProvider, Optional[str]],
+        prompt: str,
+    ) -> str:
         """
-        Streams responses from the Anthropic API.
+        Generates a complete response, hedging with a backup provider when the primary is slow.
         
         Args:
+            provider: The primary provider.
+            model: The primary model (None for the provider default).
+            backup: The backup provider and model.
             prompt: The prompt to send to the model.
             
-        Yields:
-            str: Chunks of the generated response.
+        Returns:
+            str: The first successful response.
         """
+        async def timed(candidate: LLMProvider, candidate_model: Optional[str]) -> str:
+            # Each contender is timed from its own launch
+            start = time.monotonic()
+            try:
+                result = await candidate.complete(prompt, candidate_model, **self._options(candidate))
+            except asyncio.CancelledError:
+                # A cancelled loser is still observed, as a lower bound of its latency,
+                # so the slow tail that triggers hedging stays in the histogram
+                metrics.observe(f"llm.latency_ms.{candidate.name}", (time.monotonic() - start) * 1000)
+                raise
+            metrics.observe(f"llm.latency_ms.{candidate.name}", (time.monotonic() - start) * 1000)
+            return result
+        
+        pending = {asyncio.ensure_future(timed(provider, model)): provider}
+        done, _ = await asyncio.wait(pending, timeout=self._hedge_delay(f"llm.latency_ms.{provider.name}"))
+        hedged = not done or next(iter(done)).exception() is not None
+        if hedged:
+            metrics.increment("llm.hedge.started")
+            logger.info(f"Hedging {provider.name} request with {backup[0].name}")
+            pending[asyncio.ensure_future(timed(*backup))] = backup[0]
+        
+        error: Optional[BaseException] = None
         try:
-            # This method should return an async generator, not execute it
-            async def stream_generator():
-                try:
-                    # Use the official Anthropic API client with streaming
-                    with self.anthropic_client.messages.stream(
-                        model="claude-3-opus-20240229",
-                        max_tokens=2048,
-                        temperature=0.4,
-                        messages=[{"role": "user", "content": prompt}]
-                    ) as stream:
-                        # Process the streaming response
-                        for chunk in stream:
-                            if chunk.type == "content_block_delta" and hasattr(chunk.delta, "text"):
-                                yield chunk.delta.text
-                            await asyncio.sleep(0)  # Allow other tasks to run
-                    
-                except Exception as e:
-                    logger.error(f"Error in Anthropic stream_generator: {e}")
-                    yield f"\nError: {str(e)}"
-            
-            # Return the generator without awaiting it
-            return stream_generator()
-        except Exception as e:
-            logger.error(f"Error setting up Anthropic streaming: {e}")
-            # Return a generator that just yields the error
-            async def error_generator():
-                yield f"Error setting up Anthropic stream: {str(e)}"
-            return error_generator()
+            while pending:
+                done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    candidate = pending.pop(task)
+                    if task.exception() is None:
+                        if hedged:
+                            metrics.increment(f"llm.hedge.won.{candidate.name}")
+                        return task.result()
+                    error = task.exception()
+                    logger.error(f"Error calling {candidate.name} API: {error}")
+            raise error
+        finally:
+            # Cancel the losing request
+            for task in pending:
+                task.cancel()
 
-    async def _call_openai(self, prompt: str) -> str:
+    async def _first_chunk(
+        self,
+        provider: LLMProvider,
+        model: Optional[str],
+        backup: Optional[Tuple[LLMProvider, Optional[str]]],
+        prompt: str,
+    ) -> Tuple[LLMProvider, AsyncIterator[str], Optional[str]]:
         """
-        Calls the OpenAI API to generate a response.
+        Starts a stream and waits for its first chunk, hedging with a backup provider
+        when the first chunk is late or the primary fails.
         
         Args:
+            provider: The primary provider.
+            model: The primary model (None for the provider default).
+            backup: The backup provider and model, or None to not hedge.
             prompt: The prompt to send to the model.
             
         Returns:
-            str: The generated response.
+            Tuple[LLMProvider, AsyncIterator[str], Optional[str]]: The winning provider, its
+            stream, and its first chunk (None if the stream was empty).
         """
+        contenders: Dict[asyncio.Future, Tuple[LLMProvider, AsyncIterator[str], float]] = {}
+        
+        def launch(candidate: LLMProvider, candidate_model: Optional[str]) -> None:
+            # Each contender is timed from its own launch
+            chunks = candidate.stream(prompt, candidate_model, **self._options(candidate))
+            contenders[asyncio.ensure_future(chunks.__anext__())] = (candidate, chunks, time.monotonic())
+        
+        launch(provider, model)
+        hedged = False
+        if backup is not None:
+            done, _ = await asyncio.wait(contenders, timeout=self._hedge_delay(f"llm.ttft_ms.{provider.name}"))
+            failed = bool(done) and not isinstance(next(iter(done)).exception(), (type(None), StopAsyncIteration))
+            if not done or failed:
+                metrics.increment("llm.hedge.started")
+                logger.info(f"Hedging {provider.name} stream with {backup[0].name}")
+                launch(*backup)
+                hedged = True
+        
+        error: Optional[BaseException] = None
         try:
-            # Use the official OpenAI API client
-            response = await asyncio.to_thread(
-                self.openai_client.chat.completions.create,
-                model="gpt-4o-mini",
-                messages=[{"role": "user", "content": prompt}],
-                temperature=0.4,
-                max_tokens=2048
-            )
-            
-            return response.choices[0].message.content
-        except Exception as e:
-            logger.error(f"Error calling OpenAI API: {e}")
-            raise
+            while contenders:
+                done, _ = await asyncio.wait(contenders, return_when=asyncio.FIRST_COMPLETED)
+                for future in done:
+                    candidate, chunks, start = contenders.pop(future)
+                    exception = future.exception()
+                    if exception is None or isinstance(exception, StopAsyncIteration):
+                        metrics.observe(f"llm.ttft_ms.{candidate.name}", (time.monotonic() - start) * 1000)
+                        if hedged:
+                            metrics.increment(f"llm.hedge.won.{candidate.name}")
+                        return candidate, chunks, None if exception else future.result()
+                    error = exception
+                    logger.error(f"Error in {candidate.name} stream: {error}")
+            raise error
+        finally:
+            # Cancel the losing stream and close its upstream connection
+            for future, (candidate, chunks, start) in contenders.items():
+                if not future.done():
+                    # Observed as a lower bound, so the slow tail that triggers hedging stays in the histogram
+                    metrics.observe(f"llm.ttft_ms.{candidate.name}", (time.monotonic() - start) * 1000)
+                future.cancel()
+                await asyncio.gather(future, return_exceptions=True)
+                await chunks.aclose()
 
-    async def _stream_openai(self, prompt: str) -> AsyncGenerator[str, None]:
+    async def _stream(
+        self,
+        provider: LLMProvider,
+        prompt: str,
+        model: Optional[str],
+        backup: Optional[Tuple[LLMProvider, Optional[str]]] = None,
+    ) -> AsyncGenerator[str, None]:
         """
-        Streams responses from the OpenAI API.
+        Streams a response from a provider, reporting failures in-band.
+        
+        Closing or cancelling the returned generator closes the provider stream,
+        which aborts the upstream HTTP request.
         
         Args:
+            provider: The provider to stream from.
             prompt: The prompt to send to the model.
+            model: The model to request (None for the provider default).
+            backup: Optional backup provider and model to hedge the first chunk with.
             
         Yields:
             str: Chunks of the generated response.
         """
+        streamed: List[str] = []
+        chunks: Optional[AsyncIterator[str]] = None
         try:
-            # This method should return an async generator, not execute it
-            async def stream_generator():
-                try:
-                    # Use the official OpenAI API client with streaming
-                    response = await asyncio.to_thread(
-                        self.openai_client.chat.completions.create,
-                        model="gpt-4-turbo",
-                        messages=[{"role": "user", "content": prompt}],
-                        temperature=0.4,
-                        max_tokens=2048,
-                        stream=True
-                    )
-                    
-                    # Process the streaming response
-                    for chunk in response:
-                        if chunk.choices and chunk.choices[0].delta.content:
-                            content = chunk.choices[0].delta.content
-                            yield content
-                        await asyncio.sleep(0)  # Allow other tasks to run
-                    
-                except Exception as e:
-                    logger.error(f"Error in OpenAI stream_generator: {e}")
-                    yield f"\nError: {str(e)}"
-            
-            # Return the generator without awaiting it
-            return stream_generator()
+            provider, chunks, first = await self._first_chunk(provider, model, backup, prompt)
+            if first is not None:
+                streamed.append(first)
+                yield first
+            async for chunk in chunks:
+                streamed.append(chunk)
+                yield chunk
+        except (GeneratorExit, asyncio.CancelledError):
+            # The consumer went away: closing the provider stream released the
+            # upstream connection, so only the tokens generated so far were paid for
+            output_tokens = context_packer.count_tokens("".join(streamed))
+            metrics.increment("llm.stream.cancelled")
+            metrics.increment(f"llm.stream.cancelled.{provider.name}")
+            metrics.observe("llm.stream.cancelled_output_tokens", output_tokens)
+            logger.info(f"{provider.name} stream cancelled after {output_tokens} output tokens")
+            raise
         except Exception as e:
-            logger.error(f"Error setting up OpenAI streaming: {e}")
-            # Return a generator that just yields the error
-            async def error_generator():
-                yield f"Error setting up OpenAI stream: {str(e)}"
-            return error_generator()
+            logger.error(f"Error in {provider.name} stream: {e}")
+            yield f"\nError: {str(e)}"
+        finally:
+            if chunks is not None:
+                await chunks.aclose()
     
     def _extract_json_from_text(self, text: str) -> str:
         """
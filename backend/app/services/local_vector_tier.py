@@ -0,0 +1,708 @@
+"""
+Local vector tier module for answering scoped searches without a Pinecone round trip.
+"""
+import asyncio
+import contextlib
+import json
+import os
+import re
+import shutil
+import tempfile
+import uuid
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.core.config import settings
+from app.core.executors import ingest_cpu_executor, retrieval_executor
+from app.core.logging import logger
+from app.core.metrics import metrics
+from app.db.chunk_manifest import chunk_manifest
+from app.db.pinecone import pinecone_client
+
+
+class FileVectors:
+    """
+    Chunk vectors of a single file, row-normalized so a dot product is cosine similarity.
+    """
+
+    __slots__ = ("ids", "matrix", "scales", "metadata", "pinecone_id", "generation")
+
+    # Rows scored per block, bounding the float32 temporary of an int8 or memory-mapped matrix
+    SCORE_BLOCK_ROWS = 4096
+
+    def __init__(
+        self,
+        ids: List[str],
+        matrix: np.ndarray,
+        scales: Optional[np.ndarray],
+        metadata: List[Dict[str, Any]],
+        pinecone_id: Optional[str] = None,
+        generation: Optional[str] = None,
+    ):
+        """
+        Initializes the file vectors.
+
+        Args:
+            ids: Vector IDs, one per row
+            matrix: float32 rows, or int8 rows when quantized
+            scales: Per-row dequantization scales for int8 rows (None for float32)
+            metadata: Chunk metadata, one per row
+            pinecone_id: The Pinecone ID the vectors were written under, if known
+            generation: Stamp of the on-disk copy the vectors were loaded from
+        """
+        self.ids = ids
+        self.matrix = matrix
+        self.scales = scales
+        self.metadata = metadata
+        self.pinecone_id = pinecone_id
+        self.generation = generation
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def scores(self, query_vector: np.ndarray) -> np.ndarray:
+        """
+        Computes the similarity of every row to a normalized query vector.
+
+        Args:
+            query_vector: Normalized float32 query vector
+
+        Returns:
+            np.ndarray: One score per row
+        """
+        scores = np.empty(len(self.ids), dtype=np.float32)
+        for start in range(0, len(self.ids), self.SCORE_BLOCK_ROWS):
+            end = start + self.SCORE_BLOCK_ROWS
+            scores[start:end] = np.asarray(self.matrix[start:end], dtype=np.float32) @ query_vector
+        if self.scales is not None:
+            scores *= self.scales
+        return scores
+
+
+class LocalVectorTier:
+    """
+    In-process mirror of the chunk vectors of active users' toggled files.
+
+    Files are kept as (optionally int8-quantized) matrices that are persisted to
+    disk and memory-mapped back, and scoped searches are answered with exact
+    NumPy dot products. Files that are not mirrored yet are fetched from
+    Pinecone in the background while the query falls back to Pinecone.
+
+    The on-disk copy is shared by every worker process on the host. Each
+    persist writes a new generation stamp, and lookups compare the mapped
+    copy's stamp (and Pinecone ID) against disk and the chunk manifest, so a
+    file re-ingested by another worker is never served from a stale mapping.
+    """
+
+    # Name of the per-file stamp that changes on every persist
+    GENERATION_FILE = "generation"
+
+    def __init__(
+        self,
+        enabled: bool = settings.LOCAL_VECTOR_TIER_ENABLED,
+        directory: str = settings.LOCAL_VECTOR_TIER_DIR,
+        quantize: bool = settings.LOCAL_VECTOR_TIER_QUANTIZE,
+        max_vectors: int = settings.LOCAL_VECTOR_TIER_MAX_VECTORS,
+        max_disk_mb: int = settings.LOCAL_VECTOR_TIER_MAX_DISK_MB,
+    ):
+        """
+        Initializes the local vector tier.
+
+        Args:
+            enabled: Whether scoped searches may be answered locally
+            directory: Directory for the memory-mapped vector files
+            quantize: Whether to store vectors as int8 with per-row scales
+            max_vectors: Maximum number of vectors kept mapped in memory
+            max_disk_mb: Maximum size of the on-disk tier (0 for no limit)
+        """
+        self.enabled = enabled
+        self.directory = Path(directory)
+        self.quantize = quantize
+        self.max_vectors = max_vectors
+        self.max_disk_bytes = max_disk_mb * 1024 * 1024
+        self._files: "OrderedDict[Tuple[str, str], FileVectors]" = OrderedDict()
+        self._vector_count = 0
+        self._warming: Dict[Tuple[str, str], asyncio.Task] = {}
+        # Per-file writer locks with the number of holders and waiters
+        self._locks: Dict[Tuple[str, str], Tuple[asyncio.Lock, List[int]]] = {}
+
+    def _file_dir(self, namespace: str, file_id: str) -> Path:
+        """
+        Returns the on-disk directory for a file's vectors.
+
+        Args:
+            namespace: The Pinecone namespace
+            file_id: The ID of the file
+
+        Returns:
+            Path: The file's directory
+        """
+        safe_namespace = re.sub(r"[^A-Za-z0-9_.-]", "_", namespace) or "_default"
+        return self.directory / safe_namespace / re.sub(r"[^A-Za-z0-9_.-]", "_", file_id)
+
+    def _build(self, vectors: Sequence[Tuple[str, List[float], Dict[str, Any]]]) -> FileVectors:
+        """
+        Builds normalized (and optionally quantized) file vectors.
+
+        Args:
+            vectors: (id, values, metadata) tuples (empty for a file without chunks)
+
+        Returns:
+            FileVectors: The file vectors
+        """
+        ids = [vector_id for vector_id, _, _ in vectors]
+        metadata = [dict(meta) for _, _, meta in vectors]
+        if not vectors:
+            # Files without chunks are still mirrored, as an empty marker
+            dtype = np.int8 if self.quantize else np.float32
+            scales = np.zeros(0, dtype=np.float32) if self.quantize else None
+            return FileVectors(ids, np.zeros((0, 0), dtype=dtype), scales, metadata)
+        matrix = np.asarray([values for _, values, _ in vectors], dtype=np.float32)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        matrix /= np.maximum(norms, 1e-12)
+
+        if not self.quantize:
+            return FileVectors(ids, matrix, None, metadata)
+
+        scales = np.maximum(np.abs(matrix).max(axis=1), 1e-12) / 127.0
+        quantized = np.round(matrix / scales[:, None]).astype(np.int8)
+        return FileVectors(ids, quantized, scales.astype(np.float32), metadata)
+
+    def _persist(
+        self, namespace: str, file_id: str, file_vectors: FileVectors, pinecone_id: Optional[str] = None
+    ) -> FileVectors:
+        """
+        Writes file vectors to disk and returns a memory-mapped copy (blocking).
+
+        The files are written to a private staging directory and swapped in
+        with renames, so concurrent writers (in this or another worker process)
+        never see or clobber each other's partial output.
+
+        Args:
+            namespace: The Pinecone namespace
+            file_id: The ID of the file
+            file_vectors: The vectors to persist
+            pinecone_id: The Pinecone ID the vectors were written under, if known
+
+        Returns:
+            FileVectors: The same vectors backed by memory-mapped files
+        """
+        target = self._file_dir(namespace, file_id)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        staging = Path(tempfile.mkdtemp(dir=target.parent, prefix=f"{target.name}.", suffix=".tmp"))
+        retired = staging.with_name(f"{staging.name[:-len('.tmp')]}.old.tmp")
+        try:
+            np.save(staging / "matrix.npy", file_vectors.matrix)
+            if file_vectors.scales is not None:
+                np.save(staging / "scales.npy", file_vectors.scales)
+            with open(staging / "records.json", "w", encoding="utf-8") as f:
+                json.dump(
+                    {"ids": file_vectors.ids, "metadata": file_vectors.metadata, "pinecone_id": pinecone_id},
+                    f,
+                    default=str,
+                )
+            (staging / self.GENERATION_FILE).write_text(uuid.uuid4().hex, encoding="utf-8")
+
+            # A directory can only be renamed over an empty one, so move the
+            # previous copy aside first; retry if another writer swaps in between
+            for attempt in range(3):
+                try:
+                    os.rename(staging, target)
+                    break
+                except OSError:
+                    if attempt == 2:
+                        raise
+                    with contextlib.suppress(FileNotFoundError):
+                        os.rename(target, retired)
+                    shutil.rmtree(retired, ignore_errors=True)
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+
+        file_vectors = self._load(namespace, file_id)
+        if file_vectors is None:
+            raise RuntimeError(f"Persisted vectors for file {file_id} disappeared before they could be mapped")
+        return file_vectors
+
+    def _generation(self, namespace: str, file_id: str) -> Optional[str]:
+        """
+        Reads the generation stamp of a file's on-disk copy (blocking).
+
+        Args:
+            namespace: The Pinecone namespace
+            file_id: The ID of the file
+
+        Returns:
+            Optional[str]: The stamp, or None if the file is not on disk
+        """
+        try:
+            return (self._file_dir(namespace, file_id) / self.GENERATION_FILE).read_text(encoding="utf-8")
+        except FileNotFoundError:
+            return None
+
+    def _generations(self, keys: Sequence[Tuple[str, str]]) -> List[Optional[str]]:
+        """
+        Reads the generation stamps of several files (blocking).
+
+        Args:
+            keys: (namespace, file_id) keys
+
+        Returns:
+            List[Optional[str]]: One stamp per key (None if not on disk)
+        """
+        return [self._generation(namespace, file_id) for namespace, file_id in keys]
+
+    def _load(self, namespace: str, file_id: str) -> Optional[FileVectors]:
+        """
+        Memory-maps a file's vectors from disk (blocking).
+
+        Args:
+            namespace: The Pinecone namespace
+            file_id: The ID of the file
+
+        Returns:
+            Optional[FileVectors]: The vectors, or None if the file is not on disk
+        """
+        target = self._file_dir(namespace, file_id)
+        try:
+            for _ in range(3):
+                # The stamp is read first and re-checked last, so a copy swapped
+                # in mid-load is retried instead of mixing two generations
+                generation = self._generation(namespace, file_id)
+                if generation is None:
+                    return None
+                with open(target / "records.json", encoding="utf-8") as f:
+                    records = json.load(f)
+                # An empty array cannot be memory-mapped
+                matrix = np.load(target / "matrix.npy", mmap_mode="r" if records["ids"] else None)
+                scales_path = target / "scales.npy"
+                scales = np.load(scales_path) if scales_path.exists() else None
+                if self._generation(namespace, file_id) != generation:
+                    continue
+                # The directory's mtime orders files for disk eviction
+                os.utime(target)
+                return FileVectors(
+                    records["ids"], matrix, scales, records["metadata"], records.get("pinecone_id"), generation
+                )
+            return None
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.error(f"Error loading local vectors for file {file_id}: {e}")
+            return None
+
+    def _evict_disk(self, keep: Sequence[Tuple[str, str]]) -> None:
+        """
+        Deletes least recently used files from disk while the tier is over its size limit (blocking).
+
+        Args:
+            keep: (namespace, file_id) keys that are mapped in memory and must stay
+        """
+        if self.max_disk_bytes <= 0 or not self.directory.exists():
+            return
+        kept_dirs = {self._file_dir(namespace, file_id) for namespace, file_id in keep}
+        entries = []
+        total = 0
+        for namespace_dir in self.directory.iterdir():
+            if not namespace_dir.is_dir():
+                continue
+            for file_dir in namespace_dir.iterdir():
+                if not file_dir.is_dir() or file_dir.name.endswith(".tmp"):
+                    continue
+                size = sum(path.stat().st_size for path in file_dir.iterdir() if path.is_file())
+                total += size
+                if file_dir not in kept_dirs:
+                    entries.append((file_dir.stat().st_mtime, size, file_dir))
+
+        evicted = 0
+        for _, size, file_dir in sorted(entries, key=lambda entry: entry[0]):
+            if total <= self.max_disk_bytes:
+                break
+            shutil.rmtree(file_dir, ignore_errors=True)
+            total -= size
+            evicted += 1
+        if evicted:
+            metrics.increment("local_tier.disk_evicted", evicted)
+            logger.info(f"Evicted {evicted} files from the on-disk vector tier")
+
+    def _admit(self, key: Tuple[str, str], file_vectors: FileVectors) -> None:
+        """
+        Keeps file vectors in memory, evicting least recently used files over the limit.
+
+        Args:
+            key: (namespace, file_id)
+            file_vectors: The file vectors
+        """
+        previous = self._files.pop(key, None)
+        if previous is not None:
+            self._vector_count -= len(previous)
+        self._files[key] = file_vectors
+        self._vector_count += len(file_vectors)
+
+        while self._vector_count > self.max_vectors and len(self._files) > 1:
+            _, evicted = self._files.popitem(last=False)
+            self._vector_count -= len(evicted)
+
+    def _drop(self, key: Tuple[str, str]) -> None:
+        """
+        Unmaps a file from memory, leaving its on-disk copy alone.
+
+        Args:
+            key: (namespace, file_id)
+        """
+        previous = self._files.pop(key, None)
+        if previous is not None:
+            self._vector_count -= len(previous)
+
+    @contextlib.asynccontextmanager
+    async def _writer(self, key: Tuple[str, str]) -> AsyncIterator[None]:
+        """
+        Serializes writers of one file within this process.
+
+        Args:
+            key: (namespace, file_id)
+        """
+        lock, users = self._locks.setdefault(key, (asyncio.Lock(), [0]))
+        users[0] += 1
+        try:
+            async with lock:
+                yield
+        finally:
+            users[0] -= 1
+            if not users[0]:
+                self._locks.pop(key, None)
+
+    def _cancel_warming(self, key: Tuple[str, str]) -> None:
+        """
+        Cancels a pending background mirror of a file, which a direct write supersedes.
+
+        Args:
+            key: (namespace, file_id)
+        """
+        task = self._warming.get(key)
+        if task is not None and task is not asyncio.current_task():
+            del self._warming[key]
+            task.cancel()
+
+    async def has_files(self, file_ids: Sequence[str], namespace: str = "") -> bool:
+        """
+        Checks whether every file is mirrored, mapping files from disk as needed.
+
+        Mapped files are revalidated on every lookup: a file whose on-disk
+        generation changed (another worker re-persisted or removed it) is
+        remapped or dropped, and a file whose chunk manifest now points at a
+        different Pinecone ID (re-ingested but not mirrored yet) is bypassed.
+
+        Args:
+            file_ids: The file IDs
+            namespace: The Pinecone namespace
+
+        Returns:
+            bool: True if a search over these files can be answered locally
+        """
+        keys = [(namespace, str(file_id)) for file_id in file_ids]
+        generations = await retrieval_executor.run(self._generations, keys)
+        latest_pinecone_ids = await chunk_manifest.latest_pinecone_ids([file_id for _, file_id in keys])
+
+        for key, generation in zip(keys, generations):
+            if generation is None:
+                self._drop(key)
+                return False
+
+            file_vectors = self._files.get(key)
+            if file_vectors is not None and file_vectors.generation == generation:
+                self._files.move_to_end(key)
+            else:
+                file_vectors = await retrieval_executor.run(self._load, *key)
+                if file_vectors is None:
+                    self._drop(key)
+                    return False
+                self._admit(key, file_vectors)
+
+            latest = latest_pinecone_ids.get(key[1])
+            if latest is not None and file_vectors.pinecone_id is not None and latest != file_vectors.pinecone_id:
+                metrics.increment("local_tier.stale")
+                self._drop(key)
+                return False
+        return True
+
+    async def search(
+        self,
+        query_vector: Sequence[float],
+        file_ids: Sequence[str],
+        namespace: str = "",
+        top_k: int = 5,
+        include_values: bool = False,
+    ) -> List[Dict[str, Any]]:
+        """
+        Finds the top-k chunks of the given files by exact cosine similarity.
+
+        Call has_files() first; files that are not mirrored are skipped. The
+        scoring runs on the retrieval executor, off the event loop.
+
+        Args:
+            query_vector: The query embedding
+            file_ids: The file IDs to search
+            namespace: The Pinecone namespace
+            top_k: Number of results to return
+            include_values: Whether to attach each chunk's normalized vector as "values"
+
+        Returns:
+            List[Dict[str, Any]]: Results in the search_records format ({id, score, metadata}).
+        """
+        candidates = [self._files[key] for key in ((namespace, str(f)) for f in file_ids) if key in self._files]
+        if not candidates:
+            return []
+        return await retrieval_executor.run(self._rank, query_vector, candidates, top_k, include_values)
+
+    @staticmethod
+    def _rank(
+        query_vector: Sequence[float],
+        candidates: List[FileVectors],
+        top_k: int,
+        include_values: bool,
+    ) -> List[Dict[str, Any]]:
+        """
+        Scores candidate files against a query and returns the top-k rows (blocking).
+
+        Args:
+            query_vector: The query embedding
+            candidates: The file vectors to search
+            top_k: Number of results to return
+            include_values: Whether to attach each chunk's normalized vector as "values"
+
+        Returns:
+            List[Dict[str, Any]]: Results in the search_records format ({id, score, metadata}).
+        """
+        candidates = [file_vectors for file_vectors in candidates if len(file_vectors)]
+        if not candidates:
+            return []
+
+        query = np.asarray(query_vector, dtype=np.float32)
+        query /= max(float(np.linalg.norm(query)), 1e-12)
+
+        scores = np.concatenate([file_vectors.scores(query) for file_vectors in candidates])
+        offsets = np.cumsum([0] + [len(file_vectors) for file_vectors in candidates])
+
+        k = min(top_k, len(scores))
+        if k <= 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+
+        results = []
+        for row in top:
+            file_index = int(np.searchsorted(offsets, row, side="right")) - 1
+            file_vectors = candidates[file_index]
+            local_row = int(row - offsets[file_index])
+            result = {
+                "id": file_vectors.ids[local_row],
+                "score": float(scores[row]),
+                "metadata": file_vectors.metadata[local_row],
+            }
+            if include_values:
+                values = np.asarray(file_vectors.matrix[local_row], dtype=np.float32)
+                if file_vectors.scales is not None:
+                    values = values * file_vectors.scales[local_row]
+                result["values"] = values
+            results.append(result)
+        return results
+
+    async def replace_file(
+        self,
+        file_id: str,
+        vectors: Sequence[Tuple[str, List[float], Dict[str, Any]]],
+        namespace: str = "",
+        pinecone_id: Optional[str] = None,
+    ) -> None:
+        """
+        Mirrors the complete set of vectors for a file, replacing any previous copy.
+
+        Args:
+            file_id: The ID of the file
+            vectors: (id, values, metadata) tuples for every chunk of the file (empty for no chunks)
+            namespace: The Pinecone namespace
+            pinecone_id: The Pinecone ID the vectors were written under, if known
+        """
+        if not self.enabled:
+            return
+        key = (namespace, str(file_id))
+        self._cancel_warming(key)
+        async with self._writer(key):
+            await self._replace(key, vectors, pinecone_id)
+
+    async def _replace(
+        self,
+        key: Tuple[str, str],
+        vectors: Sequence[Tuple[str, List[float], Dict[str, Any]]],
+        pinecone_id: Optional[str],
+    ) -> None:
+        """
+        Persists and maps a file's vectors; the caller holds the file's writer lock.
+
+        Args:
+            key: (namespace, file_id)
+            vectors: (id, values, metadata) tuples for every chunk of the file
+            pinecone_id: The Pinecone ID the vectors were written under, if known
+        """
+        namespace, file_id = key
+        persist = asyncio.ensure_future(
+            ingest_cpu_executor.run(lambda: self._persist(namespace, file_id, self._build(vectors), pinecone_id))
+        )
+        try:
+            # A cancelled caller still waits for the write, so the lock is not
+            # released while the swap is half done
+            file_vectors = await asyncio.shield(persist)
+        except asyncio.CancelledError:
+            await asyncio.wait([persist])
+            raise
+        except Exception as e:
+            logger.error(f"Error mirroring vectors for file {file_id}: {e}")
+            await self._remove(key)
+            return
+        self._admit(key, file_vectors)
+        logger.info(f"Mirrored {len(file_vectors)} vectors for file {file_id} in the local tier")
+        try:
+            await ingest_cpu_executor.run(self._evict_disk, list(self._files))
+        except Exception as e:
+            logger.error(f"Error evicting files from the on-disk vector tier: {e}")
+
+    async def add_vectors(
+        self,
+        file_id: str,
+        vectors: Sequence[Tuple[str, List[float], Dict[str, Any]]],
+        namespace: str = "",
+        pinecone_id: Optional[str] = None,
+    ) -> None:
+        """
+        Adds vectors to a mirrored file (e.g. enrichment chunks); no-op if the file is not mirrored.
+
+        Args:
+            file_id: The ID of the file
+            vectors: (id, values, metadata) tuples to add or overwrite
+            namespace: The Pinecone namespace
+            pinecone_id: The Pinecone ID the vectors were written under, if known
+        """
+        if not self.enabled:
+            return
+        key = (namespace, str(file_id))
+        # A pending mirror may have listed the file's vectors before these were written
+        self._cancel_warming(key)
+        async with self._writer(key):
+            if not await self.has_files([file_id], namespace):
+                return
+            existing = self._files[key]
+            new_ids = {vector_id for vector_id, _, _ in vectors}
+
+            # Dequantize the kept rows; normalization is idempotent so rebuilding is lossless enough
+            matrix = np.asarray(existing.matrix, dtype=np.float32)
+            if existing.scales is not None:
+                matrix = matrix * existing.scales[:, None]
+            kept = [
+                (vector_id, matrix[i].tolist(), existing.metadata[i])
+                for i, vector_id in enumerate(existing.ids)
+                if vector_id not in new_ids
+            ]
+            await self._replace(key, kept + list(vectors), pinecone_id or existing.pinecone_id)
+
+    async def remove_file(self, file_id: str, namespace: str = "") -> None:
+        """
+        Drops a file from memory and disk.
+
+        Args:
+            file_id: The ID of the file
+            namespace: The Pinecone namespace
+        """
+        key = (namespace, str(file_id))
+        self._cancel_warming(key)
+        async with self._writer(key):
+            await self._remove(key)
+
+    async def _remove(self, key: Tuple[str, str]) -> None:
+        """
+        Drops a file from memory and disk; the caller holds the file's writer lock.
+
+        Args:
+            key: (namespace, file_id)
+        """
+        self._drop(key)
+        await ingest_cpu_executor.run(shutil.rmtree, self._file_dir(*key), True)
+
+    def warm(self, file_ids: Sequence[str], namespace: str = "") -> None:
+        """
+        Starts mirroring files that are not in the tier yet, in the background.
+
+        Args:
+            file_ids: The file IDs to mirror
+            namespace: The Pinecone namespace
+        """
+        if not self.enabled:
+            return
+        for file_id in file_ids:
+            key = (namespace, str(file_id))
+            if key in self._files or key in self._warming:
+                continue
+            task = asyncio.create_task(self._mirror_from_pinecone(str(file_id), namespace))
+            self._warming[key] = task
+            task.add_done_callback(lambda done, key=key: self._forget_warming(key, done))
+
+    def _forget_warming(self, key: Tuple[str, str], task: asyncio.Task) -> None:
+        """
+        Forgets a finished mirroring task unless a newer one replaced it.
+
+        Args:
+            key: (namespace, file_id)
+            task: The finished task
+        """
+        if self._warming.get(key) is task:
+            del self._warming[key]
+
+    async def _mirror_from_pinecone(self, file_id: str, namespace: str) -> None:
+        """
+        Fetches a file's stored vectors from Pinecone into the tier.
+
+        Args:
+            file_id: The ID of the file
+            namespace: The Pinecone namespace
+        """
+        try:
+            if await self.has_files([file_id], namespace):
+                return
+
+            pinecone_id = await chunk_manifest.latest_pinecone_id(file_id)
+            if pinecone_id is None:
+                from app.db.supabase import supabase_client
+                pinecone_id = (await supabase_client.get_file_metadata(file_id)).get("pinecone_id")
+            if not pinecone_id:
+                return
+
+            vector_ids = await chunk_manifest.vector_ids(pinecone_id)
+            if vector_ids is None:
+                vector_ids = await pinecone_client.list_vectors(prefix=pinecone_id, namespace=namespace)
+            vectors = await pinecone_client.fetch_vectors(vector_ids, namespace) if vector_ids else []
+            if vector_ids and not vectors:
+                # A failed fetch must not be mirrored as a file without chunks
+                return
+            async with self._writer((namespace, file_id)):
+                await self._replace((namespace, file_id), vectors, pinecone_id)
+            metrics.increment("local_tier.mirrored_files")
+        except Exception as e:
+            logger.error(f"Error mirroring file {file_id} into the local vector tier: {e}")
+
+    async def close(self) -> None:
+        """
+        Cancels pending mirroring tasks and unmaps all files.
+        """
+        tasks = list(self._warming.values())
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+        self._files.clear()
+        self._vector_count = 0
+
+
+# Global instance of the local vector tier
+local_vector_tier = LocalVectorTier()
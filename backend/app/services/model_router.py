@@ -0,0 +1,175 @@
+"""
+Model router module for picking an answer model from cheap local signals.
+"""
+import re
+from typing import Dict, List
+
+from app.core.config import settings
+from app.core.logging import logger
+from app.core.metrics import metrics
+
+# Requests that need multi-step reasoning over the context
+_ANALYTICAL_PATTERN = re.compile(
+    r"\b(compare|contrast|analy[sz]e|evaluate|assess|critique|explain (?:why|how)|pros and cons|"
+    r"trade-?offs?|step[- ]by[- ]step|derive|prove|implications?|in depth|detailed)\b",
+    re.IGNORECASE,
+)
+
+# Open-ended generation requests
+_GENERATIVE_PATTERN = re.compile(r"\b(write|draft|compose|story|poem|essay|rewrite)\b", re.IGNORECASE)
+
+# Tiers in increasing cost order
+_TIERS = ("fast", "standard", "heavy")
+
+
+class RoutingDecision:
+    """
+    Model picked for a request, with the signals that led to it.
+    """
+
+    __slots__ = ("model_name", "tier", "score", "signals")
+
+    def __init__(self, model_name: str, tier: str, score: int, signals: Dict[str, object]):
+        """
+        Initializes the routing decision.
+
+        Args:
+            model_name: The chosen model, as "provider:model"
+            tier: The chosen tier (fast, standard, heavy)
+            score: The complexity score the tier was derived from
+            signals: The signals used for the decision
+        """
+        self.model_name = model_name
+        self.tier = tier
+        self.score = score
+        self.signals = signals
+
+
+class ModelRouter:
+    """
+    Routes model_name="auto" requests to a model tier.
+
+    The tier comes from a complexity score over the packed context size, the
+    query length and a rule-based query type. Within the tier, the first model
+    in preference order whose provider's recent p95 latency is under the limit
+    is used, or the fastest one if all are over it.
+    """
+
+    def __init__(
+        self,
+        tiers: Dict[str, List[str]] = settings.MODEL_ROUTING_TIERS,
+        standard_context_tokens: int = settings.MODEL_ROUTING_STANDARD_CONTEXT_TOKENS,
+        heavy_context_tokens: int = settings.MODEL_ROUTING_HEAVY_CONTEXT_TOKENS,
+        max_p95_ms: float = settings.MODEL_ROUTING_MAX_P95_MS,
+    ):
+        """
+        Initializes the model router.
+
+        Args:
+            tiers: Candidate models ("provider:model") per tier, in order of preference
+            standard_context_tokens: Context size from which the context counts as medium
+            heavy_context_tokens: Context size from which the context counts as large
+            max_p95_ms: p95 latency above which a candidate is skipped if another is faster
+        """
+        self.tiers = tiers
+        self.standard_context_tokens = standard_context_tokens
+        self.heavy_context_tokens = heavy_context_tokens
+        self.max_p95_ms = max_p95_ms
+
+    @staticmethod
+    def query_type(query: str) -> str:
+        """
+        Classifies a query as analytical, generative or lookup.
+
+        Args:
+            query: The user query
+
+        Returns:
+            str: The query type
+        """
+        if _ANALYTICAL_PATTERN.search(query) or "```" in query:
+            return "analytical"
+        if _GENERATIVE_PATTERN.search(query):
+            return "generative"
+        return "lookup"
+
+    def _score(self, query: str, context_tokens: int) -> Dict[str, object]:
+        """
+        Computes the complexity signals and score of a request.
+
+        Args:
+            query: The user query
+            context_tokens: Token count of the packed context
+
+        Returns:
+            Dict[str, object]: The signals, including the total "score"
+        """
+        query_words = len(query.split())
+        query_type = self.query_type(query)
+        questions = query.count("?")
+
+        score = 0
+        if context_tokens >= self.heavy_context_tokens:
+            score += 2
+        elif context_tokens >= self.standard_context_tokens:
+            score += 1
+        if query_words > 60:
+            score += 1
+        if questions >= 2:
+            score += 1
+        score += {"analytical": 2, "generative": 1}.get(query_type, 0)
+
+        return {
+            "context_tokens": context_tokens,
+            "query_words": query_words,
+            "query_type": query_type,
+            "questions": questions,
+            "score": score,
+        }
+
+    @staticmethod
+    def _p95(model_name: str, stream: bool) -> float:
+        """
+        Returns the recent p95 latency of a candidate's provider.
+
+        Args:
+            model_name: The candidate, as "provider:model"
+            stream: Whether the answer is streamed (time to first token) or not (full latency)
+
+        Returns:
+            float: The p95 latency in milliseconds (0.0 without observations)
+        """
+        provider = model_name.split(":", 1)[0]
+        histogram = f"llm.ttft_ms.{provider}" if stream else f"llm.latency_ms.{provider}"
+        return metrics.percentile(histogram, 95)
+
+    def route(self, query: str, context_tokens: int = 0, stream: bool = True) -> RoutingDecision:
+        """
+        Picks the model for a request.
+
+        Args:
+            query: The user query
+            context_tokens: Token count of the packed context
+            stream: Whether the answer is streamed
+
+        Returns:
+            RoutingDecision: The chosen model and the signals behind it
+        """
+        signals = self._score(query, context_tokens)
+        score = int(signals["score"])
+        tier = _TIERS[0] if score <= 1 else _TIERS[1] if score <= 3 else _TIERS[2]
+
+        candidates = self.tiers.get(tier) or [model for models in self.tiers.values() for model in models]
+        latencies = {candidate: self._p95(candidate, stream) for candidate in candidates}
+        # Preference order, skipping candidates whose provider is currently slow
+        fast_enough = [candidate for candidate in candidates if latencies[candidate] <= self.max_p95_ms]
+        model_name = fast_enough[0] if fast_enough else min(candidates, key=latencies.get)
+
+        signals["p95_ms"] = {candidate: round(latency) for candidate, latency in latencies.items()}
+        metrics.increment(f"routing.tier.{tier}")
+        logger.info(f"Routing auto request to {model_name} (tier={tier}, signals={signals})")
+        return RoutingDecision(model_name=model_name, tier=tier, score=score, signals=signals)
+
+
+# Global instance of the model router
+model_router = ModelRouter()
@@ -0,0 +1,122 @@
+"""
+Query classifier module for deciding whether a request needs retrieval.
+"""
+import math
+import re
+from typing import List, Tuple
+
+# A greeting or thanks followed by at most three words that do not start a question
+_GREETING = (
+    r"(hi|hello|hey|yo|thanks|thank you|thx|ok(ay)?|cool|great|good (morning|afternoon|evening|night)|bye|goodbye)\b"
+    r"(\s+(?!(what|who|when|where|why|how|which)\b)[a-z']+){0,3}"
+)
+# Small-talk questions addressed to the assistant itself
+_SMALL_TALK = r"(how are you|who are you|what can you do)\b\?*"
+
+# (label, weight, pattern): positive weights push towards "no retrieval needed"
+_RULES: List[Tuple[str, float, "re.Pattern[str]"]] = [
+    # Greetings, thanks and small talk with nothing else in the message but
+    # punctuation or emoji ("hi, who is the TA?" is a question, not chitchat)
+    ("chitchat", 4.0, re.compile(
+        rf"^\W*({_GREETING}|{_SMALL_TALK})([^\w?]+({_GREETING}|{_SMALL_TALK}))*[^\w?]*$",
+        re.IGNORECASE,
+    )),
+    # Creative and open-ended generation
+    ("instruction", 3.0, re.compile(
+        r"^\W*(please\s+)?(write|compose|draft|create|generate|make up|invent)\b.{0,40}\b"
+        r"(poem|story|song|joke|haiku|limerick|essay|letter|email|speech|riddle|lyrics)\b",
+        re.IGNORECASE,
+    )),
+    ("instruction", 3.0, re.compile(r"^\W*(please\s+)?tell (me )?(a |an )?(story|joke|riddle|fun fact)\b", re.IGNORECASE)),
+    # Transformations of text supplied in the request itself
+    ("instruction", 2.5, re.compile(
+        r"^\W*(please\s+)?(translate|rephrase|paraphrase|reword|proofread|fix the grammar|correct the grammar)\b",
+        re.IGNORECASE,
+    )),
+    # General-knowledge arithmetic and unit conversion (weighted to clear the
+    # threshold even with the "what is" question penalty: 4.0 - 1.5 - 1.0 bias)
+    ("instruction", 4.0, re.compile(r"^(?=.*\d)\W*(what is |what's |calculate |compute )?[\d\s.+\-*/^()%=x]+\??$", re.IGNORECASE)),
+    # References to the user's material always need retrieval
+    ("informational", -5.0, re.compile(
+        r"\b(my|our|these|this|the) (notes?|files?|documents?|docs?|pdfs?|slides?|lectures?|readings?|chapters?|"
+        r"papers?|transcripts?|videos?|recordings?|textbook|syllabus|assignment|homework|spreadsheet)\b"
+        r"|\b(according to|based on|in the (text|reading|lecture|document)|from (my|the) (notes|files|sources))\b",
+        re.IGNORECASE,
+    )),
+    # Information-seeking questions
+    ("informational", -1.5, re.compile(r"^\W*(what|who|when|where|why|how|which|explain|define|describe|summari[sz]e|list|compare)\b", re.IGNORECASE)),
+]
+
+
+class QueryClassification:
+    """
+    Result of classifying a query.
+    """
+
+    __slots__ = ("label", "confidence", "matched")
+
+    def __init__(self, label: str, confidence: float, matched: List[str]):
+        """
+        Initializes the classification.
+
+        Args:
+            label: "informational", "instruction" or "chitchat"
+            confidence: Confidence that the query does not need retrieval (0-1)
+            matched: Labels of the rules that matched
+        """
+        self.label = label
+        self.confidence = confidence
+        self.matched = matched
+
+    @property
+    def needs_retrieval(self) -> bool:
+        return self.label == "informational"
+
+
+class QueryClassifier:
+    """
+    Rule-based classifier separating information-seeking requests from
+    instruction-style and chit-chat requests that can go straight to generation.
+
+    Matching rules add their weights to a score that a logistic function maps
+    to the confidence that retrieval can be skipped. Anything that refers to
+    the user's own material is always treated as informational.
+    """
+
+    def __init__(self, bias: float = -1.0):
+        """
+        Initializes the classifier.
+
+        Args:
+            bias: Score of a query no rule matches (negative leans towards retrieval)
+        """
+        self.bias = bias
+
+    def classify(self, query: str) -> QueryClassification:
+        """
+        Classifies a query.
+
+        Args:
+            query: The user query
+
+        Returns:
+            QueryClassification: The label and the confidence that retrieval can be skipped
+        """
+        text = query.strip()
+        score = self.bias
+        matched: List[str] = []
+        skip_label = None
+        for label, weight, pattern in _RULES:
+            if pattern.search(text):
+                score += weight
+                matched.append(label)
+                if weight > 0 and skip_label is None:
+                    skip_label = label
+
+        confidence = 1.0 / (1.0 + math.exp(-score))
+        label = skip_label if skip_label and confidence >= 0.5 else "informational"
+        return QueryClassification(label=label, confidence=confidence, matched=matched)
+
+
+# Global instance of the query classifier
+query_classifier = QueryClassifier()
@@ -0,0 +1,424 @@
+"""
+Query rewriter module for local, dictionary-based query optimization.
+"""
+import json
+import os
+import re
+import threading
+from pathlib import Path
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Sequence, Tuple
+
+from app.core.config import settings
+from app.core.executors import ingest_cpu_executor
+from app.core.logging import logger
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - saves are not merged across processes on Windows
+    fcntl = None
+
+_STOP_WORDS = frozenset(
+    """
+    a an the and or but if then so of to in on at by for with about from into over under as is are was were be
+    been being am do does did doing have has had having i me my we our you your he him his she her it its they
+    them their this that these those there here what which who whom whose when where why how can could would
+    should will shall may might must please tell show give find know explain describe want need like just also
+    some any all each every more most other such than too very really get got s t don doesn didn isn aren
+    """.split()
+)
+
+# Words skipped when deriving an initialism ("Bank of England" -> "BE")
+_INITIALISM_SKIP = frozenset({"of", "and", "the", "for", "in", "on", "to", "a", "an", "&"})
+
+_ACRONYM_PATTERN = re.compile(r"^[A-Z][A-Z0-9&]{1,7}s?$")
+_PARENTHETICAL_PATTERN = re.compile(r"^(?P<outer>[^()]+?)\s*\((?P<inner>[^()]+)\)\s*$")
+_WORD_PATTERN = re.compile(r"[\w&'-]+")
+
+
+class QueryRewrite:
+    """
+    Result of rewriting a query locally.
+    """
+
+    __slots__ = ("text", "confidence", "expansions")
+
+    def __init__(self, text: str, confidence: float, expansions: List[str]):
+        """
+        Initializes the rewrite.
+
+        Args:
+            text: The rewritten query
+            confidence: Confidence that the rewrite is as good as an LLM rewrite (0-1)
+            expansions: Acronym expansions and synonyms that were added
+        """
+        self.text = text
+        self.confidence = confidence
+        self.expansions = expansions
+
+
+class _FileDictionary:
+    """
+    Acronyms and synonym groups learned from one file, never mutated after creation.
+    """
+
+    __slots__ = ("acronyms", "synonyms", "phrases")
+
+    def __init__(self, acronyms: Dict[str, str], synonyms: Dict[str, FrozenSet[str]]):
+        self.acronyms = acronyms
+        self.synonyms = synonyms
+        # Spelled-out expansions and synonym terms by their first word, so a
+        # rewrite only checks the phrases that can start at each query word
+        self.phrases: Dict[str, List[Tuple[Tuple[str, ...], List[str]]]] = {}
+        for acronym, expansion in acronyms.items():
+            self._index(expansion, [acronym])
+        for term, related in synonyms.items():
+            self._index(term, sorted(related)[:3])
+
+    def _index(self, phrase: str, expansions: List[str]) -> None:
+        words = tuple(word.lower() for word in _WORD_PATTERN.findall(phrase))
+        if words:
+            self.phrases.setdefault(words[0], []).append((words, expansions))
+
+    def __len__(self) -> int:
+        return len(self.acronyms) + len(self.synonyms)
+
+    def entries(self) -> FrozenSet[Tuple[str, ...]]:
+        """
+        Returns the acronyms and synonym pairs as comparable entries.
+
+        Returns:
+            FrozenSet[Tuple[str, ...]]: ("acronym", ACRONYM, expansion) and ("synonym", term, term) tuples
+        """
+        return frozenset(
+            [("acronym", acronym, expansion) for acronym, expansion in self.acronyms.items()]
+            + [("synonym", *sorted((term, other))) for term, related in self.synonyms.items() for other in related]
+        )
+
+
+class QueryRewriter:
+    """
+    Local replacement for the LLM query optimizer.
+
+    Queries are normalized, stop words are pruned, and acronyms and synonyms
+    are expanded from dictionaries learned from the entities and topics of
+    ingested files. Dictionaries are kept per file and a rewrite only uses
+    those of the files the search is scoped to, so one user's material never
+    shapes another user's queries. Rewrites that leave the query ambiguous
+    (unknown acronyms, too few content words) get a low confidence so callers
+    can fall back to the LLM.
+
+    The dictionaries are loaded and updated in the ingest CPU pool and replaced
+    as a whole, so rewrite() never waits on file I/O or a lock. Saves merge
+    with the file on disk under an exclusive lock, so worker processes learning
+    concurrently do not overwrite each other. The version changes with every
+    update, so callers can key cached rewrites by it.
+    """
+
+    def __init__(
+        self,
+        path: str = settings.QUERY_REWRITER_DICTIONARY_PATH,
+        max_entries: int = settings.QUERY_REWRITER_MAX_ENTRIES,
+    ):
+        """
+        Initializes the query rewriter.
+
+        Args:
+            path: Path of the JSON dictionary file
+            max_entries: Maximum number of entries kept across all files (least recently learned files go first)
+        """
+        self.path = Path(path)
+        self.max_entries = max_entries
+        # Dictionaries by file ID in learning order, replaced as a whole on every update
+        self._files: Dict[str, _FileDictionary] = {}
+        self.version = 0
+        self._loaded = False
+        # Serializes loads and updates (worker threads only)
+        self._lock = threading.Lock()
+
+    def _read(self) -> Dict[str, _FileDictionary]:
+        """
+        Reads the dictionaries from disk (blocking).
+
+        Returns:
+            Dict[str, _FileDictionary]: Dictionaries by file ID (empty if there is no file yet)
+        """
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return {}
+        if "files" not in data and ("acronyms" in data or "synonyms" in data):
+            logger.warning("Ignoring query dictionary entries that are not attributed to a file")
+        return {
+            file_id: _FileDictionary(
+                dict(entry.get("acronyms", {})),
+                {term: frozenset(related) for term, related in entry.get("synonyms", {}).items()},
+            )
+            for file_id, entry in data.get("files", {}).items()
+        }
+
+    def _load(self) -> None:
+        """
+        Loads the dictionaries from disk on first use (blocking).
+        """
+        with self._lock:
+            if self._loaded:
+                return
+            self._loaded = True
+            try:
+                files = self._read()
+                if files:
+                    self._files = self._capped(files)
+                    self.version += 1
+                    logger.info(
+                        f"Query dictionary loaded: {sum(map(len, self._files.values()))} entries "
+                        f"from {len(self._files)} files"
+                    )
+            except Exception as e:
+                logger.error(f"Error loading query dictionary: {e}")
+
+    async def load(self) -> None:
+        """
+        Loads the dictionaries without blocking the event loop.
+        """
+        if not self._loaded:
+            await ingest_cpu_executor.run(self._load)
+
+    def _capped(self, files: Dict[str, _FileDictionary]) -> Dict[str, _FileDictionary]:
+        """
+        Drops the least recently learned files while the dictionaries are over the size limit.
+
+        Args:
+            files: Dictionaries by file ID in learning order
+
+        Returns:
+            Dict[str, _FileDictionary]: The dictionaries that fit
+        """
+        total = sum(map(len, files.values()))
+        if total <= self.max_entries:
+            return files
+        kept = dict(files)
+        for file_id, dictionary in files.items():
+            if total <= self.max_entries:
+                break
+            del kept[file_id]
+            total -= len(dictionary)
+        return kept
+
+    def _save(self, file_ids: Iterable[str]) -> None:
+        """
+        Merges this process's updates into the file on disk atomically (blocking).
+
+        The file is re-read under an exclusive lock, the given files' entries
+        are replaced and every other file keeps what is on disk, so updates
+        from other worker processes are kept. The merged result is published
+        in memory too. Call with self._lock held.
+
+        Args:
+            file_ids: The files whose dictionaries changed in this process
+        """
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path.with_name(f"{self.path.name}.lock"), "a") as lock_file:
+            if fcntl is not None:
+                # Released when the lock file is closed
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            merged = self._read()
+            for file_id in file_ids:
+                merged.pop(file_id, None)
+                if file_id in self._files:
+                    merged[file_id] = self._files[file_id]
+            merged = self._capped(merged)
+
+            data = {
+                "files": {
+                    file_id: {
+                        "acronyms": dictionary.acronyms,
+                        "synonyms": {term: sorted(related) for term, related in dictionary.synonyms.items()},
+                    }
+                    for file_id, dictionary in merged.items()
+                }
+            }
+            staging = self.path.with_suffix(f".{os.getpid()}.tmp")
+            with open(staging, "w", encoding="utf-8") as f:
+                json.dump(data, f)
+            os.replace(staging, self.path)
+        self._files = merged
+        self.version += 1
+
+    @staticmethod
+    def _initialism(phrase: str) -> Optional[str]:
+        """
+        Derives the initialism of a multi-word phrase.
+
+        Args:
+            phrase: The phrase
+
+        Returns:
+            Optional[str]: The initialism, or None for phrases of fewer than two words
+        """
+        words = [word for word in _WORD_PATTERN.findall(phrase) if word.lower() not in _INITIALISM_SKIP]
+        if len(words) < 2 or len(words) > 8:
+            return None
+        return "".join(word[0] for word in words).upper()
+
+    @staticmethod
+    def _add_synonyms(synonyms: Dict[str, FrozenSet[str]], first: str, second: str) -> None:
+        """
+        Records two terms as synonyms of each other.
+
+        Args:
+            synonyms: The synonym groups to update
+            first: The first term
+            second: The second term
+        """
+        first, second = first.strip().lower(), second.strip().lower()
+        if not first or not second or first == second:
+            return
+        synonyms[first] = synonyms.get(first, frozenset()) | {second}
+        synonyms[second] = synonyms.get(second, frozenset()) | {first}
+
+    @classmethod
+    def _extract(cls, terms: List[str]) -> _FileDictionary:
+        """
+        Extracts acronyms and synonyms from entity/topic terms.
+
+        Args:
+            terms: Entity and topic strings
+
+        Returns:
+            _FileDictionary: The file's dictionary
+        """
+        acronyms: Dict[str, str] = {}
+        synonyms: Dict[str, FrozenSet[str]] = {}
+        bare_acronyms = {term.strip() for term in terms if _ACRONYM_PATTERN.match(term.strip())}
+        for term in terms:
+            term = term.strip()
+            match = _PARENTHETICAL_PATTERN.match(term)
+            if match:
+                outer, inner = match.group("outer").strip(), match.group("inner").strip()
+                # "Natural Language Processing (NLP)" or "NLP (Natural Language Processing)"
+                if _ACRONYM_PATTERN.match(inner):
+                    acronyms[inner] = outer.lower()
+                elif _ACRONYM_PATTERN.match(outer):
+                    acronyms[outer] = inner.lower()
+                else:
+                    cls._add_synonyms(synonyms, outer, inner)
+                continue
+
+            # A bare acronym is resolved by another term with matching initials
+            initialism = cls._initialism(term)
+            if initialism and initialism in bare_acronyms and initialism not in acronyms:
+                acronyms[initialism] = term.lower()
+        return _FileDictionary(acronyms, synonyms)
+
+    def learn(self, metadata: Dict[str, Any], file_id: str) -> int:
+        """
+        Learns acronyms and synonyms from a file's generated metadata (blocking).
+
+        The file's previous entries are replaced, so re-processing a file
+        drops terms that no longer appear in its metadata.
+
+        Args:
+            metadata: The file metadata ("entities" and "topics" lists)
+            file_id: The ID of the file the metadata describes
+
+        Returns:
+            int: Number of dictionary entries added, changed or removed
+        """
+        self._load()
+        terms = [
+            str(term)
+            for key in ("entities", "topics")
+            for term in (metadata.get(key) or [])
+            if isinstance(term, str) and term.strip()
+        ]
+        learned = self._extract(terms)
+        file_id = str(file_id)
+        with self._lock:
+            previous = self._files.get(file_id)
+            changes = len(learned.entries() ^ (previous.entries() if previous else frozenset()))
+            if not changes:
+                return 0
+            # Updated on a copy, so concurrent rewrites keep seeing a consistent snapshot
+            files = dict(self._files)
+            files.pop(file_id, None)
+            if len(learned):
+                files[file_id] = learned
+            self._files = files
+            self.version += 1
+            self._save([file_id])
+        return changes
+
+    async def learn_async(self, metadata: Dict[str, Any], file_id: str) -> None:
+        """
+        Learns from a file's metadata without blocking the event loop.
+
+        Args:
+            metadata: The file metadata ("entities" and "topics" lists)
+            file_id: The ID of the file the metadata describes
+        """
+        try:
+            changes = await ingest_cpu_executor.run(self.learn, metadata, file_id)
+            if changes:
+                logger.info(f"Query dictionary updated with {changes} entries for file {file_id}")
+        except Exception as e:
+            logger.error(f"Error updating query dictionary: {e}")
+
+    def rewrite(self, query: str, file_ids: Optional[Sequence[str]] = None) -> QueryRewrite:
+        """
+        Rewrites a query for semantic search.
+
+        Only the dictionaries of the given files are used; without file IDs
+        the query is normalized but not expanded. Does not load the
+        dictionaries; call load() first (the application does at startup).
+
+        Args:
+            query: The user query
+            file_ids: The files the search is scoped to
+
+        Returns:
+            QueryRewrite: The rewritten query and its confidence
+        """
+        files = self._files
+        dictionaries = [files[str(file_id)] for file_id in (file_ids or ()) if str(file_id) in files]
+        words = _WORD_PATTERN.findall(query)
+        # Acronyms are kept even when they spell a stop word ("IT", "US")
+        content = [
+            word for word in words
+            if _ACRONYM_PATTERN.match(word) or word.lower().strip("'-") not in _STOP_WORDS
+        ]
+        expansions: List[str] = []
+        unknown_acronyms = 0
+
+        for word in content:
+            if _ACRONYM_PATTERN.match(word):
+                found = False
+                for dictionary in dictionaries:
+                    acronym = word[:-1] if word.endswith("s") and word[:-1] in dictionary.acronyms else word
+                    if acronym in dictionary.acronyms:
+                        expansions.append(dictionary.acronyms[acronym])
+                        found = True
+                if not found and len(word) >= 2 and not word.isdigit():
+                    unknown_acronyms += 1
+
+        # Spelled-out forms in the query also match chunks using the acronym, and synonyms are added
+        lowered_words = [word.lower() for word in content]
+        for i, word in enumerate(lowered_words):
+            for dictionary in dictionaries:
+                for phrase, related in dictionary.phrases.get(word, ()):
+                    if tuple(lowered_words[i:i + len(phrase)]) == phrase:
+                        expansions.extend(term for term in related if term not in content)
+
+        lowered = " ".join(lowered_words)
+        expansions = [term for term in dict.fromkeys(expansions) if term.lower() not in lowered]
+        text = " ".join(content + expansions) if content else query.strip()
+
+        confidence = 1.0
+        confidence -= 0.5 * unknown_acronyms
+        if len(content) < 2:
+            confidence -= 0.5
+        return QueryRewrite(text=text, confidence=max(0.0, confidence), expansions=expansions)
+
+
+# Global instance of the query rewriter
+query_rewriter = QueryRewriter()
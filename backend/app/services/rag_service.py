@@ -1,26 +1,211 @@
 """
 RAG service module for retrieval augmented generation.
 """
+import asyncio
+import json
+import re
 import time
-from typing import Any, Dict, List, Optional, Tuple, Union, AsyncGenerator
+from typing import Any, Callable, Dict, Hashable, List, Optional, Sequence, Tuple, Union, AsyncGenerator
 
+from app.core.cache import TTLCache
+from app.core.config import settings
 from app.core.logging import logger
+from app.core.metrics import metrics
+from app.core.singleflight import SingleFlight
+from app.services.diversity import mmr_select
+from app.services.embedding_service import embedding_service
 from app.services.llm_service import llm_service
+from app.services.local_vector_tier import local_vector_tier
+from app.services.query_classifier import query_classifier
+from app.services.query_rewriter import query_rewriter
 from app.db.pinecone import pinecone_client
 
 
+def reciprocal_rank_fusion(
+    result_lists: Sequence[List[Dict[str, Any]]],
+    top_k: int,
+    k: int = 60
+) -> List[Dict[str, Any]]:
+    """
+    Merges ranked result lists with reciprocal-rank fusion.
+    
+    Each document scores sum(1 / (k + rank)) over the lists it appears in, so
+    documents ranked well by several searches rise to the top. Documents are
+    matched by ID and keep their highest original score.
+    
+    Args:
+        result_lists: Ranked search results, best first.
+        top_k: Number of fused results to return.
+        k: RRF damping constant.
+        
+    Returns:
+        List[Dict[str, Any]]: The fused results, best first.
+    """
+    fused: Dict[str, float] = {}
+    documents: Dict[str, Dict[str, Any]] = {}
+    
+    for results in result_lists:
+        for rank, doc in enumerate(results, start=1):
+            doc_id = doc.get("id") or str(id(doc))
+            fused[doc_id] = fused.get(doc_id, 0.0) + 1.0 / (k + rank)
+            
+            existing = documents.get(doc_id)
+            if existing is None or (doc.get("score") or 0.0) > (existing.get("score") or 0.0):
+                documents[doc_id] = doc
+    
+    ranked_ids = sorted(fused, key=fused.get, reverse=True)[:top_k]
+    return [documents[doc_id] for doc_id in ranked_ids]
+
+
+def normalize_query(query: str) -> str:
+    """
+    Normalizes a query for cache lookups.
+    
+    Case, repeated whitespace and trailing punctuation are ignored, so the
+    same question asked slightly differently maps to the same key.
+    
+    Args:
+        query: The user query.
+        
+    Returns:
+        str: The normalized query.
+    """
+    return re.sub(r"\s+", " ", query).strip().rstrip("?!.").strip().lower()
+
+
 class RAGService:
     """
     Service for retrieval augmented generation.
     """
 
+    # Retrieved context keyed by (query, namespace, scoped file IDs, top_k, filter, optimize)
+    _retrieval_cache: TTLCache[Tuple[Optional[frozenset], List[Dict[str, Any]]]] = TTLCache(
+        max_size=settings.RETRIEVAL_CACHE_MAX_ENTRIES,
+        ttl_seconds=settings.RETRIEVAL_CACHE_TTL_SECONDS,
+    )
+    
+    # Query embeddings for local vector tier searches
+    _query_embedding_cache: TTLCache[List[float]] = TTLCache(
+        max_size=settings.RETRIEVAL_CACHE_MAX_ENTRIES,
+        ttl_seconds=settings.QUERY_OPTIMIZE_CACHE_TTL_SECONDS,
+    )
+    
+    # Optimized query text keyed by query dictionary version and normalized query
+    _optimized_query_cache: TTLCache[str] = TTLCache(
+        max_size=settings.RETRIEVAL_CACHE_MAX_ENTRIES,
+        ttl_seconds=settings.QUERY_OPTIMIZE_CACHE_TTL_SECONDS,
+    )
+    
+    # In-flight retrievals keyed like the retrieval cache
+    _retrieval_flights: SingleFlight[List[Dict[str, Any]]] = SingleFlight("retrieval")
+    
+    # Bumped by invalidate_file; retrievals started under an older generation are not cached
+    _invalidation_generation: int = 0
+    
+    # In-flight non-streamed answers keyed by (query, model, context)
+    _answer_flights: SingleFlight[str] = SingleFlight("answer")
+
+    @staticmethod
+    def _retrieval_cache_key(
+        query: str,
+        top_k: int,
+        namespace: str,
+        filter: Optional[Dict[str, Any]],
+        optimize_query: bool,
+        file_ids: Optional[List[str]],
+        diversify: bool = False
+    ) -> Hashable:
+        """
+        Builds the retrieval cache key for a request.
+        
+        Args:
+            query: The user query.
+            top_k: Number of results to return.
+            namespace: The namespace to search in.
+            filter: Metadata filters to apply.
+            optimize_query: Whether the query is optimized before searching.
+            file_ids: Optional file IDs the search is scoped to.
+            diversify: Whether MMR selection is applied.
+            
+        Returns:
+            Hashable: The cache key.
+        """
+        return (
+            normalize_query(query),
+            namespace or "",
+            tuple(sorted(str(file_id) for file_id in file_ids)) if file_ids else None,
+            top_k,
+            json.dumps(filter, sort_keys=True, default=str) if filter else None,
+            optimize_query,
+            diversify,
+        )
+
+    @staticmethod
+    def should_retrieve(query: str) -> bool:
+        """
+        Decides with the local query classifier whether a request needs retrieval.
+        
+        Instruction-style and chit-chat requests classified with at least
+        QUERY_CLASSIFIER_THRESHOLD confidence go straight to generation. In shadow
+        mode (QUERY_CLASSIFIER_SHADOW) the decision is only logged.
+        
+        Args:
+            query: The user query.
+            
+        Returns:
+            bool: Whether retrieval should run.
+        """
+        if not settings.QUERY_CLASSIFIER_ENABLED or query.strip().startswith('data:'):
+            return True
+        
+        classification = query_classifier.classify(query)
+        skip = not classification.needs_retrieval and classification.confidence >= settings.QUERY_CLASSIFIER_THRESHOLD
+        if not skip:
+            return True
+        
+        metrics.increment(f"query_classifier.skip.{classification.label}")
+        if settings.QUERY_CLASSIFIER_SHADOW:
+            logger.info(
+                f"Query classifier (shadow) would skip retrieval: label={classification.label}, "
+                f"confidence={classification.confidence:.2f}, query='{query[:80]}'"
+            )
+            return True
+        
+        logger.info(
+            f"Skipping retrieval: label={classification.label}, confidence={classification.confidence:.2f}"
+        )
+        return False
+
+    @staticmethod
+    def invalidate_file(file_id: str) -> None:
+        """
+        Drops cached retrievals that could include a file.
+        
+        Called when a file is re-ingested, enriched or deleted. Entries scoped to
+        the file and unscoped (namespace-wide) entries are removed.
+        
+        Args:
+            file_id: The ID of the file.
+        """
+        file_id = str(file_id)
+        RAGService._invalidation_generation += 1
+        removed = RAGService._retrieval_cache.invalidate_where(
+            lambda _, entry: entry[0] is None or file_id in entry[0]
+        )
+        # Requests arriving from now on must not join retrievals that may include stale chunks
+        RAGService._retrieval_flights.forget_where(lambda key: key[2] is None or file_id in key[2])
+        if removed:
+            logger.info(f"Invalidated {removed} cached retrievals for file {file_id}")
+
     @staticmethod
     async def retrieve_context(
         query: str, 
         top_k: int = 5, 
         namespace: str = "",
         filter: Optional[Dict[str, Any]] = None,
-        optimize_query: bool = True
+        optimize_query: bool = True,
+        file_ids: Optional[List[str]] = None,
+        diversify: Optional[bool] = None
     ) -> List[Dict[str, Any]]:
         """
         Retrieves context documents for a query using direct text-based search.
@@ -31,48 +216,254 @@ class RAGService:
             namespace: The namespace to search in.
             filter: Metadata filters to apply.
             optimize_query: Whether to optimize the query before searching.
+            file_ids: Optional file IDs to scope the search to (filtered server-side).
+            diversify: Whether to pick a diverse top_k with MMR from an over-fetched
+                candidate set (defaults to RETRIEVAL_MMR_ENABLED).
             
         Returns:
             List[Dict[str, Any]]: The retrieved context documents.
         """
+        if diversify is None:
+            diversify = settings.RETRIEVAL_MMR_ENABLED
         try:
             # Check if query is already a formatted stream
             if query.strip().startswith('data:'):
                 optimize_query = False
-                
-            # Optimize the query if requested
-            search_query = query
-            if optimize_query:
-                try:
-                    logger.info(f"DEBUG - About to optimize query: '{query}'")
-                    optimized = await llm_service.optimize_query(query)
-                    logger.info(f"DEBUG - Raw optimized query: '{optimized}'")
-                    
-                    # Only use the optimized query if it's a valid string and not empty
-                    if isinstance(optimized, str) and optimized.strip():
-                        search_query = optimized
-                        logger.info(f"Optimized query: '{query}' -> '{search_query}'")
-                    else:
-                        logger.warning(f"Optimization returned invalid result, using original query")
-                except Exception as e:
-                    logger.error(f"Error during query optimization: {e}")
-                    # Continue with the original query if optimization fails
-            
-            # Search directly using text-based search (no embedding generation needed)
-            logger.info(f"DEBUG - Searching with query: '{search_query}'")
-            results = await pinecone_client.search_records(
-                query_text=search_query,
-                top_k=top_k,
-                namespace=namespace,
-                filter=filter
+            
+            # Repeated questions over the same scope skip optimization and search
+            cache_key = RAGService._retrieval_cache_key(
+                query, top_k, namespace, filter, optimize_query, file_ids, diversify
             )
+            cached = RAGService._retrieval_cache.get(cache_key)
+            if cached is not None:
+                metrics.increment("retrieval.cache.hit")
+                logger.info(f"Retrieved {len(cached[1])} context documents from cache for query: '{query}'")
+                return list(cached[1])
+            metrics.increment("retrieval.cache.miss")
+            scope = frozenset(str(file_id) for file_id in file_ids) if file_ids else None
+            
+            async def compute() -> List[Dict[str, Any]]:
+                generation = RAGService._invalidation_generation
+                # MMR picks top_k from a larger candidate set
+                fetch_k = top_k * settings.RETRIEVAL_MMR_FETCH_MULTIPLIER if diversify else top_k
             
-            logger.info(f"Retrieved {len(results)} context documents for query: '{query}'")
-            return results
+                if optimize_query and settings.RETRIEVAL_SPECULATIVE:
+                    results = await RAGService._retrieve_speculative(
+                        query, fetch_k, namespace, filter, file_ids, include_values=diversify
+                    )
+                else:
+                    search_query = query
+                    if optimize_query:
+                        search_query = await RAGService._optimize_query(query, file_ids)
+                
+                    logger.info(f"DEBUG - Searching with query: '{search_query}'")
+                    results = await RAGService._search(
+                        search_query, fetch_k, namespace, filter, file_ids, include_values=diversify
+                    )
+            
+                if diversify:
+                    candidate_count = len(results)
+                    results = mmr_select(results, top_k, settings.RETRIEVAL_MMR_LAMBDA)
+                    for result in results:
+                        result.pop("values", None)
+                    metrics.observe("retrieval.mmr.candidates", candidate_count)
+                    logger.info(f"MMR selected {len(results)} of {candidate_count} candidates")
+            
+                # A file invalidated while this retrieval ran may be stale in its results
+                if generation == RAGService._invalidation_generation:
+                    RAGService._retrieval_cache.set(cache_key, (scope, list(results)))
+            
+                logger.info(f"Retrieved {len(results)} context documents for query: '{query}'")
+                return results
+            
+            # Identical concurrent requests (e.g. client retries) share one retrieval
+            return list(await RAGService._retrieval_flights.do(cache_key, compute))
         except Exception as e:
             logger.error(f"Error retrieving context: {e}")
             raise
 
+    @staticmethod
+    async def _search(
+        query_text: str,
+        top_k: int,
+        namespace: str,
+        filter: Optional[Dict[str, Any]],
+        file_ids: Optional[List[str]],
+        include_values: bool = False
+    ) -> List[Dict[str, Any]]:
+        """
+        Runs a single search, locally when the scoped files are mirrored.
+        
+        Scoped searches without extra filters are answered by the local vector tier
+        when every scoped file is mirrored; otherwise the missing files are mirrored
+        in the background and the search goes to Pinecone with the file filter.
+        
+        Args:
+            query_text: The text to search for.
+            top_k: Number of results to return.
+            namespace: The namespace to search in.
+            filter: Metadata filters to apply.
+            file_ids: Optional file IDs to scope the search to.
+            include_values: Whether local results should carry their chunk vectors.
+            
+        Returns:
+            List[Dict[str, Any]]: The search results.
+        """
+        namespace = namespace or ""
+        
+        if file_ids and not filter and local_vector_tier.enabled:
+            if await local_vector_tier.has_files(file_ids, namespace):
+                query_vector = await RAGService._embed_query(query_text)
+                start = time.monotonic()
+                results = await local_vector_tier.search(
+                    query_vector, file_ids, namespace, top_k, include_values=include_values
+                )
+                metrics.observe("local_tier.search_ms", (time.monotonic() - start) * 1000)
+                metrics.increment("local_tier.hit")
+                return results
+            metrics.increment("local_tier.miss")
+            local_vector_tier.warm(file_ids, namespace)
+        
+        # Scope the search to the given files inside Pinecone
+        if file_ids:
+            file_filter = await pinecone_client.create_file_filter(file_ids)
+            filter = {"$and": [filter, file_filter]} if filter else file_filter
+        
+        # Search directly using text-based search (no embedding generation needed)
+        return await pinecone_client.search_records(
+            query_text=query_text,
+            top_k=top_k,
+            namespace=namespace,
+            filter=filter
+        )
+
+    @staticmethod
+    async def _embed_query(query_text: str) -> List[float]:
+        """
+        Embeds a query for local search, reusing recent embeddings.
+        
+        Args:
+            query_text: The text to embed.
+            
+        Returns:
+            List[float]: The query embedding.
+        """
+        cache_key = query_text.strip()
+        cached = RAGService._query_embedding_cache.get(cache_key)
+        if cached is not None:
+            return cached
+        embedding = await embedding_service.generate_embedding(cache_key)
+        RAGService._query_embedding_cache.set(cache_key, embedding)
+        return embedding
+
+    @staticmethod
+    async def _optimize_query(query: str, file_ids: Optional[List[str]] = None) -> str:
+        """
+        Optimizes a query, falling back to the original query.
+        
+        The query is rewritten locally first, with the dictionaries learned from
+        the files it is scoped to; the LLM optimizer is only called when the
+        local rewrite has low confidence.
+        
+        Args:
+            query: The user query.
+            file_ids: Optional file IDs the search is scoped to.
+            
+        Returns:
+            str: The optimized query, or the original query if optimization failed.
+        """
+        if settings.QUERY_REWRITE_LOCAL_ENABLED:
+            await query_rewriter.load()
+        # Rewrites made with an older dictionary or for other files are not reused
+        scope = frozenset(str(file_id) for file_id in file_ids) if file_ids else None
+        cache_key = (query_rewriter.version, scope, normalize_query(query))
+        cached = RAGService._optimized_query_cache.get(cache_key)
+        if cached is not None:
+            return cached
+        
+        if settings.QUERY_REWRITE_LOCAL_ENABLED:
+            rewrite = query_rewriter.rewrite(query, file_ids)
+            if rewrite.confidence >= settings.QUERY_REWRITE_MIN_CONFIDENCE:
+                metrics.increment("query_rewrite.local")
+                logger.info(f"Rewrote query locally: '{query}' -> '{rewrite.text}'")
+                RAGService._optimized_query_cache.set(cache_key, rewrite.text)
+                return rewrite.text
+            logger.info(f"Local rewrite confidence {rewrite.confidence:.2f} too low, using the LLM optimizer")
+        
+        metrics.increment("query_rewrite.llm")
+        try:
+            logger.info(f"DEBUG - About to optimize query: '{query}'")
+            optimized = await llm_service.optimize_query(query)
+            logger.info(f"DEBUG - Raw optimized query: '{optimized}'")
+            
+            # Only use the optimized query if it's a valid string and not empty
+            if isinstance(optimized, str) and optimized.strip():
+                logger.info(f"Optimized query: '{query}' -> '{optimized}'")
+                RAGService._optimized_query_cache.set(cache_key, optimized)
+                return optimized
+            logger.warning(f"Optimization returned invalid result, using original query")
+        except Exception as e:
+            logger.error(f"Error during query optimization: {e}")
+            # Continue with the original query if optimization fails
+        return query
+
+    @staticmethod
+    async def _retrieve_speculative(
+        query: str,
+        top_k: int,
+        namespace: str,
+        filter: Optional[Dict[str, Any]],
+        file_ids: Optional[List[str]] = None,
+        include_values: bool = False
+    ) -> List[Dict[str, Any]]:
+        """
+        Searches with the raw query while the query is being optimized.
+        
+        If the optimized query arrives before the deadline, it is searched too and
+        both result sets are merged with reciprocal-rank fusion; otherwise the raw
+        results are returned as they are.
+        
+        Args:
+            query: The user query.
+            top_k: Number of results to return.
+            namespace: The namespace to search in.
+            filter: Metadata filters to apply.
+            file_ids: Optional file IDs to scope the search to.
+            include_values: Whether local results should carry their chunk vectors.
+            
+        Returns:
+            List[Dict[str, Any]]: The retrieved context documents.
+        """
+        start = time.monotonic()
+        raw_search = asyncio.create_task(
+            RAGService._search(query, top_k, namespace, filter, file_ids, include_values)
+        )
+        optimization = asyncio.create_task(RAGService._optimize_query(query, file_ids))
+        
+        try:
+            optimized = await asyncio.wait_for(
+                optimization, timeout=settings.QUERY_OPTIMIZE_DEADLINE_MS / 1000.0
+            )
+        except asyncio.TimeoutError:
+            # wait_for cancels the optimization; the raw results win
+            metrics.increment("retrieval.speculative.deadline_missed")
+            logger.info(f"Query optimization missed the {settings.QUERY_OPTIMIZE_DEADLINE_MS}ms deadline, using raw results")
+            return await raw_search
+        except asyncio.CancelledError:
+            raw_search.cancel()
+            raise
+        metrics.observe("retrieval.optimize_ms", (time.monotonic() - start) * 1000)
+        
+        if optimized.strip() == query.strip():
+            return await raw_search
+        
+        optimized_results, raw_results = await asyncio.gather(
+            RAGService._search(optimized, top_k, namespace, filter, file_ids, include_values),
+            raw_search
+        )
+        metrics.increment("retrieval.speculative.fused")
+        return reciprocal_rank_fusion([optimized_results, raw_results], top_k=top_k)
+
     @staticmethod
     async def generate_answer(
         query: str, 
@@ -120,7 +511,9 @@ class RAGService:
         use_rag: bool = True,
         stream: bool = False,
         namespace: str = "",
-        filter: Optional[Dict[str, Any]] = None
+        filter: Optional[Dict[str, Any]] = None,
+        file_ids: Optional[List[str]] = None,
+        on_context: Optional[Callable[[List[Dict[str, Any]]], None]] = None
     ) -> Tuple[Union[str, Any], List[Dict[str, Any]], float]:
         """
         Performs a complete RAG query.
@@ -133,6 +526,9 @@ class RAGService:
             stream: Whether to stream the response.
             namespace: The namespace to search in.
             filter: Metadata filters to apply.
+            file_ids: Optional file IDs to scope the search to.
+            on_context: Optional callback invoked with the context before the answer is
+                generated, so callers can start work that only depends on retrieval.
             
         Returns:
             Tuple[Union[str, Any], List[Dict[str, Any]], float]: The answer, context documents, and query time.
@@ -148,16 +544,37 @@ class RAGService:
                     query=query,
                     top_k=top_k,
                     namespace=namespace,
-                    filter=filter
+                    filter=filter,
+                    file_ids=file_ids
                 )
             
+            if on_context is not None:
+                on_context(context)
+            
             # Generate answer
-            answer = await RAGService.generate_answer(
-                query=query,
-                context=context,
-                model_name=model_name,
-                stream=stream
-            )
+            if stream:
+                answer = await RAGService.generate_answer(
+                    query=query,
+                    context=context,
+                    model_name=model_name,
+                    stream=True
+                )
+            else:
+                # Identical concurrent requests over the same context share one generation
+                answer_key = (
+                    normalize_query(query),
+                    model_name,
+                    tuple(str(doc.get("id") or doc.get("text", "")) for doc in context),
+                )
+                answer = await RAGService._answer_flights.do(
+                    answer_key,
+                    lambda: RAGService.generate_answer(
+                        query=query,
+                        context=context,
+                        model_name=model_name,
+                        stream=False
+                    )
+                )
             
             query_time = (time.time() - start_time) * 1000  # Convert to milliseconds
             logger.info(f"RAG query completed in {query_time:.2f}ms")
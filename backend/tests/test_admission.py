@@ -0,0 +1,179 @@
+"""
+Tests for LLM admission control.
+"""
+import asyncio
+from unittest.mock import patch
+
+import pytest
+
+from app.core.admission import (
+    PRIORITY_INGEST,
+    PRIORITY_INTERACTIVE,
+    AdmissionController,
+    AdmissionLimiter,
+    AdmissionTimeout,
+    TokenBucket,
+)
+from app.core.config import settings
+from app.services.extraction_executor import ExtractionExecutor
+
+
+def test_token_bucket_starts_full():
+    """
+    Test that a new bucket can be consumed up to its capacity without waiting.
+    """
+    bucket = TokenBucket(per_minute=60)
+
+    assert bucket.time_until(60) == 0.0
+
+
+def test_token_bucket_waits_for_refill():
+    """
+    Test that an empty bucket waits for the refill of the requested amount.
+    """
+    bucket = TokenBucket(per_minute=60)
+    bucket.consume(60)
+
+    # One unit refills every second at 60 per minute
+    assert bucket.time_until(1) == pytest.approx(1.0, abs=0.05)
+    assert bucket.time_until(10) == pytest.approx(10.0, abs=0.05)
+
+
+def test_token_bucket_oversized_request_waits_for_full_bucket():
+    """
+    Test that a request larger than the bucket only waits for a full bucket.
+    """
+    bucket = TokenBucket(per_minute=60)
+    bucket.consume(30)
+
+    assert bucket.time_until(1000) == pytest.approx(30.0, abs=0.05)
+
+
+def test_token_bucket_unlimited():
+    """
+    Test that a bucket without a rate never waits.
+    """
+    bucket = TokenBucket(per_minute=0)
+    bucket.consume(1000)
+
+    assert bucket.time_until(1000) == 0.0
+
+
+def test_token_bucket_debt():
+    """
+    Test that consuming beyond the level puts the bucket in debt.
+    """
+    bucket = TokenBucket(per_minute=60)
+    bucket.consume(90)
+
+    # The 30 units of debt are refilled before the next unit is available
+    assert bucket.time_until(1) == pytest.approx(31.0, abs=0.05)
+
+
+async def test_limiter_admits_by_priority():
+    """
+    Test that queued interactive calls are admitted before queued ingest calls.
+    """
+    limiter = AdmissionLimiter("test", concurrency=1, rpm=0, tpm=0)
+    await limiter.acquire(tokens=0, priority=PRIORITY_INTERACTIVE, timeout=1.0)
+    admitted = []
+
+    async def call(label: str, priority: int) -> None:
+        await limiter.acquire(tokens=0, priority=priority, timeout=1.0)
+        admitted.append(label)
+        limiter.release()
+
+    # The ingest call queues first
+    ingest = asyncio.create_task(call("ingest", PRIORITY_INGEST))
+    await asyncio.sleep(0.01)
+    interactive = asyncio.create_task(call("interactive", PRIORITY_INTERACTIVE))
+    await asyncio.sleep(0.01)
+    assert admitted == []
+
+    limiter.release()
+    await asyncio.gather(ingest, interactive)
+
+    assert admitted == ["interactive", "ingest"]
+    assert limiter.active == 0
+
+
+async def test_limiter_timeout():
+    """
+    Test that a call waiting longer than its timeout fails and leaves the queue.
+    """
+    limiter = AdmissionLimiter("test", concurrency=1, rpm=0, tpm=0)
+    await limiter.acquire(tokens=0, priority=PRIORITY_INTERACTIVE, timeout=1.0)
+
+    with pytest.raises(AdmissionTimeout):
+        await limiter.acquire(tokens=0, priority=PRIORITY_INTERACTIVE, timeout=0.05)
+
+    assert limiter._waiters == []
+    assert limiter.active == 1
+
+
+async def test_limiter_waits_for_tokens():
+    """
+    Test that a call is held back until the tokens-per-minute bucket has room.
+    """
+    limiter = AdmissionLimiter("test", concurrency=0, rpm=0, tpm=600)
+    await limiter.acquire(tokens=600, priority=PRIORITY_INTERACTIVE, timeout=1.0)
+
+    # 600 tokens per minute refill 10 per second, so 5 tokens take 0.5s
+    with pytest.raises(AdmissionTimeout):
+        await limiter.acquire(tokens=5, priority=PRIORITY_INTERACTIVE, timeout=0.1)
+    await limiter.acquire(tokens=5, priority=PRIORITY_INTERACTIVE, timeout=1.0)
+
+
+async def test_controller_admit_charges_used_tokens():
+    """
+    Test that tokens used beyond the estimate are charged when the call ends.
+    """
+    controller = AdmissionController(limits={"gemini": {"concurrency": 2, "tpm": 600}})
+
+    async with controller.admit("gemini", tokens=100) as permit:
+        permit.record_tokens(300)
+
+    limiter = controller.limiter("gemini")
+    assert limiter.active == 0
+    assert limiter.tokens.level == pytest.approx(300, abs=1)
+
+
+def test_controller_set_share_reconfigures_limiters():
+    """
+    Test that changing the share rescales existing limiters in place.
+    """
+    controller = AdmissionController(limits={"gemini": {"concurrency": 8, "rpm": 100, "tpm": 1000}})
+    limiter = controller.limiter("gemini", "gemini-1.5-flash")
+    limiter.active = 3
+
+    controller.set_share(0.25)
+
+    assert controller.limiter("gemini", "gemini-1.5-flash") is limiter
+    assert limiter.concurrency == 2
+    assert limiter.requests.per_minute == 25
+    assert limiter.tokens.per_minute == 250
+    assert limiter.active == 3
+
+
+def test_api_process_leaves_worker_share_free():
+    """
+    Test that with a worker pool the API process and its workers share one quota.
+    """
+    controller = AdmissionController(limits={"gemini": {"concurrency": 40, "rpm": 1000, "tpm": 100000}})
+    with patch("app.services.extraction_executor.admission", controller):
+        ExtractionExecutor(max_workers=2).configure_admission()
+
+    api_rpm = controller.limiter("gemini").requests.per_minute
+    worker_rpm = 1000 * settings.LLM_ADMISSION_WORKER_SHARE / 2
+    assert api_rpm + 2 * worker_rpm == pytest.approx(1000)
+
+
+def test_api_process_keeps_full_quota_without_pool():
+    """
+    Test that the API process keeps the whole quota when extraction runs in-process.
+    """
+    controller = AdmissionController(limits={"gemini": {"concurrency": 40, "rpm": 1000, "tpm": 100000}})
+    with patch("app.services.extraction_executor.admission", controller):
+        ExtractionExecutor(max_workers=0).configure_admission()
+
+    assert controller.share == 1.0
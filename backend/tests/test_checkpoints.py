@@ -0,0 +1,52 @@
+"""
+Tests for the ingestion checkpoint store.
+"""
+import pytest
+
+from app.db.checkpoints import CheckpointStore
+from app.models.notebook_file import NotebookFile
+
+
+@pytest.fixture
+def store(tmp_path):
+    """
+    Checkpoint store fixture with a small size cap.
+    """
+    store = CheckpointStore(path=str(tmp_path / "checkpoints.sqlite3"), max_bytes=64)
+    yield store
+    store.close()
+
+
+async def test_put_json_round_trips(store):
+    """
+    Test that a JSON stage output is returned as stored.
+    """
+    await store.put_json("file-1", "chunked", ["a", "b"])
+
+    assert await store.get_json("file-1", "chunked") == ["a", "b"]
+
+
+async def test_put_json_skips_values_over_the_cap(store):
+    """
+    Test that JSON values larger than max_bytes are not checkpointed.
+    """
+    await store.put_json("file-1", "extracted", {"text": "x" * 100})
+
+    assert await store.get_json("file-1", "extracted") is None
+    assert not await store.has("file-1", "extracted")
+
+
+def test_content_version_changes_with_stored_file():
+    """
+    Test that replacing a file in storage changes its content version even at the same size.
+    """
+    fields = dict(
+        id="file-1", notebook_id="nb-1", user_id="user-1", file_name="a.pdf",
+        file_path="user-1/a.pdf", file_type="application/pdf", file_size=100,
+        created_at="2026-01-01T00:00:00+00:00",
+    )
+    original = NotebookFile(**fields, updated_at="2026-01-01T00:00:00+00:00")
+
+    assert original.content_version == NotebookFile(**fields, updated_at="2026-01-01T00:00:00+00:00").content_version
+    assert original.content_version != NotebookFile(**fields, updated_at="2026-02-01T00:00:00+00:00").content_version
+    assert original.content_version != NotebookFile(**{**fields, "file_path": "user-1/a-v2.pdf"}).content_version
@@ -0,0 +1,104 @@
+"""
+Tests for token-budgeted context packing.
+"""
+import pytest
+
+from app.services.context_packer import ContextPacker
+
+
+def _chunk(file_id: str, index: int, score: float, text: str) -> dict:
+    return {
+        "score": score,
+        "text": text,
+        "metadata": {"file_id": file_id, "source": f"{file_id}.pdf", "chunk_index": index},
+    }
+
+
+@pytest.fixture
+def packer():
+    """
+    Context packer fixture with small budgets.
+    """
+    return ContextPacker(budgets={"gemini": 2000, "openai": 500}, min_relative_score=0.5, max_overlap_chars=100)
+
+
+def test_budget_for_model(packer):
+    """
+    Test that budgets match by model family prefix and default to the smallest.
+    """
+    assert packer.budget_for_model("gemini-1.5-flash-8b") == 2000
+    assert packer.budget_for_model("openai") == 500
+    assert packer.budget_for_model("unknown-model") == 500
+
+
+def test_groups_chunks_under_one_header(packer):
+    """
+    Test that chunks of one file share a header and adjacent chunks are merged.
+    """
+    overlap = "shared sentence between both chunks."
+    context = [
+        _chunk("a", 0, 0.9, f"First chunk text. {overlap}"),
+        _chunk("a", 1, 0.8, f"{overlap} Second chunk text."),
+        _chunk("a", 5, 0.7, "A distant chunk."),
+    ]
+
+    packed = packer.pack(context, model_name="gemini")
+
+    assert packed.file_count == 1
+    assert packed.dropped_chunks == 0
+    assert packed.text.count("File #") == 1
+    assert packed.text.count(overlap) == 1
+    assert "Second chunk text.\n...\nA distant chunk." in packed.text
+
+
+def test_drops_chunks_below_relative_score(packer):
+    """
+    Test that chunks scoring well below the best chunk are left out.
+    """
+    context = [_chunk("a", 0, 0.9, "Relevant text."), _chunk("b", 0, 0.3, "Barely related text.")]
+
+    packed = packer.pack(context, model_name="gemini")
+
+    assert packed.dropped_chunks == 1
+    assert "Barely related text." not in packed.text
+
+
+def test_stays_within_budget(packer):
+    """
+    Test that the best files are packed first and the rest is dropped at the budget.
+    """
+    context = [_chunk(f"file{i}", 0, 0.9 - i * 0.01, f"Sentence {i}. " * 60) for i in range(10)]
+
+    packed = packer.pack(context, model_name="openai")
+
+    assert packed.tokens <= 500
+    assert packed.file_count < 10
+    assert packed.dropped_chunks == 10 - packed.file_count
+    assert "file0.pdf" in packed.text
+    assert "file9.pdf" not in packed.text
+
+
+def test_reserved_tokens_reduce_budget(packer):
+    """
+    Test that tokens reserved for the rest of the prompt are taken off the budget.
+    """
+    context = [_chunk(f"file{i}", 0, 0.9, f"Sentence {i}. " * 60) for i in range(10)]
+
+    full = packer.pack(context, model_name="gemini")
+    reserved = packer.pack(context, model_name="gemini", reserved_tokens=1500)
+
+    assert reserved.tokens <= 500
+    assert reserved.file_count < full.file_count
+
+
+def test_truncates_single_oversized_document(packer):
+    """
+    Test that a whole document larger than the budget is truncated instead of dropped.
+    """
+    context = [{"score": 1.0, "text": "word " * 5000, "metadata": {"source": "notes.json"}}]
+
+    packed = packer.pack(context, model_name="openai")
+
+    assert packed.file_count == 1
+    assert packed.text.endswith("... [truncated]")
+    assert packed.tokens <= 500
@@ -0,0 +1,76 @@
+"""
+Tests for MMR diversity selection.
+"""
+from app.services.diversity import _similarity_matrix, mmr_select
+
+
+def test_returns_all_when_fewer_than_top_k():
+    """
+    Test that candidates are returned unchanged when there are no more than top_k.
+    """
+    candidates = [{"id": "a", "score": 0.9}, {"id": "b", "score": 0.8}]
+
+    assert mmr_select(candidates, top_k=3) == candidates
+
+
+def test_skips_near_duplicate_vectors():
+    """
+    Test that a near-duplicate of the best candidate loses to a diverse one.
+    """
+    candidates = [
+        {"id": "a", "score": 0.90, "values": [1.0, 0.0]},
+        {"id": "a-copy", "score": 0.89, "values": [1.0, 0.01]},
+        {"id": "b", "score": 0.80, "values": [0.0, 1.0]},
+    ]
+
+    selected = mmr_select(candidates, top_k=2, lambda_mult=0.5)
+
+    assert [candidate["id"] for candidate in selected] == ["a", "b"]
+
+
+def test_lambda_one_keeps_relevance_order():
+    """
+    Test that lambda 1.0 selects purely by relevance.
+    """
+    candidates = [
+        {"id": "a", "score": 0.90, "values": [1.0, 0.0]},
+        {"id": "a-copy", "score": 0.89, "values": [1.0, 0.01]},
+        {"id": "b", "score": 0.80, "values": [0.0, 1.0]},
+    ]
+
+    selected = mmr_select(candidates, top_k=2, lambda_mult=1.0)
+
+    assert [candidate["id"] for candidate in selected] == ["a", "a-copy"]
+
+
+def test_skips_duplicate_text_without_vectors():
+    """
+    Test that the MinHash fallback detects duplicate chunk texts.
+    """
+    text = "the mitochondria is the powerhouse of the cell and produces energy"
+    candidates = [
+        {"id": "a", "score": 0.90, "metadata": {"text_chunk": text}},
+        {"id": "a-copy", "score": 0.89, "metadata": {"text_chunk": text}},
+        {"id": "b", "score": 0.80, "metadata": {"text_chunk": "photosynthesis converts light into chemical energy in plants"}},
+    ]
+
+    selected = mmr_select(candidates, top_k=2, lambda_mult=0.5)
+
+    assert [candidate["id"] for candidate in selected] == ["a", "b"]
+
+
+def test_empty_texts_are_not_similar():
+    """
+    Test that candidates without text are not treated as duplicates of each other.
+    """
+    candidates = [
+        {"id": "a", "score": 0.9, "text": ""},
+        {"id": "b", "score": 0.8, "metadata": {}},
+        {"id": "c", "score": 0.7, "text": "some real chunk text here"},
+    ]
+
+    similarity = _similarity_matrix(candidates)
+
+    assert similarity[0, 1] == 0.0
+    assert similarity[0, 2] == 0.0
+    assert similarity[2, 2] == 1.0
@@ -0,0 +1,144 @@
+"""
+Tests for the extraction process pool.
+"""
+import asyncio
+import os
+import signal
+import time
+from concurrent.futures.process import BrokenProcessPool
+from unittest.mock import patch
+
+import pytest
+
+from app.services.extraction_executor import ExtractionExecutor, _read_shared_content
+
+# Worker entry points replacing _extract_in_worker; module-level so spawned workers can unpickle them
+
+
+def _echo(shm_name, size, file_type, file_path, operations, options):
+    return (_read_shared_content(shm_name, size),)
+
+
+def _hang(shm_name, size, file_type, file_path, operations, options):
+    time.sleep(60)
+
+
+def _allocate(shm_name, size, file_type, file_path, operations, options):
+    return (len(bytearray(2 * 1024 * 1024 * 1024)),)
+
+
+def _die(shm_name, size, file_type, file_path, operations, options):
+    os.kill(os.getpid(), signal.SIGKILL)
+
+
+def _hang_first_attempt(shm_name, size, file_type, file_path, operations, options):
+    # file_path is a marker file: the first attempt creates it and hangs, a retry returns
+    if os.path.exists(file_path):
+        return ("retried",)
+    open(file_path, "w").close()
+    time.sleep(60)
+
+
+@pytest.fixture
+def make_executor():
+    """
+    Factory fixture for extraction executors whose pools are shut down after the test.
+    """
+    executors = []
+
+    def make(**kwargs):
+        executor = ExtractionExecutor(**{"max_workers": 1, "timeout": 30.0, "memory_limit_mb": 0, **kwargs})
+        executors.append(executor)
+        return executor
+
+    yield make
+    for executor in executors:
+        for pool in [executor._pool, *executor._recycled]:
+            if pool is not None:
+                executor._reset_pool(pool)
+
+
+async def test_worker_reads_content_from_shared_memory(make_executor):
+    """
+    Test that the file content reaches the worker intact.
+    """
+    executor = make_executor()
+
+    with patch("app.services.extraction_executor._extract_in_worker", _echo):
+        (content,) = await executor.run("text/plain", b"file bytes", "a.txt")
+
+    assert content == b"file bytes"
+
+
+async def test_hung_worker_times_out_and_pool_is_replaced(make_executor):
+    """
+    Test that a hung worker times out, its pool is torn down and the next task gets a new pool.
+    """
+    executor = make_executor(timeout=1.0)
+
+    with patch("app.services.extraction_executor._extract_in_worker", _hang):
+        with pytest.raises(TimeoutError):
+            await executor.run("text/plain", b"x", "a.txt")
+    assert executor._pool is None
+
+    with patch("app.services.extraction_executor._extract_in_worker", _echo):
+        (content,) = await executor.run("text/plain", b"y", "b.txt")
+    assert content == b"y"
+
+
+async def test_allocation_over_memory_limit_fails(make_executor):
+    """
+    Test that a worker allocating past its memory limit fails the task instead of growing.
+    """
+    executor = make_executor(memory_limit_mb=512)
+
+    with patch("app.services.extraction_executor._extract_in_worker", _allocate):
+        with pytest.raises(MemoryError):
+            await executor.run("text/plain", b"x", "a.txt")
+
+
+async def test_killed_worker_raises_and_resets_pool(make_executor):
+    """
+    Test that a worker killed mid-task (e.g. by the OOM killer) fails the task and resets the pool.
+    """
+    executor = make_executor()
+
+    with patch("app.services.extraction_executor._extract_in_worker", _die):
+        with pytest.raises(BrokenProcessPool):
+            await executor.run("text/plain", b"x", "a.txt")
+    assert executor._pool is None
+
+
+async def test_task_is_retried_after_another_tasks_reset(make_executor, tmp_path):
+    """
+    Test that a task on a pool torn down for another task's timeout is retried on the new pool.
+    """
+    executor = make_executor(max_workers=2, timeout=5.0)
+
+    async def hung_task():
+        with pytest.raises(TimeoutError):
+            await executor.run("text/plain", b"x", str(tmp_path / "hung"))
+
+    async def bystander_task():
+        # Starts after the hung task, so its first attempt is still running when that pool is reset
+        await asyncio.sleep(1.0)
+        return await executor.run("text/plain", b"x", str(tmp_path / "marker"))
+
+    with patch("app.services.extraction_executor._extract_in_worker", _hang_first_attempt):
+        _, result = await asyncio.gather(hung_task(), bystander_task())
+
+    assert result == ("retried",)
+
+
+async def test_in_process_extraction_times_out(make_executor):
+    """
+    Test that extraction without worker processes is still bounded by the timeout.
+    """
+    executor = make_executor(max_workers=0, timeout=0.1)
+
+    async def hang(*args):
+        await asyncio.sleep(60)
+
+    with patch("app.services.extraction_executor._run_processor", hang):
+        with pytest.raises(TimeoutError):
+            await executor.run("text/plain", b"x", "a.txt")
@@ -1,6 +1,8 @@
 """
 Tests for the health endpoint.
 """
+from unittest.mock import patch
+
 import pytest
 from fastapi.testclient import TestClient
 
@@ -22,4 +24,24 @@ def test_health_check(client):
     """
     response = client.get("/health")
     assert response.status_code == 200
-    assert response.json() == {"status": "ok"} 
\ No newline at end of file
+    assert response.json() == {"status": "ok"} 
+
+def test_metrics_disabled_without_token(client):
+    """
+    Test that the metrics endpoint is not served when no token is configured.
+    """
+    with patch("app.main.settings.METRICS_TOKEN", None):
+        response = client.get("/metrics")
+    assert response.status_code == 404
+
+
+def test_metrics_requires_token(client):
+    """
+    Test that the metrics endpoint requires the configured bearer token.
+    """
+    with patch("app.main.settings.METRICS_TOKEN", "secret"):
+        assert client.get("/metrics").status_code == 401
+        assert client.get("/metrics", headers={"Authorization": "Bearer wrong"}).status_code == 401
+        response = client.get("/metrics", headers={"Authorization": "Bearer secret"})
+    assert response.status_code == 200
+    assert "counters" in response.json()
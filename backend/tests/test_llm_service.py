@@ -0,0 +1,163 @@
+"""
+Tests for hedged LLM requests.
+"""
+import asyncio
+import time
+from unittest.mock import patch
+
+import pytest
+
+from app.services.llm_service import LLMService
+
+
+class FakeProvider:
+    """
+    Provider double that answers after a delay, or fails.
+    """
+
+    def __init__(self, name: str, delay: float = 0.0, result: str = "an answer", error: Exception = None):
+        self.name = name
+        self.delay = delay
+        self.result = result
+        self.error = error
+        self.calls = 0
+        self.cancelled = False
+        self.closed = False
+
+    async def complete(self, prompt, model=None, **options):
+        self.calls += 1
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+        if self.error:
+            raise self.error
+        return self.result
+
+    async def stream(self, prompt, model=None, **options):
+        self.calls += 1
+        try:
+            await asyncio.sleep(self.delay)
+            if self.error:
+                raise self.error
+            for chunk in self.result.split(" "):
+                yield chunk
+        finally:
+            self.closed = True
+
+
+@pytest.fixture
+def service():
+    """
+    LLM service fixture without provider clients and with a short hedge delay.
+    """
+    with patch.object(LLMService, "_hedge_delay", return_value=0.05):
+        yield LLMService.__new__(LLMService)
+
+
+async def test_complete_primary_wins_before_delay(service):
+    """
+    Test that a fast primary answers without starting the backup.
+    """
+    primary, backup = FakeProvider("primary"), FakeProvider("backup")
+
+    result = await service._complete_hedged(primary, None, (backup, None), "prompt")
+
+    assert result == "an answer"
+    assert backup.calls == 0
+
+
+async def test_complete_backup_wins_after_delay(service):
+    """
+    Test that a slow primary is hedged, the backup answer wins and the primary is cancelled.
+    """
+    primary = FakeProvider("primary", delay=5.0, result="slow")
+    backup = FakeProvider("backup", delay=0.01, result="fast")
+
+    result = await service._complete_hedged(primary, None, (backup, None), "prompt")
+    await asyncio.sleep(0)
+
+    assert result == "fast"
+    assert primary.cancelled
+
+
+async def test_complete_primary_failure_starts_backup_immediately(service):
+    """
+    Test that a primary that fails fast starts the backup without waiting for the hedge delay.
+    """
+    primary = FakeProvider("primary", error=RuntimeError("primary down"))
+    backup = FakeProvider("backup", result="fallback")
+
+    with patch.object(LLMService, "_hedge_delay", return_value=5.0):
+        start = time.monotonic()
+        result = await service._complete_hedged(primary, None, (backup, None), "prompt")
+
+    assert result == "fallback"
+    assert time.monotonic() - start < 1.0
+
+
+async def test_complete_both_failing_propagates_error(service):
+    """
+    Test that the error is raised when the primary and the backup both fail.
+    """
+    primary = FakeProvider("primary", error=RuntimeError("primary down"))
+    backup = FakeProvider("backup", error=RuntimeError("backup down"))
+
+    with pytest.raises(RuntimeError):
+        await service._complete_hedged(primary, None, (backup, None), "prompt")
+
+
+async def test_stream_primary_wins_before_delay(service):
+    """
+    Test that a primary stream with an early first chunk is not hedged.
+    """
+    primary, backup = FakeProvider("primary", result="hello world"), FakeProvider("backup")
+
+    chunks = [chunk async for chunk in service._stream(primary, "prompt", None, (backup, None))]
+
+    assert chunks == ["hello", "world"]
+    assert backup.calls == 0
+
+
+async def test_stream_backup_wins_and_primary_stream_is_closed(service):
+    """
+    Test that a late first chunk is hedged, the backup stream wins and the primary stream is closed.
+    """
+    primary = FakeProvider("primary", delay=5.0, result="slow answer")
+    backup = FakeProvider("backup", delay=0.01, result="fast answer")
+
+    chunks = [chunk async for chunk in service._stream(primary, "prompt", None, (backup, None))]
+
+    assert chunks == ["fast", "answer"]
+    assert primary.closed
+
+
+async def test_stream_primary_failure_starts_backup_immediately(service):
+    """
+    Test that a primary stream that fails before its first chunk starts the backup at once.
+    """
+    primary = FakeProvider("primary", error=RuntimeError("primary down"))
+    backup = FakeProvider("backup", result="fallback answer")
+
+    with patch.object(LLMService, "_hedge_delay", return_value=5.0):
+        start = time.monotonic()
+        chunks = [chunk async for chunk in service._stream(primary, "prompt", None, (backup, None))]
+
+    assert chunks == ["fallback", "answer"]
+    assert time.monotonic() - start < 1.0
+
+
+async def test_stream_both_failing_propagates_error(service):
+    """
+    Test that the error is raised when both streams fail, and reported in-band by _stream.
+    """
+    primary = FakeProvider("primary", error=RuntimeError("primary down"))
+    backup = FakeProvider("backup", error=RuntimeError("backup down"))
+
+    with pytest.raises(RuntimeError):
+        await service._first_chunk(primary, None, (backup, None), "prompt")
+
+    chunks = [chunk async for chunk in service._stream(primary, "prompt", None, (backup, None))]
+    assert len(chunks) == 1
+    assert chunks[0].startswith("\nError:")
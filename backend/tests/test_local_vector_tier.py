@@ -0,0 +1,198 @@
+"""
+Tests for the local vector tier.
+"""
+import asyncio
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import numpy as np
+import pytest
+
+from app.services.local_vector_tier import LocalVectorTier
+
+
+def _vectors(pinecone_id: str, rows: list) -> list:
+    return [
+        (f"{pinecone_id}_chunk_{i}", list(row), {"chunk_index": i, "text": f"chunk {i}"})
+        for i, row in enumerate(rows)
+    ]
+
+
+@pytest.fixture
+def manifest():
+    """
+    Chunk manifest fixture that knows no files.
+    """
+    manifest = MagicMock()
+    manifest.latest_pinecone_ids = AsyncMock(return_value={})
+    manifest.latest_pinecone_id = AsyncMock(return_value=None)
+    manifest.vector_ids = AsyncMock(return_value=None)
+    with patch("app.services.local_vector_tier.chunk_manifest", manifest):
+        yield manifest
+
+
+@pytest.fixture
+def tier(tmp_path, manifest):
+    """
+    Quantized local vector tier fixture backed by a temporary directory.
+    """
+    return LocalVectorTier(enabled=True, directory=str(tmp_path), quantize=True, max_vectors=1000, max_disk_mb=0)
+
+
+async def test_quantized_search_ranks_by_cosine(tier):
+    """
+    Test that an int8-quantized file ranks chunks by cosine similarity.
+    """
+    await tier.replace_file("a", _vectors("file_a", [[1, 0, 0], [0.7, 0.7, 0], [0, 0, 1]]), pinecone_id="file_a")
+
+    assert await tier.has_files(["a"])
+    results = await tier.search([1, 0.1, 0], ["a"], top_k=2, include_values=True)
+
+    assert [result["id"] for result in results] == ["file_a_chunk_0", "file_a_chunk_1"]
+    assert results[0]["score"] == pytest.approx(0.995, abs=0.01)
+    assert results[0]["metadata"]["text"] == "chunk 0"
+    assert np.allclose(results[0]["values"], [1, 0, 0], atol=0.01)
+
+
+async def test_file_without_chunks_is_mirrored_as_empty(tier):
+    """
+    Test that a file without chunks counts as mirrored and contributes no results.
+    """
+    await tier.replace_file("a", _vectors("file_a", [[1, 0, 0]]))
+    await tier.replace_file("empty", [])
+
+    assert await tier.has_files(["a", "empty"])
+    results = await tier.search([1, 0, 0], ["a", "empty"], top_k=5)
+    assert [result["id"] for result in results] == ["file_a_chunk_0"]
+    assert await tier.search([1, 0, 0], ["empty"], top_k=5) == []
+
+
+async def test_remove_file_drops_memory_and_disk(tier):
+    """
+    Test that a removed file is unmapped and deleted from disk.
+    """
+    await tier.replace_file("a", _vectors("file_a", [[1, 0, 0]]))
+    file_dir = tier._file_dir("", "a")
+    assert file_dir.exists()
+
+    await tier.remove_file("a")
+
+    assert not file_dir.exists()
+    assert not await tier.has_files(["a"])
+
+
+async def test_replace_file_from_another_worker_is_picked_up(tier, tmp_path, manifest):
+    """
+    Test that a mapped file is revalidated against disk after another worker replaces it.
+    """
+    other_worker = LocalVectorTier(enabled=True, directory=str(tmp_path), quantize=True, max_vectors=1000, max_disk_mb=0)
+    await tier.replace_file("a", _vectors("file_a_v1", [[1, 0, 0]]))
+    assert await other_worker.has_files(["a"])
+
+    await tier.replace_file("a", _vectors("file_a_v2", [[0, 1, 0]]))
+
+    assert await other_worker.has_files(["a"])
+    results = await other_worker.search([0, 1, 0], ["a"], top_k=1)
+    assert results[0]["id"] == "file_a_v2_chunk_0"
+
+    await tier.remove_file("a")
+    assert not await other_worker.has_files(["a"])
+
+
+async def test_manifest_generation_change_bypasses_tier(tier, manifest):
+    """
+    Test that a file re-ingested under a new Pinecone ID is not served from the old mirror.
+    """
+    await tier.replace_file("a", _vectors("file_a_v1", [[1, 0, 0]]), pinecone_id="file_a_v1")
+    manifest.latest_pinecone_ids.return_value = {"a": "file_a_v1"}
+    assert await tier.has_files(["a"])
+
+    manifest.latest_pinecone_ids.return_value = {"a": "file_a_v2"}
+    assert not await tier.has_files(["a"])
+
+
+async def test_concurrent_replaces_leave_one_complete_copy(tier):
+    """
+    Test that concurrent writers of one file do not corrupt its on-disk copy.
+    """
+    await asyncio.gather(
+        *(tier.replace_file("a", _vectors(f"file_a_v{i}", [[1, 0, 0], [0, 1, 0]])) for i in range(5))
+    )
+
+    reloaded = LocalVectorTier(enabled=True, directory=str(tier.directory), quantize=True, max_vectors=1000, max_disk_mb=0)
+    assert await reloaded.has_files(["a"])
+    assert len(reloaded._files[("", "a")]) == 2
+    assert not list(tier._file_dir("", "a").parent.glob("*.tmp"))
+
+
+async def test_evict_disk_removes_least_recently_used(tier):
+    """
+    Test that disk eviction deletes unmapped files first and keeps mapped ones.
+    """
+    await tier.replace_file("old", _vectors("file_old", [[1, 0, 0]]))
+    await tier.replace_file("new", _vectors("file_new", [[0, 1, 0]]))
+    tier.max_disk_bytes = 1
+
+    tier._evict_disk(keep=[("", "new")])
+
+    assert not tier._file_dir("", "old").exists()
+    assert tier._file_dir("", "new").exists()
+
+
+async def test_max_vectors_unmaps_least_recently_used(tmp_path, manifest):
+    """
+    Test that files over the in-memory vector limit are unmapped but stay on disk.
+    """
+    tier = LocalVectorTier(enabled=True, directory=str(tmp_path), quantize=False, max_vectors=2, max_disk_mb=0)
+    await tier.replace_file("a", _vectors("file_a", [[1, 0, 0], [0, 1, 0]]))
+    await tier.replace_file("b", _vectors("file_b", [[0, 0, 1]]))
+
+    assert ("", "a") not in tier._files
+    assert await tier.has_files(["a"])
+    assert ("", "b") not in tier._files
+
+
+async def test_warm_mirrors_from_pinecone(tier, manifest):
+    """
+    Test that warming fetches a file's vectors from Pinecone into the tier.
+    """
+    manifest.latest_pinecone_id.return_value = "file_a"
+    manifest.vector_ids.return_value = ["file_a_chunk_0", "file_a_chunk_1"]
+    pinecone = MagicMock()
+    pinecone.fetch_vectors = AsyncMock(return_value=_vectors("file_a", [[1, 0, 0], [0, 1, 0]]))
+
+    with patch("app.services.local_vector_tier.pinecone_client", pinecone):
+        tier.warm(["a"])
+        await asyncio.gather(*tier._warming.values())
+
+    pinecone.fetch_vectors.assert_awaited_once_with(["file_a_chunk_0", "file_a_chunk_1"], "")
+    assert await tier.has_files(["a"])
+    assert tier._files[("", "a")].pinecone_id == "file_a"
+    assert not tier._warming
+
+
+async def test_replace_file_cancels_pending_warm(tier, manifest):
+    """
+    Test that a direct write cancels a background mirror of the same file.
+    """
+    fetch_started = asyncio.Event()
+
+    async def slow_fetch(*args, **kwargs):
+        fetch_started.set()
+        await asyncio.sleep(10)
+        return _vectors("file_a_old", [[0, 0, 1]])
+
+    manifest.latest_pinecone_id.return_value = "file_a_old"
+    manifest.vector_ids.return_value = ["file_a_old_chunk_0"]
+    pinecone = MagicMock()
+    pinecone.fetch_vectors = slow_fetch
+
+    with patch("app.services.local_vector_tier.pinecone_client", pinecone):
+        tier.warm(["a"])
+        warm_task = tier._warming[("", "a")]
+        await fetch_started.wait()
+        await tier.replace_file("a", _vectors("file_a_new", [[1, 0, 0]]))
+        await asyncio.gather(warm_task, return_exceptions=True)
+
+    assert warm_task.cancelled()
+    results = await tier.search([1, 0, 0], ["a"], top_k=1)
+    assert results[0]["id"] == "file_a_new_chunk_0"
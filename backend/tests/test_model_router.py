@@ -0,0 +1,110 @@
+"""
+Tests for latency-aware model routing.
+"""
+from unittest.mock import patch
+
+import pytest
+
+from app.services.model_router import ModelRouter
+
+TIERS = {
+    "fast": ["gemini:flash-8b", "openai:mini"],
+    "standard": ["gemini:flash", "openai:mini"],
+    "heavy": ["anthropic:opus", "openai:turbo"],
+}
+
+
+@pytest.fixture
+def router():
+    """
+    Model router fixture with fixed tiers and thresholds.
+    """
+    return ModelRouter(tiers=TIERS, standard_context_tokens=4000, heavy_context_tokens=12000, max_p95_ms=4000)
+
+
+@pytest.fixture
+def latencies():
+    """
+    Fixture setting the p95 latency per provider (0 without observations).
+    """
+    p95 = {}
+    with patch("app.services.model_router.metrics.percentile") as percentile:
+        percentile.side_effect = lambda histogram, q: p95.get(histogram.rsplit(".", 1)[1], 0.0)
+        yield p95
+
+
+@pytest.mark.parametrize(
+    "query, expected",
+    [
+        ("Compare the two approaches", "analytical"),
+        ("explain why the sky is blue", "analytical"),
+        ("Write a short story", "generative"),
+        ("What year did the war end?", "lookup"),
+    ],
+)
+def test_query_type(query, expected):
+    """
+    Test the rule-based query type.
+    """
+    assert ModelRouter.query_type(query) == expected
+
+
+@pytest.mark.parametrize(
+    "query, context_tokens, tier",
+    [
+        ("What year did the war end?", 0, "fast"),
+        ("What year did the war end?", 5000, "fast"),
+        ("Write a short story", 5000, "standard"),
+        ("Compare the two approaches", 0, "standard"),
+        ("Compare the two approaches", 5000, "standard"),
+        ("Compare the two approaches", 20000, "heavy"),
+        ("Analyze this. Why? And how?", 5000, "heavy"),
+    ],
+)
+def test_tier_from_complexity(router, latencies, query, context_tokens, tier):
+    """
+    Test that the tier follows the complexity score.
+    """
+    decision = router.route(query, context_tokens=context_tokens)
+
+    assert decision.tier == tier
+    assert decision.model_name == TIERS[tier][0]
+
+
+def test_skips_slow_provider(router, latencies):
+    """
+    Test that a candidate whose provider is over the p95 limit is skipped.
+    """
+    latencies["gemini"] = 9000.0
+    latencies["openai"] = 1200.0
+
+    decision = router.route("What year did the war end?")
+
+    assert decision.model_name == "openai:mini"
+    assert decision.signals["p95_ms"] == {"gemini:flash-8b": 9000, "openai:mini": 1200}
+
+
+def test_picks_fastest_when_all_slow(router, latencies):
+    """
+    Test that the fastest candidate is used when every provider is over the limit.
+    """
+    latencies["anthropic"] = 7000.0
+    latencies["openai"] = 5000.0
+
+    decision = router.route("Compare the two approaches", context_tokens=20000)
+
+    assert decision.tier == "heavy"
+    assert decision.model_name == "openai:turbo"
+
+
+def test_uses_stream_histogram(router):
+    """
+    Test that streamed answers are routed on time to first token and others on full latency.
+    """
+    with patch("app.services.model_router.metrics.percentile", return_value=0.0) as percentile:
+        router.route("What year did the war end?", stream=True)
+        assert percentile.call_args_list[0].args == ("llm.ttft_ms.gemini", 95)
+
+        percentile.reset_mock()
+        router.route("What year did the war end?", stream=False)
+        assert percentile.call_args_list[0].args == ("llm.latency_ms.gemini", 95)
@@ -2,7 +2,7 @@
 Tests for the query endpoints.
 """
 import json
-from unittest.mock import AsyncMock, MagicMock, patch
+from unittest.mock import ANY, AsyncMock, MagicMock, patch
 
 import pytest
 from fastapi.testclient import TestClient
@@ -80,7 +80,9 @@ def test_query_non_streaming(client, mock_rag_service):
         use_rag=True,
         stream=False,
         namespace=None,
-        filter=None
+        filter=None,
+        file_ids=None,
+        on_context=ANY
     )
 
 
@@ -156,7 +158,8 @@ def test_query_streaming(client, mock_rag_service):
         query=query_text,
         top_k=3,
         namespace=None,
-        filter=None
+        filter=None,
+        file_ids=None
     )
     mock_rag_service.generate_answer.assert_called_once_with(
         query=query_text,
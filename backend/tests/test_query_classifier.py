@@ -0,0 +1,83 @@
+"""
+Tests for the local query classifier.
+"""
+import pytest
+
+from app.core.config import settings
+from app.services.query_classifier import QueryClassifier
+
+
+@pytest.fixture
+def classifier():
+    """
+    Query classifier fixture.
+    """
+    return QueryClassifier()
+
+
+@pytest.mark.parametrize(
+    "query, label",
+    [
+        ("hi", "chitchat"),
+        ("Thanks!", "chitchat"),
+        ("how are you", "chitchat"),
+        ("hi there, how are you?", "chitchat"),
+        ("thank you so much! 🙏", "chitchat"),
+        ("Write a poem about the sea", "instruction"),
+        ("tell me a joke", "instruction"),
+        ("Translate this to French: good morning", "instruction"),
+        ("2 + 2", "instruction"),
+        ("what is 12 * 7?", "instruction"),
+    ],
+)
+def test_skips_retrieval_above_threshold(classifier, query, label):
+    """
+    Test that instruction-style and chit-chat queries clear the skip threshold.
+    """
+    result = classifier.classify(query)
+
+    assert result.label == label
+    assert not result.needs_retrieval
+    assert result.confidence >= settings.QUERY_CLASSIFIER_THRESHOLD
+
+
+@pytest.mark.parametrize(
+    "query",
+    [
+        "What is photosynthesis?",
+        "Explain the causes of the French Revolution",
+        "summarize the key arguments of chapter 3",
+        "mitochondria",
+        "hi, who is the TA?",
+        "hey what is RAG?",
+        "thanks, when is it due?",
+        "ok is the exam open book?",
+    ],
+)
+def test_information_seeking_queries_need_retrieval(classifier, query):
+    """
+    Test that information-seeking queries keep retrieval.
+    """
+    result = classifier.classify(query)
+
+    assert result.needs_retrieval
+    assert result.confidence < settings.QUERY_CLASSIFIER_THRESHOLD
+
+
+@pytest.mark.parametrize(
+    "query",
+    [
+        "Write an essay based on my notes",
+        "hi, what do my lecture slides say about entropy?",
+        "translate the document I uploaded",
+        "what is 2 + 2 according to the textbook",
+    ],
+)
+def test_references_to_user_material_need_retrieval(classifier, query):
+    """
+    Test that any reference to the user's material forces retrieval.
+    """
+    result = classifier.classify(query)
+
+    assert result.label == "informational"
+    assert result.confidence < 0.5
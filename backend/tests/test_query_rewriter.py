@@ -0,0 +1,181 @@
+"""
+Tests for the local query rewriter.
+"""
+import json
+
+import pytest
+
+from app.core.config import settings
+from app.services.query_rewriter import QueryRewriter
+
+
+@pytest.fixture
+def rewriter(tmp_path):
+    """
+    Query rewriter fixture with an empty dictionary.
+    """
+    return QueryRewriter(path=str(tmp_path / "query_dictionary.json"))
+
+
+def test_learns_parenthetical_acronyms(rewriter):
+    """
+    Test that "Expansion (ACRONYM)" and "ACRONYM (Expansion)" terms are learned.
+    """
+    changes = rewriter.learn({
+        "entities": ["Natural Language Processing (NLP)", "RNN (Recurrent Neural Network)"],
+        "topics": [],
+    }, "file-1")
+
+    assert changes == 2
+    result = rewriter.rewrite("How does NLP compare to an RNN?", ["file-1"])
+    assert "natural language processing" in result.text
+    assert "recurrent neural network" in result.text
+    assert result.confidence >= settings.QUERY_REWRITE_MIN_CONFIDENCE
+
+
+def test_learns_bare_acronym_from_initials(rewriter):
+    """
+    Test that a bare acronym is resolved by another term with matching initials.
+    """
+    rewriter.learn({"entities": ["ECB", "European Central Bank"], "topics": []}, "file-1")
+
+    assert "european central bank" in rewriter.rewrite("ECB interest rate decisions", ["file-1"]).expansions
+
+
+def test_expands_spelled_out_form_to_acronym(rewriter):
+    """
+    Test that a spelled-out expansion in the query adds the acronym.
+    """
+    rewriter.learn({"entities": ["Natural Language Processing (NLP)"], "topics": []}, "file-1")
+
+    assert "NLP" in rewriter.rewrite("history of natural language processing", ["file-1"]).expansions
+
+
+def test_learns_synonyms(rewriter):
+    """
+    Test that "term (other term)" pairs are learned as synonyms both ways.
+    """
+    rewriter.learn({"entities": [], "topics": ["heart attack (myocardial infarction)"]}, "file-1")
+
+    assert "myocardial infarction" in rewriter.rewrite("heart attack symptoms", ["file-1"]).expansions
+    assert "heart attack" in rewriter.rewrite("myocardial infarction treatment", ["file-1"]).expansions
+
+
+def test_relearning_reports_no_changes(rewriter):
+    """
+    Test that learning the same terms twice changes nothing the second time.
+    """
+    metadata = {"entities": ["Natural Language Processing (NLP)", "car (automobile)"], "topics": []}
+
+    assert rewriter.learn(metadata, "file-1") == 2
+    version = rewriter.version
+    assert rewriter.learn(metadata, "file-1") == 0
+    assert rewriter.version == version
+
+
+def test_prunes_stop_words_and_keeps_acronyms(rewriter):
+    """
+    Test that stop words are removed but acronyms that spell stop words are kept.
+    """
+    rewriter.learn({"entities": ["Information Technology (IT)"], "topics": []}, "file-1")
+
+    result = rewriter.rewrite("What is the role of IT in hospitals?", ["file-1"])
+
+    assert result.text.split()[:3] == ["role", "IT", "hospitals"]
+    assert "information technology" in result.expansions
+
+
+def test_unknown_acronym_lowers_confidence(rewriter):
+    """
+    Test that an acronym missing from the dictionary sends the query to the LLM.
+    """
+    result = rewriter.rewrite("What does the XYZ protocol do?", ["file-1"])
+
+    assert result.confidence < settings.QUERY_REWRITE_MIN_CONFIDENCE
+
+
+def test_short_query_lowers_confidence(rewriter):
+    """
+    Test that a query with fewer than two content words is not confident.
+    """
+    result = rewriter.rewrite("what about it?", ["file-1"])
+
+    assert result.confidence < settings.QUERY_REWRITE_MIN_CONFIDENCE
+
+
+def test_plain_query_is_confident(rewriter):
+    """
+    Test that an unambiguous query is rewritten locally.
+    """
+    result = rewriter.rewrite("Please explain the causes of the French Revolution", ["file-1"])
+
+    assert result.text == "causes French Revolution"
+    assert result.confidence == 1.0
+
+
+async def test_dictionary_persists(rewriter):
+    """
+    Test that learned terms are saved and loaded by a new rewriter.
+    """
+    rewriter.learn({"entities": ["Natural Language Processing (NLP)"], "topics": ["car (automobile)"]}, "file-1")
+
+    with open(rewriter.path, encoding="utf-8") as f:
+        assert json.load(f)["files"]["file-1"]["acronyms"] == {"NLP": "natural language processing"}
+
+    reloaded = QueryRewriter(path=str(rewriter.path))
+    await reloaded.load()
+
+    assert reloaded.version > 0
+    assert "natural language processing" in reloaded.rewrite("NLP basics", ["file-1"]).expansions
+    assert "automobile" in reloaded.rewrite("car insurance", ["file-1"]).expansions
+
+
+def test_expansions_are_scoped_to_the_searched_files(rewriter):
+    """
+    Test that a file's dictionary only expands queries scoped to that file.
+    """
+    rewriter.learn({"entities": ["Natural Language Processing (NLP)"], "topics": []}, "file-1")
+
+    assert rewriter.rewrite("NLP basics", ["file-1", "file-2"]).expansions == ["natural language processing"]
+    assert rewriter.rewrite("NLP basics", ["file-2"]).expansions == []
+    assert rewriter.rewrite("NLP basics").expansions == []
+
+
+def test_relearning_a_file_replaces_its_entries(rewriter):
+    """
+    Test that re-processing a file drops terms its new metadata no longer has.
+    """
+    rewriter.learn({"entities": ["Natural Language Processing (NLP)"], "topics": []}, "file-1")
+
+    assert rewriter.learn({"entities": ["Recurrent Neural Network (RNN)"], "topics": []}, "file-1") == 2
+    assert rewriter.rewrite("NLP basics", ["file-1"]).expansions == []
+    assert rewriter.rewrite("RNN basics", ["file-1"]).expansions == ["recurrent neural network"]
+
+
+async def test_saves_merge_updates_from_other_processes(rewriter):
+    """
+    Test that a save keeps the entries another process wrote in the meantime.
+    """
+    other_process = QueryRewriter(path=str(rewriter.path))
+    await rewriter.load()
+    other_process.learn({"entities": ["Natural Language Processing (NLP)"], "topics": []}, "file-1")
+
+    rewriter.learn({"entities": ["Recurrent Neural Network (RNN)"], "topics": []}, "file-2")
+
+    with open(rewriter.path, encoding="utf-8") as f:
+        assert set(json.load(f)["files"]) == {"file-1", "file-2"}
+    assert "natural language processing" in rewriter.rewrite("NLP basics", ["file-1"]).expansions
+
+
+def test_dictionary_size_is_capped(tmp_path):
+    """
+    Test that the least recently learned files are dropped over the entry limit.
+    """
+    rewriter = QueryRewriter(path=str(tmp_path / "query_dictionary.json"), max_entries=2)
+
+    rewriter.learn({"entities": ["Natural Language Processing (NLP)"], "topics": []}, "file-1")
+    rewriter.learn({"entities": ["Recurrent Neural Network (RNN)"], "topics": []}, "file-2")
+    rewriter.learn({"entities": ["Large Language Model (LLM)"], "topics": []}, "file-3")
+
+    assert rewriter.rewrite("NLP basics", ["file-1"]).expansions == []
+    assert rewriter.rewrite("LLM basics", ["file-3"]).expansions == ["large language model"]
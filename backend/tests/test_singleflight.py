@@ -0,0 +1,119 @@
+"""
+Tests for single-flight deduplication.
+"""
+import asyncio
+
+import pytest
+
+from app.core.singleflight import SingleFlight
+
+
+async def test_concurrent_calls_share_one_computation():
+    """
+    Test that concurrent calls for the same key run the work once.
+    """
+    flights = SingleFlight("test")
+    calls = 0
+
+    async def compute() -> int:
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return 42
+
+    results = await asyncio.gather(*(flights.do("key", compute) for _ in range(5)))
+
+    assert results == [42] * 5
+    assert calls == 1
+    assert flights._calls == {}
+
+
+async def test_different_keys_run_separately():
+    """
+    Test that calls for different keys do not share work.
+    """
+    flights = SingleFlight("test")
+
+    async def compute(value: int) -> int:
+        await asyncio.sleep(0.01)
+        return value
+
+    results = await asyncio.gather(flights.do("a", lambda: compute(1)), flights.do("b", lambda: compute(2)))
+
+    assert results == [1, 2]
+
+
+async def test_sequential_calls_run_again():
+    """
+    Test that a finished computation is not reused by later calls.
+    """
+    flights = SingleFlight("test")
+    calls = 0
+
+    async def compute() -> int:
+        nonlocal calls
+        calls += 1
+        return calls
+
+    assert await flights.do("key", compute) == 1
+    assert await flights.do("key", compute) == 2
+
+
+async def test_errors_are_shared():
+    """
+    Test that every waiting caller receives the exception of the shared computation.
+    """
+    flights = SingleFlight("test")
+
+    async def compute() -> int:
+        await asyncio.sleep(0.01)
+        raise ValueError("boom")
+
+    results = await asyncio.gather(
+        flights.do("key", compute), flights.do("key", compute), return_exceptions=True
+    )
+
+    assert all(isinstance(result, ValueError) for result in results)
+    assert flights._calls == {}
+
+
+async def test_cancelled_caller_does_not_cancel_others():
+    """
+    Test that cancelling one caller leaves the computation running for the rest.
+    """
+    flights = SingleFlight("test")
+
+    async def compute() -> str:
+        await asyncio.sleep(0.05)
+        return "done"
+
+    first = asyncio.create_task(flights.do("key", compute))
+    second = asyncio.create_task(flights.do("key", compute))
+    await asyncio.sleep(0.01)
+    first.cancel()
+
+    assert await second == "done"
+    with pytest.raises(asyncio.CancelledError):
+        await first
+
+
+async def test_forget_where_starts_fresh_computation():
+    """
+    Test that forgotten keys are recomputed by new callers while old callers keep their result.
+    """
+    flights = SingleFlight("test")
+    values = iter(["stale", "fresh"])
+
+    async def compute() -> str:
+        value = next(values)
+        await asyncio.sleep(0.02)
+        return value
+
+    old = asyncio.create_task(flights.do(("query", "file-1"), compute))
+    await asyncio.sleep(0)
+
+    assert flights.forget_where(lambda key: key[1] == "file-1") == 1
+    assert flights.forget_where(lambda key: key[1] == "file-1") == 0
+
+    assert await flights.do(("query", "file-1"), compute) == "fresh"
+    assert await old == "stale"
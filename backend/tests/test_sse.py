@@ -0,0 +1,129 @@
+"""
+Tests for server-sent event framing.
+"""
+import asyncio
+import json
+from typing import AsyncGenerator, List, Tuple
+
+from app.core.sse import HEARTBEAT, coalesce, encode_event, heartbeats
+
+
+async def _chunks(timed: List[Tuple[float, str]]) -> AsyncGenerator[str, None]:
+    """
+    Yields chunks after the given delays.
+    """
+    for delay, chunk in timed:
+        await asyncio.sleep(delay)
+        yield chunk
+
+
+async def _collect(chunks: AsyncGenerator[str, None]) -> List[str]:
+    return [chunk async for chunk in chunks]
+
+
+def test_encode_event():
+    """
+    Test that payloads are framed as SSE data events.
+    """
+    event = encode_event({"type": "token", "content": "héllo"})
+
+    assert event.startswith("data: ")
+    assert event.endswith("\n\n")
+    assert json.loads(event[len("data: "):]) == {"type": "token", "content": "héllo"}
+
+
+async def test_coalesce_passes_first_chunk_through():
+    """
+    Test that the first chunk is not held back and close chunks are merged.
+    """
+    frames = await _collect(coalesce(_chunks([(0, "a"), (0, "b"), (0, "c")]), window_ms=50, max_chars=100))
+
+    assert frames == ["a", "bc"]
+
+
+async def test_coalesce_flushes_after_window():
+    """
+    Test that chunks further apart than the window are sent as separate frames.
+    """
+    frames = await _collect(
+        coalesce(_chunks([(0, "a"), (0, "b"), (0.05, "c"), (0.05, "d")]), window_ms=10, max_chars=100)
+    )
+
+    assert frames == ["a", "b", "c", "d"]
+
+
+async def test_coalesce_flushes_at_max_chars():
+    """
+    Test that a full buffer is flushed without waiting for the window.
+    """
+    frames = await _collect(
+        coalesce(_chunks([(0, "a")] + [(0, "xx")] * 4), window_ms=1000, max_chars=4)
+    )
+
+    assert frames == ["a", "xxxx", "xxxx"]
+
+
+async def test_coalesce_preserves_content():
+    """
+    Test that coalescing never drops or reorders content.
+    """
+    parts = [(0.001 * (i % 3), str(i)) for i in range(50)]
+    frames = await _collect(coalesce(_chunks(parts), window_ms=2, max_chars=8))
+
+    assert "".join(frames) == "".join(chunk for _, chunk in parts)
+
+
+async def test_coalesce_closes_source():
+    """
+    Test that closing the coalesced stream closes the source stream.
+    """
+    closed = False
+
+    async def source() -> AsyncGenerator[str, None]:
+        nonlocal closed
+        try:
+            yield "a"
+            await asyncio.sleep(10)
+            yield "b"
+        finally:
+            closed = True
+
+    frames = coalesce(source(), window_ms=10, max_chars=100)
+    assert await frames.__anext__() == "a"
+    await frames.aclose()
+
+    assert closed
+
+
+async def test_heartbeats_until_task_completes():
+    """
+    Test that heartbeats are sent while the task runs and stop when it completes.
+    """
+    task = asyncio.ensure_future(asyncio.sleep(0.055, result="context"))
+
+    beats = await _collect(heartbeats(task, interval=0.02))
+
+    assert beats == [HEARTBEAT, HEARTBEAT]
+    assert task.result() == "context"
+
+
+async def test_heartbeats_not_sent_for_fast_task():
+    """
+    Test that no heartbeat is sent when the task completes within the interval.
+    """
+    task = asyncio.ensure_future(asyncio.sleep(0, result="context"))
+
+    assert await _collect(heartbeats(task, interval=1.0)) == []
+
+
+async def test_heartbeats_cancel_task_on_close():
+    """
+    Test that closing the heartbeat stream cancels the task.
+    """
+    task = asyncio.ensure_future(asyncio.sleep(10))
+    beats = heartbeats(task, interval=0.01)
+
+    assert await beats.__anext__() == HEARTBEAT
+    await beats.aclose()
+
+    assert task.cancelled()